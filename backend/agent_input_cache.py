@@ -0,0 +1,191 @@
+# agent_input_cache.py
+"""
+Per-thread cache of the agent input for the last HISTORY_LIMIT thread items.
+
+`respond` used to reload the window from the store, re-validate every item
+and re-convert all of them on each turn. Here the window is loaded once per
+thread, then kept up to date from the store's item-write notifications
+(see store_events.py), and each item's converted input (and its token
+count) is memoized. A warm turn converts only the items added since the
+previous turn and makes no store round trip.
+
+Threads are evicted LRU, and entries also expire after a TTL, which
+bounds how long writes this process wasn't told about (from other worker
+processes) can go unseen. Multi-worker deployments that need every turn to
+see the others' writes set AGENT_INPUT_CACHE_CHECK_STORE=1: a cached window
+is then only served after a single-row check that the thread's newest item
+is still the window's last item.
+"""
+import os
+import json
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from chatkit.agents import ThreadItemConverter
+from chatkit.types import ThreadItem, UserMessageItem
+
+from utils.embeddings import count_tokens
+
+# Items sent to the agent per turn
+HISTORY_LIMIT = 20
+AGENT_INPUT_CACHE_MAX_THREADS = int(os.environ.get("AGENT_INPUT_CACHE_MAX_THREADS", "1000"))
+AGENT_INPUT_CACHE_TTL = float(os.environ.get("AGENT_INPUT_CACHE_TTL", "300"))
+# Check cached windows against the store on every turn (one single-row query)
+AGENT_INPUT_CACHE_CHECK_STORE = os.environ.get("AGENT_INPUT_CACHE_CHECK_STORE", "0") == "1"
+
+ItemLoader = Callable[[str], Awaitable[List[ThreadItem]]]
+# Id of a thread's newest item in the store (None for an empty thread)
+LatestItemId = Callable[[str], Awaitable[Optional[str]]]
+# Converted agent input of one thread item, and its size in tokens
+ItemInput = Tuple[list, int]
+
+
+class _ThreadEntry:
+    __slots__ = ("items", "converted", "expires_at", "stale")
+
+    def __init__(self, expires_at: float) -> None:
+        self.items: Optional[List[ThreadItem]] = None    # None while the window is loading
+        self.converted: dict[str, ItemInput] = {}        # item id -> agent input (not as last message)
+        self.expires_at = expires_at
+        self.stale = False                               # written to while loading
+
+
+class AgentInputCache:
+    """Store listener + LRU of converted thread windows."""
+
+    def __init__(
+        self,
+        converter: ThreadItemConverter,
+        limit: int = HISTORY_LIMIT,
+        max_threads: int = AGENT_INPUT_CACHE_MAX_THREADS,
+        ttl_seconds: float = AGENT_INPUT_CACHE_TTL,
+        check_store: bool = AGENT_INPUT_CACHE_CHECK_STORE,
+    ) -> None:
+        self.converter = converter
+        self.limit = limit
+        self.max_threads = max_threads
+        self.ttl_seconds = ttl_seconds
+        self.check_store = check_store
+        self._threads: "OrderedDict[str, _ThreadEntry]" = OrderedDict()
+
+    # -- Store listener ----------------------------------------------------
+
+    def item_saved(self, thread_id: str, item: ThreadItem) -> None:
+        entry = self._threads.get(thread_id)
+        if entry is None:
+            return  # only threads with a complete window are tracked
+        if entry.items is None:
+            entry.stale = True
+            return
+        entry.converted.pop(item.id, None)
+        for i, existing in enumerate(entry.items):
+            if existing.id == item.id:
+                entry.items[i] = item
+                return
+        if entry.items and item.created_at < entry.items[-1].created_at:
+            # An update to an item outside the window (e.g. an older widget)
+            if len(entry.items) >= self.limit and item.created_at < entry.items[0].created_at:
+                return  # older than the whole window: not part of it
+            self.invalidate(thread_id)
+            return
+        entry.items.append(item)
+        for dropped in entry.items[:-self.limit]:
+            entry.converted.pop(dropped.id, None)
+        del entry.items[:-self.limit]
+
+    def item_deleted(self, thread_id: str, item_id: str) -> None:
+        # An older item would have to slide back into the window: reload it
+        self.invalidate(thread_id)
+
+    def thread_deleted(self, thread_id: str) -> None:
+        self.invalidate(thread_id)
+
+    def invalidate(self, thread_id: str) -> None:
+        entry = self._threads.pop(thread_id, None)
+        if entry is not None and entry.items is None:
+            # Keep a loading entry (marked stale) so its result isn't cached
+            entry.stale = True
+            self._threads[thread_id] = entry
+
+    # -- Reads -------------------------------------------------------------
+
+    async def items(
+        self, thread_id: str, load: ItemLoader, latest: Optional[LatestItemId] = None
+    ) -> List[ThreadItem]:
+        """
+        The last `limit` items of a thread, oldest first (`load` is called on
+        a miss). With `check_store` set, a cached window is only used while
+        its last item is still the thread's newest one (`latest`).
+        """
+        entry = self._threads.get(thread_id)
+        now = time.monotonic()
+        if entry is not None and entry.items is not None and entry.expires_at >= now:
+            cached = list(entry.items)
+            if not self.check_store or latest is None or await latest(thread_id) == (cached[-1].id if cached else None):
+                self._threads.move_to_end(thread_id)
+                return cached
+
+        entry = _ThreadEntry(now + self.ttl_seconds)
+        self._threads[thread_id] = entry
+        self._threads.move_to_end(thread_id)
+        while len(self._threads) > self.max_threads:
+            self._threads.popitem(last=False)
+
+        try:
+            items = list(await load(thread_id))
+        except BaseException:
+            if self._threads.get(thread_id) is entry:
+                del self._threads[thread_id]
+            raise
+
+        if entry.stale or self._threads.get(thread_id) is not entry:
+            # Written to (or evicted) while loading: serve this result, don't keep it
+            if self._threads.get(thread_id) is entry:
+                del self._threads[thread_id]
+        else:
+            entry.items = items[-self.limit:]
+        return items[-self.limit:]
+
+    async def item_inputs(self, thread_id: str, items: List[ThreadItem]) -> List[ItemInput]:
+        """
+        (agent input, token count) for each of `items` (as returned by
+        `items`), memoized per item. A last user message with quoted text is
+        converted fresh every time: quoted text is only rendered for the last
+        message.
+        """
+        if not items:
+            return []
+        entry = self._threads.get(thread_id)
+        converted = entry.converted if entry is not None and entry.items is not None else {}
+
+        output: List[ItemInput] = []
+        for item in items[:-1]:
+            item_input = converted.get(item.id)
+            if item_input is None:
+                item_input = converted[item.id] = await self._convert(item)
+            output.append(item_input)
+
+        last = items[-1]
+        if isinstance(last, UserMessageItem) and last.quoted_text:
+            output.append(_with_tokens(await self.converter.to_agent_input([last])))
+        else:
+            item_input = converted.get(last.id)
+            if item_input is None:
+                item_input = converted[last.id] = await self._convert(last)
+            output.append(item_input)
+        return output
+
+    async def agent_input(self, thread_id: str, items: List[ThreadItem]) -> list:
+        """Agent input for `items`, concatenated (see `item_inputs`)."""
+        return [part for item_input, _ in await self.item_inputs(thread_id, items) for part in item_input]
+
+    async def _convert(self, item: ThreadItem) -> ItemInput:
+        if isinstance(item, UserMessageItem) and item.quoted_text:
+            # Same as converting it as an earlier (not last) message
+            item = item.model_copy(update={"quoted_text": None})
+        return _with_tokens(await self.converter.to_agent_input([item]))
+
+
+def _with_tokens(item_input: list) -> ItemInput:
+    return item_input, count_tokens(json.dumps(item_input, default=str))
@@ -0,0 +1,35 @@
+# artifact_store.py
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Tuple
+
+# Bounded in-process store for large tool artifacts (transcripts).
+# Tools hand each other a short ID instead of pushing the text through the LLM.
+MAX_ARTIFACTS = 256
+TTL_SECONDS = 6 * 60 * 60
+
+_artifacts: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+
+def save_transcript(text: str) -> str:
+    """Store a transcript and return its ID (same text -> same ID)."""
+    transcript_id = "tr_" + hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+    _artifacts[transcript_id] = (time.monotonic(), text)
+    _artifacts.move_to_end(transcript_id)
+    while len(_artifacts) > MAX_ARTIFACTS:
+        _artifacts.popitem(last=False)
+    return transcript_id
+
+
+def get_transcript(transcript_id: str) -> str | None:
+    """Fetch a transcript by ID, or None if unknown / expired."""
+    entry = _artifacts.get(transcript_id)
+    if entry is None:
+        return None
+    stored_at, text = entry
+    if time.monotonic() - stored_at > TTL_SECONDS:
+        del _artifacts[transcript_id]
+        return None
+    _artifacts.move_to_end(transcript_id)
+    return text
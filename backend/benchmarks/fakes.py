@@ -0,0 +1,453 @@
+"""
+In-process stand-ins for the external services, for hermetic benchmarks:
+- FakeSupabase: the supabase-py query-builder chain over in-memory tables
+- fake_openai_transport: OpenAI embeddings + Responses API (streaming and not)
+- fake_scraper_transport: the YouTube / Zoom transcript scrapers
+Every fake waits a configurable latency before answering, so benchmarks
+measure our own overhead plus realistic round trips, not the services.
+"""
+
+from __future__ import annotations
+
+import re
+import copy
+import json
+import time
+import random
+import asyncio
+import hashlib
+import threading
+import itertools
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+
+@dataclass
+class Latency:
+    """Simulated round-trip time: `base_ms` plus up to `jitter_ms` of random jitter."""
+    base_ms: float = 0.0
+    jitter_ms: float = 0.0
+
+    def seconds(self) -> float:
+        return (self.base_ms + random.random() * self.jitter_ms) / 1000.0
+
+
+# -----------------------------------------------------------------------------
+# Supabase
+# -----------------------------------------------------------------------------
+
+@dataclass
+class FakeResponse:
+    data: Any
+    count: Optional[int] = None
+
+
+# Filter grammar used in `or_` strings: col.op."value" | col.op.value | and(...)
+_COND_RE = re.compile(r'^([a-z_]+)\.(eq|neq|gt|gte|lt|lte)\.(?:"((?:[^"\\]|\\.)*)"|([^,()]*))$')
+
+
+def _split_top_level(expr: str) -> List[str]:
+    parts, depth, current, in_quotes = [], 0, "", False
+    for i, ch in enumerate(expr):
+        if ch == '"' and (i == 0 or expr[i - 1] != "\\"):
+            in_quotes = not in_quotes
+        if not in_quotes:
+            if ch == "(":
+                depth += 1
+            elif ch == ")":
+                depth -= 1
+            elif ch == "," and depth == 0:
+                parts.append(current)
+                current = ""
+                continue
+        current += ch
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _compare(op: str, left: Any, right: Any) -> bool:
+    if left is None:
+        return False
+    if isinstance(left, (int, float)) and not isinstance(left, bool):
+        right = type(left)(right)
+    else:
+        left, right = str(left), str(right)
+    return {
+        "eq": left == right,
+        "neq": left != right,
+        "gt": left > right,
+        "gte": left >= right,
+        "lt": left < right,
+        "lte": left <= right,
+    }[op]
+
+
+def _parse_or(expr: str) -> Callable[[Dict[str, Any]], bool]:
+    """Predicate for a PostgREST `or=(...)` filter (the subset this repo uses)."""
+    checks = []
+    for part in _split_top_level(expr):
+        if part.startswith("and(") and part.endswith(")"):
+            inner = [_parse_or(p) for p in _split_top_level(part[4:-1])]
+            checks.append(lambda row, inner=inner: all(check(row) for check in inner))
+            continue
+        match = _COND_RE.match(part)
+        if not match:
+            raise ValueError(f"Unsupported filter: {part}")
+        column, op, quoted, bare = match.groups()
+        value = quoted.replace('\\"', '"').replace("\\\\", "\\") if quoted is not None else bare
+        checks.append(lambda row, c=column, o=op, v=value: _compare(o, row.get(c), v))
+    return lambda row: any(check(row) for check in checks)
+
+
+class FakeQuery:
+    """One `table(...)...execute()` chain. Only the methods this repo uses."""
+
+    def __init__(self, db: "FakeSupabase", table: str) -> None:
+        self.db = db
+        self.table = table
+        self.action = "select"
+        self.columns: Optional[List[str]] = None
+        self.filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self.orders: List[tuple] = []
+        self.limit_n: Optional[int] = None
+        self.offset = 0
+        self.single_row = False
+        self.payload: Any = None
+        self.on_conflict = "id"
+
+    # -- builders --
+    def select(self, columns: str = "*", **kwargs: Any) -> "FakeQuery":
+        cols = [c.strip() for c in columns.split(",")]
+        self.columns = None if "*" in cols else cols
+        return self
+
+    def insert(self, rows: Any, **kwargs: Any) -> "FakeQuery":
+        self.action, self.payload = "insert", rows
+        return self
+
+    def upsert(self, rows: Any, on_conflict: str = "", **kwargs: Any) -> "FakeQuery":
+        self.action, self.payload = "upsert", rows
+        self.on_conflict = on_conflict or "id"
+        return self
+
+    def update(self, values: Dict[str, Any], **kwargs: Any) -> "FakeQuery":
+        self.action, self.payload = "update", values
+        return self
+
+    def delete(self, **kwargs: Any) -> "FakeQuery":
+        self.action = "delete"
+        return self
+
+    def eq(self, column: str, value: Any) -> "FakeQuery":
+        self.filters.append(lambda row: _compare("eq", row.get(column), value))
+        return self
+
+    def neq(self, column: str, value: Any) -> "FakeQuery":
+        self.filters.append(lambda row: _compare("neq", row.get(column), value))
+        return self
+
+    def gt(self, column: str, value: Any) -> "FakeQuery":
+        self.filters.append(lambda row: _compare("gt", row.get(column), value))
+        return self
+
+    def gte(self, column: str, value: Any) -> "FakeQuery":
+        self.filters.append(lambda row: _compare("gte", row.get(column), value))
+        return self
+
+    def lt(self, column: str, value: Any) -> "FakeQuery":
+        self.filters.append(lambda row: _compare("lt", row.get(column), value))
+        return self
+
+    def in_(self, column: str, values: List[Any]) -> "FakeQuery":
+        wanted = {str(v) for v in values}
+        self.filters.append(lambda row: str(row.get(column)) in wanted)
+        return self
+
+    def or_(self, filters: str, **kwargs: Any) -> "FakeQuery":
+        self.filters.append(_parse_or(filters))
+        return self
+
+    def order(self, column: str, desc: bool = False, **kwargs: Any) -> "FakeQuery":
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, n: int, **kwargs: Any) -> "FakeQuery":
+        self.limit_n = n
+        return self
+
+    def range(self, start: int, end: int, **kwargs: Any) -> "FakeQuery":
+        self.offset, self.limit_n = start, end - start + 1
+        return self
+
+    def single(self) -> "FakeQuery":
+        self.single_row = True
+        return self
+
+    maybe_single = single
+
+    # -- execution --
+    def execute(self) -> FakeResponse:
+        # supabase-py is synchronous, so the fake blocks its (worker) thread too
+        time.sleep(self.db.latency.seconds())
+        with self.db.lock:
+            self.db.calls += 1
+            return self._run()
+
+    def _matches(self, row: Dict[str, Any]) -> bool:
+        return all(check(row) for check in self.filters)
+
+    def _project(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        if self.columns is None:
+            return copy.deepcopy(row)
+        return {c: copy.deepcopy(row.get(c)) for c in self.columns}
+
+    def _run(self) -> FakeResponse:
+        rows = self.db.tables.setdefault(self.table, [])
+
+        if self.action in ("insert", "upsert"):
+            written = []
+            for new in self.payload if isinstance(self.payload, list) else [self.payload]:
+                new = copy.deepcopy(new)
+                keys = [k.strip() for k in self.on_conflict.split(",")]
+                existing = None
+                if self.action == "upsert":
+                    existing = next((r for r in rows if all(r.get(k) == new.get(k) for k in keys)), None)
+                if existing is not None:
+                    existing.update(new)
+                    written.append(existing)
+                else:
+                    new.setdefault("id", next(self.db.ids))
+                    rows.append(new)
+                    written.append(new)
+            return FakeResponse([self._project(r) for r in written])
+
+        matched = [r for r in rows if self._matches(r)]
+
+        if self.action == "update":
+            for r in matched:
+                r.update(copy.deepcopy(self.payload))
+            return FakeResponse([self._project(r) for r in matched])
+
+        if self.action == "delete":
+            self.db.tables[self.table] = [r for r in rows if not self._matches(r)]
+            return FakeResponse([self._project(r) for r in matched])
+
+        for column, desc in reversed(self.orders):
+            matched.sort(key=lambda r: (r.get(column) is None, r.get(column) if isinstance(r.get(column), (int, float)) else str(r.get(column))), reverse=desc)
+        if self.limit_n is not None:
+            matched = matched[self.offset:self.offset + self.limit_n]
+        data = [self._project(r) for r in matched]
+        if self.single_row:
+            return FakeResponse(data[0] if data else None)
+        return FakeResponse(data)
+
+
+class FakeRpc:
+    """One `rpc(fn, params).execute()` call. Only the SQL functions in backend/sql/."""
+
+    def __init__(self, db: "FakeSupabase", fn: str, params: Dict[str, Any]) -> None:
+        self.db = db
+        self.fn = fn
+        self.params = params
+
+    def execute(self) -> FakeResponse:
+        time.sleep(self.db.latency.seconds())
+        with self.db.lock:
+            self.db.calls += 1
+            if self.fn == "transcript_slice":
+                p = self.params
+                meeting = next((r for r in self.db.tables.get("meetinglist", []) if r.get("id") == p["meeting"]), None)
+                if meeting is None:
+                    return FakeResponse(None)
+                return FakeResponse((meeting.get("content") or "")[p["from_offset"]:p.get("to_offset")])
+            raise NotImplementedError(f"FakeSupabase has no function {self.fn!r}")
+
+
+class FakeSupabase:
+    """Stands in for `supabase.Client`: `client.table(name)` starts a FakeQuery, `client.rpc(...)` a FakeRpc."""
+
+    def __init__(self, latency: Latency | None = None) -> None:
+        self.latency = latency or Latency()
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.calls = 0
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, fn: str, params: Dict[str, Any] | None = None) -> FakeRpc:
+        return FakeRpc(self, fn, params or {})
+
+
+# -----------------------------------------------------------------------------
+# OpenAI (embeddings + Responses API)
+# -----------------------------------------------------------------------------
+
+EMBEDDING_DIM = 1536
+
+
+def fake_embedding(text: str, dim: int = EMBEDDING_DIM) -> List[float]:
+    """Deterministic pseudo-embedding: same text, same vector."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    rng = random.Random(seed)
+    return [rng.uniform(-1.0, 1.0) for _ in range(dim)]
+
+
+def _response_json(response_id: str, model: str, text: str) -> Dict[str, Any]:
+    return {
+        "id": response_id,
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": model,
+        "status": "completed",
+        "output": [{
+            "type": "message",
+            "id": "msg_" + response_id,
+            "role": "assistant",
+            "status": "completed",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }],
+        "parallel_tool_calls": False,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {
+            "input_tokens": 100,
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens": len(text) // 4 + 1,
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": 100 + len(text) // 4 + 1,
+        },
+    }
+
+
+def _sse(events: List[Dict[str, Any]]) -> bytes:
+    return b"".join(
+        f"event: {e['type']}\ndata: {json.dumps(e)}\n\n".encode("utf-8") for e in events
+    )
+
+
+def _stream_events(response: Dict[str, Any], text: str) -> List[Dict[str, Any]]:
+    item = response["output"][0]
+    in_progress = {**response, "status": "in_progress", "output": []}
+    empty_item = {**item, "status": "in_progress", "content": []}
+    part = {"type": "output_text", "text": "", "annotations": []}
+    events = [
+        {"type": "response.created", "response": in_progress},
+        {"type": "response.in_progress", "response": in_progress},
+        {"type": "response.output_item.added", "output_index": 0, "item": empty_item},
+        {"type": "response.content_part.added", "item_id": item["id"], "output_index": 0, "content_index": 0, "part": part},
+    ]
+    for start in range(0, len(text), 16):
+        events.append({
+            "type": "response.output_text.delta", "item_id": item["id"], "output_index": 0,
+            "content_index": 0, "delta": text[start:start + 16], "logprobs": [],
+        })
+    events += [
+        {"type": "response.output_text.done", "item_id": item["id"], "output_index": 0, "content_index": 0, "text": text, "logprobs": []},
+        {"type": "response.content_part.done", "item_id": item["id"], "output_index": 0, "content_index": 0, "part": {**part, "text": text}},
+        {"type": "response.output_item.done", "output_index": 0, "item": item},
+        {"type": "response.completed", "response": response},
+    ]
+    for seq, event in enumerate(events):
+        event["sequence_number"] = seq
+    return events
+
+
+def default_reply(body: Dict[str, Any]) -> str:
+    """Model output for a Responses request: schema-shaped JSON if a schema is requested."""
+    fmt = (body.get("text") or {}).get("format") or {}
+    if fmt.get("type") == "json_schema":
+        return json.dumps({
+            "metadata": {"meeting_title": "Benchmark meeting", "date": None, "project": None},
+            "attendees": ["Alice", "Bob"],
+            "summary": "A meeting about benchmarks.",
+            "action_items": [{"task": "Write report", "owner": "Alice", "due": None}],
+            "insights": {"topics": ["performance"], "priority": "medium", "decisions": [], "notes": None},
+            "url": "https://www.youtube.com/watch?v=benchmark00",
+        })
+    return "Here is what I found about your meeting."
+
+
+def fake_openai_transport(
+    latency: Latency | None = None,
+    embedding_latency: Latency | None = None,
+    reply: Callable[[Dict[str, Any]], str] = default_reply,
+) -> httpx.MockTransport:
+    """httpx transport answering /embeddings and /responses like the OpenAI API."""
+    latency = latency or Latency()
+    embedding_latency = embedding_latency or latency
+    counter = itertools.count(1)
+    stats = {"embeddings": 0, "responses": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content or b"{}")
+        if request.url.path.endswith("/embeddings"):
+            await asyncio.sleep(embedding_latency.seconds())
+            stats["embeddings"] += 1
+            inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+            tokens = sum(len(t) // 4 + 1 for t in inputs)
+            return httpx.Response(200, json={
+                "object": "list",
+                "model": body.get("model"),
+                "data": [{"object": "embedding", "index": i, "embedding": fake_embedding(t)} for i, t in enumerate(inputs)],
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+            })
+
+        if request.url.path.endswith("/responses"):
+            await asyncio.sleep(latency.seconds())
+            stats["responses"] += 1
+            text = reply(body)
+            response = _response_json(f"resp_{next(counter)}", body.get("model", "gpt-4o-mini"), text)
+            if body.get("stream"):
+                return httpx.Response(
+                    200,
+                    content=_sse(_stream_events(response, text)),
+                    headers={"content-type": "text/event-stream"},
+                )
+            return httpx.Response(200, json=response)
+
+        return httpx.Response(404, json={"error": {"message": f"not faked: {request.url.path}"}})
+
+    transport = httpx.MockTransport(handler)
+    transport.stats = stats  # type: ignore[attr-defined]
+    return transport
+
+
+# -----------------------------------------------------------------------------
+# Transcript scrapers
+# -----------------------------------------------------------------------------
+
+_WORDS = (
+    "budget roadmap launch customer release design review metrics hiring "
+    "quarter planning feedback pricing migration security onboarding"
+).split()
+
+
+def make_transcript(chars: int, seed: int = 0) -> str:
+    """A plausible transcript of about `chars` characters."""
+    rng = random.Random(seed)
+    speakers = ["Alice", "Bob", "Carol", "Dan"]
+    lines, size = [], 0
+    while size < chars:
+        sentence = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(6, 18)))
+        line = f"{rng.choice(speakers)}: {sentence.capitalize()}."
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)[:chars]
+
+
+def fake_scraper_transport(latency: Latency | None = None, transcript_chars: int = 20_000) -> httpx.MockTransport:
+    """httpx transport answering the YouTube / Zoom scraper services."""
+    latency = latency or Latency()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency.seconds())
+        url = request.url.params.get("url", "")
+        seed = int(hashlib.sha256(url.encode("utf-8")).hexdigest()[:8], 16)
+        return httpx.Response(200, json={"transcript": make_transcript(transcript_chars, seed)})
+
+    return httpx.MockTransport(handler)
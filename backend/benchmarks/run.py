@@ -0,0 +1,418 @@
+"""
+Hermetic end-to-end benchmarks (no network, no API keys, no cost).
+
+Supabase, OpenAI and the transcript scrapers are replaced by the in-process
+fakes in benchmarks/fakes.py, each with a configurable latency. The real
+application code runs unchanged on top of them.
+
+Usage (from backend/):
+    python -m benchmarks.run                          # all benchmarks, report.json
+    python -m benchmarks.run --only analysis,index    # a subset
+    python -m benchmarks.run --db-latency 20 --llm-latency 400 --output before.json
+    python -m benchmarks.run --compare before.json    # print the change vs. an older report
+    python -m benchmarks.run --chatkit-store sqlite    # app on the embedded SQLite store
+
+Benchmarks:
+    chatkit   /chatkit turn latency (plain question, and a turn that ingests a URL)
+    analysis  /api/analysis throughput (cold and cached, with and without ETags)
+    index     index_meeting_transcript throughput vs. transcript size
+    store     SupabaseStore and SQLiteStore operations under concurrency
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List
+
+from benchmarks.fakes import (
+    FakeSupabase,
+    Latency,
+    fake_openai_transport,
+    fake_scraper_transport,
+    make_transcript,
+)
+
+BENCHMARKS = ["chatkit", "analysis", "index", "store"]
+
+
+# -----------------------------------------------------------------------------
+# Setup
+# -----------------------------------------------------------------------------
+
+class Fakes:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.db = FakeSupabase(Latency(args.db_latency, args.db_latency / 4))
+        self.openai_transport = fake_openai_transport(
+            latency=Latency(args.llm_latency, args.llm_latency / 4),
+            embedding_latency=Latency(args.embedding_latency, args.embedding_latency / 4),
+        )
+        self.scraper_transport = fake_scraper_transport(
+            latency=Latency(args.scraper_latency, args.scraper_latency / 4),
+            transcript_chars=args.transcript_chars,
+        )
+
+
+def install_fakes(args: argparse.Namespace) -> Fakes:
+    """
+    Point every external dependency at the fakes. Must run before any
+    application module is imported (they create their clients at import time).
+    """
+    workdir = tempfile.mkdtemp(prefix="meeting-bench-")
+    os.environ.update({
+        "OPENAI_API_KEY": "sk-benchmark",
+        "SUPABASE_URL": "http://supabase.invalid",
+        "SUPABASE_SERVICE_KEY": "benchmark",
+        "CACHE_DIR": os.path.join(workdir, "cache"),
+        "MEETING_STORE_PATH": os.path.join(workdir, "thread_meetings.sqlite3"),
+        "INGEST_JOBS_PATH": os.path.join(workdir, "ingest_jobs.sqlite3"),
+        "CHATKIT_STORE": args.chatkit_store,
+        "CHATKIT_SQLITE_PATH": os.path.join(workdir, "chatkit.sqlite3"),
+        "OPENAI_AGENTS_DISABLE_TRACING": "1",
+    })
+    fakes = Fakes(args)
+
+    import httpx
+    import agentops
+    import supabase as supabase_package
+    from openai import AsyncOpenAI
+    from agents import set_default_openai_client, set_tracing_disabled
+
+    supabase_package.create_client = lambda *a, **k: fakes.db
+    agentops.init = lambda *a, **k: None
+
+    openai_client = AsyncOpenAI(
+        api_key="sk-benchmark",
+        http_client=httpx.AsyncClient(transport=fakes.openai_transport),
+    )
+    set_default_openai_client(openai_client, use_for_tracing=False)
+    set_tracing_disabled(True)
+
+    import utils.embeddings as embeddings
+    from utils.transcript_fetcher import transcript_fetcher
+
+    embeddings.aclient = openai_client
+    transcript_fetcher._client = httpx.AsyncClient(transport=fakes.scraper_transport)
+    return fakes
+
+
+# -----------------------------------------------------------------------------
+# Measurement helpers
+# -----------------------------------------------------------------------------
+
+def summarize(latencies: List[float], wall: float | None = None) -> Dict[str, Any]:
+    """Latency percentiles (ms) and throughput for a list of timings (s)."""
+    values = sorted(latencies)
+    n = len(values)
+
+    def pct(p: float) -> float:
+        return round(values[min(n - 1, int(p * n))] * 1000, 3) if n else 0.0
+
+    result = {
+        "count": n,
+        "mean_ms": round(sum(values) / n * 1000, 3) if n else 0.0,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": round(values[-1] * 1000, 3) if n else 0.0,
+    }
+    if wall:
+        result["wall_s"] = round(wall, 3)
+        result["ops_per_s"] = round(n / wall, 2)
+    return result
+
+
+async def timed_concurrently(
+    make_call: Callable[[int], Awaitable[Any]], total: int, concurrency: int
+) -> Dict[str, Any]:
+    """Run `make_call(i)` for i in range(total), `concurrency` at a time."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await make_call(i)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def seed_meetings(fakes: Fakes, count: int, transcript_chars: int) -> List[str]:
+    from utils.urls import canonical_meeting_key
+
+    urls = []
+    for i in range(count):
+        url = f"https://www.youtube.com/watch?v=seed{i:07d}"
+        fakes.db.tables.setdefault("meetinglist", []).append({
+            "id": next(fakes.db.ids),
+            "zoom_url": url,
+            "meeting_key": canonical_meeting_key(url),
+            "content": make_transcript(transcript_chars, seed=i),
+            "metadata": {"summary": f"Seeded meeting {i}", "attendees": ["Alice", "Bob"]},
+        })
+        urls.append(url)
+    return urls
+
+
+# -----------------------------------------------------------------------------
+# Benchmarks
+# -----------------------------------------------------------------------------
+
+async def bench_chatkit(args: argparse.Namespace, fakes: Fakes) -> Dict[str, Any]:
+    import httpx
+    from main import app, store
+    from chatkit.types import ThreadCreateParams, ThreadsCreateReq, UserMessageInput, UserMessageTextContent, InferenceOptions
+
+    def payload(text: str) -> bytes:
+        req = ThreadsCreateReq(params=ThreadCreateParams(input=UserMessageInput(
+            content=[UserMessageTextContent(text=text)],
+            attachments=[],
+            inference_options=InferenceOptions(),
+        )))
+        return req.model_dump_json().encode("utf-8")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def turn(text: str) -> None:
+            response = await client.post("/chatkit", content=payload(text))
+            response.raise_for_status()
+
+        # Warm-up (first-use imports, schema building, connection setup)
+        await turn("Hello")
+
+        db_calls = fakes.db.calls
+        question = await timed_concurrently(
+            lambda i: turn("What were the main decisions in my last meeting?"),
+            args.turns, args.concurrency,
+        )
+        question["db_calls_per_turn"] = round((fakes.db.calls - db_calls) / max(args.turns, 1), 2)
+
+        db_calls = fakes.db.calls
+        ingest = await timed_concurrently(
+            lambda i: turn(f"Please process https://www.youtube.com/watch?v=chat{i:07d}"),
+            args.turns, args.concurrency,
+        )
+        ingest["db_calls_per_turn"] = round((fakes.db.calls - db_calls) / max(args.turns, 1), 2)
+    await store.flush_all()
+    return {"question_turn": question, "ingest_turn": ingest}
+
+
+async def bench_analysis(args: argparse.Namespace, fakes: Fakes) -> Dict[str, Any]:
+    import httpx
+    from main import app
+    from utils.response_cache import analysis_cache
+
+    urls = seed_meetings(fakes, args.meetings, args.transcript_chars)
+    analysis_cache.clear()
+    transport = httpx.ASGITransport(app=app)
+    results: Dict[str, Any] = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        etags: Dict[str, str] = {}
+
+        async def fetch(i: int, conditional: bool = False) -> None:
+            url = urls[i % len(urls)]
+            headers = {"If-None-Match": etags[url]} if conditional and url in etags else {}
+            response = await client.get("/api/analysis", params={"url": url}, headers=headers)
+            if response.status_code not in (200, 304):
+                raise RuntimeError(f"/api/analysis returned {response.status_code}")
+            etags[url] = response.headers.get("etag", "")
+
+        # Cold: one request per meeting, nothing cached yet
+        results["cold"] = await timed_concurrently(fetch, len(urls), args.concurrency)
+        results["cached"] = await timed_concurrently(fetch, args.requests, args.concurrency)
+        results["conditional_304"] = await timed_concurrently(
+            lambda i: fetch(i, conditional=True), args.requests, args.concurrency
+        )
+    return results
+
+
+async def bench_index(args: argparse.Namespace, fakes: Fakes) -> Dict[str, Any]:
+    from utils.rag import index_meeting_transcript, chunk_spans
+
+    results: Dict[str, Any] = {}
+    for size in args.index_sizes:
+        transcript = make_transcript(size, seed=size)
+        meeting_id = next(fakes.db.ids)
+        fakes.db.tables.setdefault("meetinglist", []).append(
+            {"id": meeting_id, "zoom_url": f"bench://index/{size}", "content": transcript, "metadata": {}}
+        )
+        chunks = len(chunk_spans(transcript))
+
+        started = time.perf_counter()
+        message = await index_meeting_transcript(meeting_id, transcript, fakes.db, metadata={})
+        first = time.perf_counter() - started
+
+        # Same transcript again: nothing changed, nothing embedded
+        started = time.perf_counter()
+        await index_meeting_transcript(meeting_id, transcript, fakes.db, metadata={})
+        again = time.perf_counter() - started
+
+        results[str(size)] = {
+            "chars": size,
+            "chunks": chunks,
+            "first_index_s": round(first, 4),
+            "chunks_per_s": round(chunks / first, 2) if first else None,
+            "chars_per_s": round(size / first, 2) if first else None,
+            "reindex_unchanged_s": round(again, 4),
+            "message": message,
+        }
+    return results
+
+
+async def bench_store(args: argparse.Namespace, fakes: Fakes) -> Dict[str, Any]:
+    from supabase_store import SupabaseStore
+    from sqlite_store import SQLiteStore
+
+    sqlite_path = os.path.join(os.path.dirname(os.environ["CACHE_DIR"]), "chatkit_bench.sqlite3")
+    return {
+        "supabase": await _bench_store(args, SupabaseStore(fakes.db)),
+        "sqlite": await _bench_store(args, SQLiteStore(sqlite_path)),
+    }
+
+
+async def _bench_store(args: argparse.Namespace, store: Any) -> Dict[str, Any]:
+    from datetime import datetime as dt
+    from chatkit.types import AssistantMessageContent, AssistantMessageItem, ThreadMetadata
+
+    context: Dict[str, Any] = {}
+    threads = [f"thr_bench_{i}" for i in range(args.store_threads)]
+
+    async def save_thread(i: int) -> None:
+        await store.save_thread(ThreadMetadata(id=threads[i], created_at=dt.now()), context)
+
+    async def add_items(i: int) -> None:
+        thread_id = threads[i % len(threads)]
+        for j in range(args.store_items):
+            item = AssistantMessageItem(
+                id=f"msg_{i}_{j}", thread_id=thread_id, created_at=dt.now(),
+                content=[AssistantMessageContent(text=f"message {j} " * 20)],
+            )
+            await store.add_thread_item(thread_id, item, context)
+        await store.flush(thread_id)
+
+    async def load_items(i: int) -> None:
+        await store.load_thread_items(threads[i % len(threads)], None, 20, "desc", context)
+
+    async def load_threads(i: int) -> None:
+        await store.load_threads(20, None, "desc", context)
+
+    return {
+        "save_thread": await timed_concurrently(save_thread, len(threads), args.concurrency),
+        "add_items_and_flush": await timed_concurrently(add_items, len(threads), args.concurrency),
+        "load_thread_items": await timed_concurrently(load_items, args.requests, args.concurrency),
+        "load_threads": await timed_concurrently(load_threads, args.requests // 4 or 1, args.concurrency),
+    }
+
+
+RUNNERS = {
+    "chatkit": bench_chatkit,
+    "analysis": bench_analysis,
+    "index": bench_index,
+    "store": bench_store,
+}
+
+
+# -----------------------------------------------------------------------------
+# Report
+# -----------------------------------------------------------------------------
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(data: Any, prefix: str = "") -> Dict[str, float]:
+    """{"a": {"b": 1}} -> {"a.b": 1} (numbers only)."""
+    flat: Dict[str, float] = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            flat.update(flatten(value, f"{prefix}{key}."))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        flat[prefix[:-1]] = data
+    return flat
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]) -> None:
+    before, after = flatten(old["results"]), flatten(new["results"])
+    print(f"\nChange vs. {old['meta'].get('commit')} ({old['meta'].get('timestamp')}):")
+    for key in sorted(set(before) & set(after)):
+        if not (key.endswith("_ms") or key.endswith("_s") or key.endswith("per_s")):
+            continue
+        if before[key]:
+            change = (after[key] - before[key]) / before[key] * 100
+            print(f"  {key:<55} {before[key]:>12.3f} -> {after[key]:>12.3f}  ({change:+.1f}%)")
+
+
+async def run(args: argparse.Namespace, fakes: Fakes) -> Dict[str, Any]:
+    selected = args.only.split(",") if args.only else BENCHMARKS
+    results: Dict[str, Any] = {}
+    for name in selected:
+        print(f"⏱️  {name}...", file=sys.stderr)
+        results[name] = await RUNNERS[name](args, fakes)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hermetic end-to-end benchmarks.")
+    parser.add_argument("--only", help=f"comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--output", default="benchmarks/report.json", help="where to write the JSON report")
+    parser.add_argument("--compare", help="older report to compare against")
+    parser.add_argument("--db-latency", type=float, default=5.0, help="Supabase round trip (ms)")
+    parser.add_argument("--llm-latency", type=float, default=200.0, help="Responses API latency (ms)")
+    parser.add_argument("--embedding-latency", type=float, default=50.0, help="embeddings API latency (ms)")
+    parser.add_argument("--scraper-latency", type=float, default=500.0, help="transcript scraper latency (ms)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=10, help="/chatkit turns per scenario")
+    parser.add_argument("--requests", type=int, default=200, help="requests per throughput scenario")
+    parser.add_argument("--meetings", type=int, default=20, help="seeded meetings for /api/analysis")
+    parser.add_argument("--transcript-chars", type=int, default=20_000)
+    parser.add_argument("--index-sizes", type=lambda s: [int(x) for x in s.split(",")], default=[10_000, 50_000, 200_000])
+    parser.add_argument("--store-threads", type=int, default=50)
+    parser.add_argument("--chatkit-store", choices=["supabase", "sqlite"], default="supabase", help="ChatKit store behind the app")
+    parser.add_argument("--store-items", type=int, default=10)
+    args = parser.parse_args()
+
+    fakes = install_fakes(args)
+    started = time.perf_counter()
+    results = asyncio.run(run(args, fakes))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "duration_s": round(time.perf_counter() - started, 3),
+            "params": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+            "fake_calls": {"supabase": fakes.db.calls, **fakes.openai_transport.stats},
+        },
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(json.dumps(report["results"], indent=2, default=str))
+    print(f"📄 Report written to {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Bulk ingestion for backfilling meetings.
+
+Runs the same pipeline stages as the chat / job path (extract -> summarize ->
+save -> index) for many meetings at once, with bounded concurrency and an
+optional rate limit. Every finished meeting is appended to a checkpoint file
+(JSON lines); re-running with the same checkpoint skips what is already done.
+
+Usage (from backend/):
+    python bulk_ingest.py --input meetings.txt --concurrency 4 --rate 30
+
+Each input line is one of:
+    https://youtu.be/...              a meeting URL (transcript is fetched)
+    path/to/transcript.txt            a local transcript file
+    path/to/transcript.txt <URL>      a local transcript, stored under <URL>
+Blank lines and lines starting with '#' are ignored.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+
+from ingestion import IngestionError, ingest_meeting, transcript_source
+from utils.embeddings import embedding_stats
+
+
+@dataclass
+class Source:
+    key: str            # identifies the entry in the checkpoint file
+    url: str            # URL the meeting is stored under
+    path: Path | None = None
+
+
+def parse_source(line: str) -> Source:
+    parts = line.split()
+    if len(parts) == 1 and transcript_source(parts[0]):
+        return Source(key=parts[0], url=parts[0])
+
+    path = Path(parts[0]).expanduser()
+    if not path.is_file():
+        raise ValueError(f"not a supported URL or an existing file: {line}")
+    url = parts[1] if len(parts) > 1 else path.resolve().as_uri()
+    return Source(key=line, url=url, path=path)
+
+
+def read_sources(args: argparse.Namespace) -> list[Source]:
+    lines = list(args.sources)
+    if args.input:
+        with open(args.input, encoding="utf-8") as f:
+            lines.extend(f)
+    sources, seen = [], set()
+    for raw in lines:
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        source = parse_source(line)
+        if source.key not in seen:
+            seen.add(source.key)
+            sources.append(source)
+    return sources
+
+
+def load_checkpoint(path: str, retry_failed: bool) -> set[str]:
+    """Keys of entries that don't need to run again."""
+    done: set[str] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # half-written last line from an interrupted run
+            if record.get("status") == "done" or (record.get("status") == "failed" and not retry_failed):
+                done.add(record["source"])
+    return done
+
+
+class RateLimiter:
+    """Allows at most `per_minute` starts per minute, evenly spaced."""
+
+    def __init__(self, per_minute: float) -> None:
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class Report:
+    def __init__(self, total: int) -> None:
+        self.total = total
+        self.done = 0
+        self.skipped_existing = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self.start_tokens = embedding_stats.tokens
+
+    def line(self) -> str:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        tokens = embedding_stats.tokens - self.start_tokens
+        finished = self.done + self.failed
+        return (
+            f"{finished}/{self.total} finished ({self.done} ok, {self.skipped_existing} already existed, "
+            f"{self.failed} failed) in {elapsed:.0f}s | "
+            f"{self.done / elapsed * 60:.1f} meetings/min | "
+            f"{tokens} embedding tokens, {tokens / elapsed:.0f} tokens/s"
+        )
+
+
+async def run(args: argparse.Namespace) -> int:
+    sources = read_sources(args)
+    done = load_checkpoint(args.checkpoint, args.retry_failed)
+    pending = [s for s in sources if s.key not in done]
+    print(f"📋 {len(sources)} meetings, {len(sources) - len(pending)} already in checkpoint, {len(pending)} to ingest.")
+
+    report = Report(len(pending))
+    limiter = RateLimiter(args.rate)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    checkpoint_lock = asyncio.Lock()
+    checkpoint = open(args.checkpoint, "a", encoding="utf-8")
+
+    async def record(source: Source, **fields) -> None:
+        async with checkpoint_lock:
+            checkpoint.write(json.dumps({"source": source.key, "url": source.url, **fields}, default=str) + "\n")
+            checkpoint.flush()
+
+    async def ingest_one(source: Source) -> None:
+        async with semaphore:
+            await limiter.wait()
+            started = time.monotonic()
+            try:
+                transcript = source.path.read_text(encoding="utf-8") if source.path else None
+                result = await ingest_meeting(source.url, transcript=transcript)
+            except (IngestionError, OSError) as e:
+                report.failed += 1
+                print(f"❌ {source.key}: {e}")
+                await record(source, status="failed", error=str(e))
+            except Exception as e:
+                report.failed += 1
+                print(f"❌ {source.key}: unexpected error: {e!r}")
+                await record(source, status="failed", error=repr(e))
+            else:
+                report.done += 1
+                report.skipped_existing += result.already_existed
+                await record(
+                    source,
+                    status="done",
+                    meeting_id=result.meeting_id,
+                    already_existed=result.already_existed,
+                    index_message=result.index_message,
+                    seconds=round(time.monotonic() - started, 2),
+                )
+            finished = report.done + report.failed
+            if finished % max(args.report_every, 1) == 0 or finished == report.total:
+                print(f"📈 {report.line()}")
+
+    try:
+        await asyncio.gather(*(ingest_one(source) for source in pending))
+    finally:
+        checkpoint.close()
+        print(f"✅ {report.line()}")
+    return 1 if report.failed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk-ingest meetings (URLs or local transcript files).")
+    parser.add_argument("sources", nargs="*", help="URLs or transcript files (in addition to --input)")
+    parser.add_argument("-i", "--input", help="file with one URL / transcript path per line")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="meetings processed at the same time (default 4)")
+    parser.add_argument("-r", "--rate", type=float, default=0, help="max meetings started per minute (default: unlimited)")
+    parser.add_argument("--checkpoint", default="bulk_ingest.checkpoint.jsonl", help="checkpoint file (JSON lines)")
+    parser.add_argument("--retry-failed", action="store_true", help="retry entries that failed in a previous run")
+    parser.add_argument("--report-every", type=int, default=10, help="print throughput every N meetings")
+    args = parser.parse_args()
+
+    if not args.sources and not args.input:
+        parser.error("give URLs / files or --input")
+    try:
+        sys.exit(asyncio.run(run(args)))
+    except ValueError as e:
+        parser.error(str(e))
+    except KeyboardInterrupt:
+        print("\n⏸️ Interrupted. Re-run the same command to resume from the checkpoint.")
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
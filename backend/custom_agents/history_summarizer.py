@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import os
+from typing import Optional
+
+from agents import Agent, Runner
+
+INSTRUCTIONS = """
+    You maintain a running summary of a conversation between a user and a meeting assistant.
+    You get the previous summary (if any) and the turns that happened after it.
+    Return an updated summary that keeps every fact the assistant may need later:
+    meetings discussed (with URLs), questions asked, answers and decisions given,
+    and anything the user asked the assistant to remember.
+    Drop greetings, progress messages and raw tool output. Write plain text, at most 300 words.
+"""
+
+MODEL = os.environ.get("HISTORY_SUMMARY_MODEL", "gpt-4o-mini")
+
+history_summarizer_agent = Agent(
+    model=MODEL,
+    name="history_summarizer_agent",
+    instructions=INSTRUCTIONS,
+)
+
+
+async def summarize_history(previous_summary: Optional[str], turns: str) -> str:
+    """Fold `turns` (rendered as text) into `previous_summary`."""
+    prompt = f"Previous summary:\n{previous_summary or '(none)'}\n\nNew turns:\n{turns}"
+    result = await Runner.run(history_summarizer_agent, prompt)
+    return str(result.final_output).strip()
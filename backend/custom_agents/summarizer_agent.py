@@ -1,8 +1,14 @@
 from __future__ import annotations
 
-from typing import Annotated
+import os
+import re
+import json
+import asyncio
+import hashlib
+from typing import Annotated, List, Optional
 
-from agents import Agent
+from agents import Agent, Runner
+from langchain_text_splitters import RecursiveCharacterTextSplitter
 from chatkit.agents import AgentContext
 from pydantic import ConfigDict, Field
 
@@ -13,8 +19,10 @@ from utils.output_format import (
     MeetingSummaryResponse,
 )
 
-from supabase_store import SupabaseStore
-from memory_store import MemoryStore
+from utils import metrics
+from utils.disk_cache import CACHE_DIR, DiskCache
+from chatkit.store import Store
+from request_context import RequestContext
 
 INSTRUCTIONS = """
     You are an AI specialist focused on data extraction.
@@ -26,10 +34,27 @@ INSTRUCTIONS = """
 
 MODEL = "gpt-4o-mini"
 
+# Map-reduce settings: long transcripts are split into sections that are
+# summarized concurrently, then merged in code.
+SECTION_CHARS = int(os.environ.get("SUMMARY_SECTION_CHARS", "24000"))
+SECTION_OVERLAP = int(os.environ.get("SUMMARY_SECTION_OVERLAP", "500"))
+MAX_CONCURRENCY = int(os.environ.get("SUMMARY_MAX_CONCURRENCY", "4"))
+
+# Persistent cache of section summaries. Retries and re-runs of the same
+# transcript return the stored structured output without calling the model.
+summary_cache = DiskCache(
+    os.environ.get("SUMMARY_CACHE_PATH", os.path.join(CACHE_DIR, "summaries.sqlite3")),
+    max_entries=int(os.environ.get("SUMMARY_CACHE_MAX_ENTRIES", "5000")),
+)
+# Changes whenever the output schema changes, so stale entries are never reused
+SCHEMA_VERSION = hashlib.sha256(
+    json.dumps(MeetingSummaryResponse.model_json_schema(), sort_keys=True).encode("utf-8")
+).hexdigest()[:16]
+
 class SummarizerAgentContext(AgentContext):
     model_config = ConfigDict(arbitrary_types_allowed=True)
-    store: Annotated[SupabaseStore, Field(exclude=True)]
-    request_context: Annotated[MemoryStore, Field(exclude=True, default_factory=RequestContext)]
+    store: Annotated[Store, Field(exclude=True)]
+    request_context: Annotated[RequestContext, Field(exclude=True, default_factory=RequestContext)]
 
 summarizer_agent = Agent[SummarizerAgentContext](
     model=MODEL,
@@ -37,3 +62,129 @@ summarizer_agent = Agent[SummarizerAgentContext](
     instructions=INSTRUCTIONS,
     output_type=MeetingSummaryResponse,
 )
+
+
+# -----------------------------------------------------------------------------
+# Map-reduce summarization
+# -----------------------------------------------------------------------------
+
+_PRIORITY_RANK = {"low": 0, "medium": 1, "high": 2, "urgent": 3, "critical": 3}
+
+
+def _norm(text: Optional[str]) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", (text or "").lower()).strip()
+
+
+def _dedupe(values: List[str]) -> List[str]:
+    seen = set()
+    result = []
+    for value in values:
+        key = _norm(value)
+        if key and key not in seen:
+            seen.add(key)
+            result.append(value.strip())
+    return result
+
+
+def split_sections(transcript: str, section_chars: int = SECTION_CHARS) -> List[str]:
+    if len(transcript) <= section_chars:
+        return [transcript]
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=section_chars,
+        chunk_overlap=min(SECTION_OVERLAP, section_chars // 10),
+        separators=["\n\n", "\n", ".", "!", "?", " "],
+    )
+    return splitter.split_text(transcript)
+
+
+def merge_summaries(partials: List[MeetingSummaryResponse], url: str) -> MeetingSummaryResponse:
+    """Reduce step: merge partial summaries (in transcript order), de-duplicating lists."""
+    if len(partials) == 1:
+        return partials[0].model_copy(update={"url": url})
+
+    metadata = Metadata()
+    for field in Metadata.model_fields:
+        metadata_value = next((getattr(p.metadata, field) for p in partials if getattr(p.metadata, field)), None)
+        setattr(metadata, field, metadata_value)
+
+    # Action items: same task + owner is the same item; keep the most complete one
+    action_items: dict[tuple, ActionItem] = {}
+    for partial in partials:
+        for action in partial.action_items:
+            key = (_norm(action.task), _norm(action.owner))
+            if not key[0]:
+                continue
+            current = action_items.get(key)
+            if current is None or (not current.due and action.due):
+                action_items[key] = action
+
+    priorities = [p.insights.priority for p in partials if p.insights.priority]
+    priority = max(priorities, key=lambda v: _PRIORITY_RANK.get(_norm(v), -1)) if priorities else None
+
+    notes = _dedupe([p.insights.notes for p in partials if p.insights.notes])
+
+    return MeetingSummaryResponse(
+        metadata=metadata,
+        attendees=_dedupe([a for p in partials for a in p.attendees]),
+        summary="\n\n".join(_dedupe([p.summary for p in partials if p.summary])),
+        action_items=list(action_items.values()),
+        insights=Insights(
+            topics=_dedupe([t for p in partials for t in (p.insights.topics or [])]),
+            priority=priority,
+            decisions=_dedupe([d for p in partials for d in (p.insights.decisions or [])]),
+            notes="\n".join(notes) or None,
+        ),
+        url=url,
+    )
+
+
+def summary_cache_key(prompt: str) -> str:
+    """Key on the prompt content hash, the model, the instructions and the schema version."""
+    parts = [
+        hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+        MODEL,
+        hashlib.sha256(INSTRUCTIONS.encode("utf-8")).hexdigest(),
+        SCHEMA_VERSION,
+    ]
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+async def summarize_transcript(
+    url: str,
+    transcript: str,
+    section_chars: int = SECTION_CHARS,
+    max_concurrency: int = MAX_CONCURRENCY,
+) -> MeetingSummaryResponse:
+    """
+    Summarize a transcript into a MeetingSummaryResponse.
+    Sections are summarized concurrently (map) and merged in code (reduce),
+    so latency follows the longest section rather than the whole meeting.
+    Section results are cached, so a retry only pays for sections that failed.
+    """
+    sections = split_sections(transcript, section_chars)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def summarize_section(i: int, section: str) -> MeetingSummaryResponse:
+        header = ""
+        if len(sections) > 1:
+            header = f"This is part {i + 1} of {len(sections)} of the transcript.\n\n"
+        prompt = f"{header}Transcript:\n{section}"
+
+        # The URL is not part of the key: the same recording pasted as another link is a hit
+        key = summary_cache_key(prompt)
+        cached = summary_cache.get(key)
+        if cached is not None:
+            metrics.summarizer_sections.inc(cache="hit")
+            return MeetingSummaryResponse.model_validate_json(cached)
+
+        metrics.summarizer_sections.inc(cache="miss")
+        async with semaphore:
+            with metrics.summarizer_seconds.time(stage="section"):
+                result = await Runner.run(summarizer_agent, f"Meeting URL: {url}\n\n{prompt}")
+        summary: MeetingSummaryResponse = result.final_output
+        summary_cache.set(key, summary.model_dump_json().encode("utf-8"))
+        return summary
+
+    with metrics.summarizer_seconds.time(stage="total"):
+        partials = await asyncio.gather(*(summarize_section(i, s) for i, s in enumerate(sections)))
+    return merge_summaries(list(partials), url)
@@ -1,17 +1,11 @@
 from __future__ import annotations
 
 import os
-import httpx
 import json
+import logging
 from typing import Annotated, Any, List, Optional
 from pydantic import BaseModel, ConfigDict, Field
 
-# Supabase Client
-from supabase import create_client, Client
-
-# OpenAI Client
-from openai import AsyncOpenAI
-
 # ChatKit types
 from chatkit.types import ProgressUpdateEvent
 from chatkit.store import Store
@@ -22,34 +16,29 @@ from chatkit.agents import AgentContext
 
 # Local Import for RAG Logic
 from utils.rag import index_meeting_transcript
+from utils.db import supabase
+from utils.retrieval import retrieval_engine
+from utils.metrics import timed, tool_call_seconds
 
 # Import Request Context
 from request_context import RequestContext
 
 # Import Models & Sub-Agents
 from utils.output_format import MeetingSummaryResponse
-from custom_agents.summarizer_agent import summarizer_agent
-
-from meeting_store import save_meeting_url
-
-# -----------------------------------------------------------------------------
-# 1. Configuration
-# -----------------------------------------------------------------------------
-YOUTUBE_API_URL = "https://youtubecc-423771082043.us-central1.run.app"
-ZOOM_API_URL = "https://zoom-transcript-scraper-423771082043.us-central1.run.app"
-
-SUPABASE_URL = os.environ.get("SUPABASE_URL")
-SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_KEY")
-
-supabase: Client | None = None
-if SUPABASE_URL and SUPABASE_KEY:
-    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+from ingestion import (
+    IngestionError,
+    fetch_transcript,
+    find_meeting,
+    save_meeting,
+    transcript_source,
+)
+from custom_agents.summarizer_agent import summarize_transcript
 
-# Initialize OpenAI
-aclient = AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+from meeting_store import get_meeting_url, save_meeting_url
+from artifact_store import get_transcript, save_transcript
 
 # -----------------------------------------------------------------------------
-# 2. Context Definition
+# 1. Context Definition
 # -----------------------------------------------------------------------------
 class MeetingAgentContext(AgentContext):
     model_config = ConfigDict(arbitrary_types_allowed=True)
@@ -57,35 +46,35 @@ class MeetingAgentContext(AgentContext):
     request_context: Annotated[RequestContext, Field(exclude=True, default_factory=RequestContext)]
 
 # -----------------------------------------------------------------------------
-# 3. TOOLS (Server-Side Only)
+# 2. TOOLS (Server-Side Only)
 # -----------------------------------------------------------------------------
+# Every tool is timed into agent_tool_duration_seconds (see utils/metrics.py).
+# Transcripts never go through the LLM: extraction stores the text server-side
+# and returns a short `transcript_id` that the other tools resolve in process.
+
+TRANSCRIPT_PREVIEW_CHARS = 300
+UNKNOWN_TRANSCRIPT = "Error: Unknown or expired transcript_id. Call extract_transcript_tool again."
+
+logger = logging.getLogger(__name__)
 
 @function_tool(description_override="Check if a meeting already exists in the database by URL.")
+@timed(tool_call_seconds, tool="check_existing_meeting")
 async def check_existing_meeting(ctx: RunContextWrapper[MeetingAgentContext], url: str) -> dict[str, Any]:
     """
     Tool to check if a meeting already exists in the database.
     If found, save the meeting URL to the current thread context.
     """
-    print(f"[TOOL CALL] check_existing_meeting")
+    logger.info("Tool call: check_existing_meeting")
     await ctx.context.stream(ProgressUpdateEvent(text="Checking if meeting exists..."))
 
-    if not supabase:
-        raise HTTPException(status_code=500, detail="Database not initialized")
-
-    # Query meetinglist for exact URL match
-    result = (
-        supabase.table("meetinglist")
-        .select("*")
-        .eq("zoom_url", url)
-        .execute()
-    )
-
-    if result.data and len(result.data) > 0:
-        # Meeting already exists
-        meeting = result.data[0]
+    try:
+        meeting = await find_meeting(url)
+    except IngestionError as e:
+        return {"error": str(e)}
 
+    if meeting:
         # Save the URL in the agent's thread context
-        save_meeting_url(ctx.context.thread.id, url)
+        await save_meeting_url(ctx.context.thread.id, url)
 
         return {
             "found": True,
@@ -98,116 +87,128 @@ async def check_existing_meeting(ctx: RunContextWrapper[MeetingAgentContext], ur
     return {"found": False}
 
 @function_tool(description_override="Extract transcript from a YouTube or Zoom URL.")
+@timed(tool_call_seconds, tool="extract_transcript_tool")
 async def extract_transcript_tool(
     ctx: RunContextWrapper[MeetingAgentContext],
     url: str,
 ) -> dict[str, Any]:
-    print(f"[TOOL CALL] extract_transcript_tool: {url}")
+    logger.info("Tool call: extract_transcript_tool %s", url)
     await ctx.context.stream(ProgressUpdateEvent(text=f"Extracting transcript..."))
 
-    target_url = ""
-    params = {}
-    if "youtube.com" in url or "youtu.be" in url:
-        target_url = YOUTUBE_API_URL
-        params = {"url": url}
-    elif "zoom.us" in url:
-        target_url = ZOOM_API_URL
-        params = {"url": url} 
-    else:
+    if not transcript_source(url):
         return {"error": "Unsupported URL type."}
 
     # --- SAVE THE URL FOR LATER ---
-    save_meeting_url(ctx.context.thread.id, url)
-
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(target_url, params=params, timeout=60.0)
-            response.raise_for_status()
-            data = response.json()
-            transcript_text = data.get("transcript", "")
-            return {"transcript": transcript_text}
-        except httpx.HTTPError as e:
-            return {"error": f"Failed to fetch transcript: {str(e)}"}
+    await save_meeting_url(ctx.context.thread.id, url)
+
+    try:
+        transcript_text = await fetch_transcript(url)
+    except IngestionError as e:
+        return {"error": str(e)}
+
+    return {
+        "transcript_id": save_transcript(transcript_text),
+        "characters": len(transcript_text),
+        "preview": transcript_text[:TRANSCRIPT_PREVIEW_CHARS],
+    }
+
+@function_tool(description_override="Takes a transcript_id and returns a JSON summary matching the schema.")
+@timed(tool_call_seconds, tool="summarize_transcript_tool")
+async def summarize_transcript_tool(
+    ctx: RunContextWrapper[MeetingAgentContext],
+    url: str,
+    transcript_id: str,
+) -> MeetingSummaryResponse | str:
+    logger.info("Tool call: summarize_transcript_tool")
+    await ctx.context.stream(ProgressUpdateEvent(text="Summarizing transcript..."))
+
+    transcript = get_transcript(transcript_id)
+    if transcript is None:
+        return UNKNOWN_TRANSCRIPT
+
+    return await summarize_transcript(url, transcript)
 
 @function_tool(description_override="Save meeting summary to Supabase.")
+@timed(tool_call_seconds, tool="save_meeting_tool")
 async def save_meeting_tool(
     ctx: RunContextWrapper[MeetingAgentContext],
     url: str,
-    transcript: str,
+    transcript_id: str,
     summary: MeetingSummaryResponse,
 ) -> str:
-    print(f"[TOOL CALL] save_meeting_tool")
-    await ctx.context.stream(ProgressUpdateEvent(text="Generating summary embedding..."))
-    
-    if not supabase:
-        return "Error: Supabase not configured."
+    logger.info("Tool call: save_meeting_tool")
+    await ctx.context.stream(ProgressUpdateEvent(text="Saving to database..."))
 
-    # 1. Generate Embedding
-    summary_text_to_embed = summary.model_dump_json()
-    embedding_vector = None
-    try:
-        response = await aclient.embeddings.create(
-            input=summary_text_to_embed,
-            model="text-embedding-3-small"
-        )
-        embedding_vector = response.data[0].embedding
-    except Exception as e:
-        print(f"Embedding generation failed: {e}")
+    transcript = get_transcript(transcript_id)
+    if transcript is None:
+        return UNKNOWN_TRANSCRIPT
 
-    # 2. Save Data
-    await ctx.context.stream(ProgressUpdateEvent(text="Saving to database..."))
-    data = {
-        "zoom_url": url ,
-        "content": transcript,
-        "metadata": summary.model_dump(),
-        "embedding": embedding_vector 
-    }
-    
     try:
-        supabase.table("meetinglist").upsert(data, on_conflict="zoom_url").execute()
+        await save_meeting(url, transcript, summary)
         return "Successfully saved meeting with search index."
-    except Exception as e:
-        return f"Database Error: {str(e)}"
+    except IngestionError as e:
+        return str(e)
 
 @function_tool(description_override="Process transcript into vector chunks for RAG search.")
+@timed(tool_call_seconds, tool="process_rag_tool")
 async def process_rag_tool(
     ctx: RunContextWrapper[MeetingAgentContext],
     url: str,
-    transcript: str,
+    transcript_id: str,
 ) -> str:
-    print(f"[TOOL CALL] process_rag_tool")
+    logger.info("Tool call: process_rag_tool")
     await ctx.context.stream(ProgressUpdateEvent(text="Generating knowledge base..."))
 
-    if not supabase:
-        return "Error: Supabase not configured."
+    transcript = get_transcript(transcript_id)
+    if transcript is None:
+        return UNKNOWN_TRANSCRIPT
 
     try:
-        # Retry logic just in case
-        meeting_id = None
-        for attempt in range(5):
-            response = (
-                supabase.table("meetinglist")
-                .select("id")
-                .eq("zoom_url", url)
-                .execute()
-            )
-            rows = response.data or []
-            if rows:
-                meeting_id = rows[0]["id"]
-                break
-            await asyncio.sleep(0.2)
-
-        if meeting_id is None:
-            return "Error: Meeting not found after retries."
-
-        result_message = await index_meeting_transcript(meeting_id, transcript, supabase)
+        meeting = await find_meeting(url)
+        if meeting is None:
+            return "Error: Meeting not found. Call save_meeting_tool first."
+
+        result_message = await index_meeting_transcript(meeting["id"], transcript, supabase)
         return result_message
 
     except Exception as e:
         return f"RAG Processing Failed: {str(e)}"
 
+@function_tool(description_override="Search meeting transcripts for passages relevant to a question.")
+@timed(tool_call_seconds, tool="search_meetings_tool")
+async def search_meetings_tool(
+    ctx: RunContextWrapper[MeetingAgentContext],
+    query: str,
+    all_meetings: bool = False,
+) -> dict[str, Any]:
+    """
+    Hybrid (vector + keyword) search over indexed transcript chunks.
+    Searches the meeting of the current thread, or every meeting if
+    `all_meetings` is true (or the thread has no meeting yet).
+    """
+    logger.info("Tool call: search_meetings_tool %s", query)
+    await ctx.context.stream(ProgressUpdateEvent(text="Searching meeting transcripts..."))
+
+    if not supabase:
+        return {"error": "Supabase not configured."}
+
+    meeting_id = None
+    url = None if all_meetings else await get_meeting_url(ctx.context.thread.id)
+    if url:
+        meeting = await find_meeting(url)
+        if meeting:
+            meeting_id = meeting["id"]
+
+    results = await retrieval_engine.search(supabase, query, meeting_id=meeting_id, k=5)
+    return {
+        "results": [
+            {"meeting_id": r["meeting_id"], "chunk_index": r["chunk_index"], "content": r["content"]}
+            for r in results
+        ]
+    }
+
 # -----------------------------------------------------------------------------
-# 4. MAIN AGENT: The Orchestrator
+# 3. MAIN AGENT: The Orchestrator
 # -----------------------------------------------------------------------------
 transcript_maker_agent = Agent[MeetingAgentContext](
     model="gpt-4o-mini",
@@ -217,20 +218,24 @@ transcript_maker_agent = Agent[MeetingAgentContext](
 
     # STEP 0 — INPUT ANALYSIS
     1. Look for a valid meeting URL (Zoom, YouTube).
-    2. IF NO valid URL is found: Simply ask for one.
+    2. IF NO valid URL is found:
+       - If the user asks a question about a meeting, call `search_meetings_tool(query)` and answer ONLY from the returned passages.
+       - Otherwise, simply ask for a URL.
     3. IF a URL IS found: Check if the meeting already exists in the database. call `check_existing_meeting(url)` and return wihtout further processing.
     4. IF THE MEETING DOES NOT EXIST: Proceed WITH THE WORKFLOW BELOW.
 
     # STRICT WORKFLOW
     You MUST execute ALL the following steps IN ORDER:
 
-    1. **Extraction**: Call `extract_transcript_tool(url)`. pass the user provided URL to get the raw transcript.
+    1. **Extraction**: Call `extract_transcript_tool(url)`. pass the user provided URL. It returns a `transcript_id` (the transcript itself stays on the server).
     
-    2. **Analysis**: Call `summarize_transcript_tool` to analyze the extracted transcript.
+    2. **Analysis**: Call `summarize_transcript_tool(url, transcript_id)` to analyze the extracted transcript.
+
+    3. **Persistence**: Call `save_meeting_tool(url, transcript_id, summary)`. This saves the data to the database.
 
-    3. **Persistence**: Call `save_meeting_tool`. This saves the data to the database.
+    4. **Indexing**: Call `process_rag_tool(url, transcript_id)` to index for search.
 
-    4. **Indexing**: Call `process_rag_tool` to index for search.
+    Always pass the `transcript_id` exactly as returned. Never try to copy or rewrite the transcript text.
 
     5. **Final Response**:
        Respond with a short confirmation:
@@ -241,10 +246,8 @@ transcript_maker_agent = Agent[MeetingAgentContext](
         extract_transcript_tool,
         save_meeting_tool,
         process_rag_tool,
-        summarizer_agent.as_tool(
-            tool_name="summarize_transcript_tool",
-            tool_description="Takes a raw transcript and returns a perfect JSON summary matching the schema."
-        )
+        search_meetings_tool,
+        summarize_transcript_tool,
     ],
     # No StopAtTools needed anymore. The agent runs straight through!
 )
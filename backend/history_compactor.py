@@ -0,0 +1,218 @@
+# history_compactor.py
+"""
+Token-budgeted history for the orchestrator agent.
+
+Recent items are sent as they are, newest first, until HISTORY_TOKEN_BUDGET
+is used up. Older items are folded into a rolling summary, stored in the
+thread as a HiddenContextItem ({"history_summary": ..., "through": <item id>,
+"through_at": <its created_at>}), so the prompt stops growing with the thread:
+
+- a fold starts when more than 2 * HISTORY_KEEP_RECENT items are not covered
+  by the summary (the oldest ones are folded, HISTORY_KEEP_RECENT are kept),
+  or when uncovered items no longer fit the budget
+- folds run in the background with a small model, at most one per thread;
+  the turn that triggers one is not delayed by it. The prompt never goes
+  over the budget: older items that don't fit are left out until the fold
+  has summarized them (only the newest item is always sent, whatever its
+  size)
+- items at or before the summary's `through` item are never sent again,
+  even when that item is no longer in the history window
+- bulky tool payloads (client tool output, widget JSON) are capped by the
+  converter (thread_item_converter.py), not sent in full
+"""
+import os
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from chatkit.store import Store
+from chatkit.types import HiddenContextItem, ThreadItem, ThreadMetadata
+
+from agent_input_cache import AGENT_INPUT_CACHE_MAX_THREADS, ItemInput
+from custom_agents.history_summarizer import summarize_history
+from thread_item_converter import HISTORY_SUMMARY_KEY, history_summary_input
+from utils import metrics
+
+HISTORY_TOKEN_BUDGET = int(os.environ.get("HISTORY_TOKEN_BUDGET", "6000"))
+HISTORY_KEEP_RECENT = int(os.environ.get("HISTORY_KEEP_RECENT", "8"))
+# Per message part when rendering turns for the summarizer
+RENDER_MAX_CHARS = 2000
+
+logger = logging.getLogger(__name__)
+
+
+def is_history_summary(item: ThreadItem) -> bool:
+    return (
+        isinstance(item, HiddenContextItem)
+        and isinstance(item.content, dict)
+        and HISTORY_SUMMARY_KEY in item.content
+    )
+
+
+def _clip(text: str, limit: int = RENDER_MAX_CHARS) -> str:
+    return text if len(text) <= limit else text[:limit] + f" [... {len(text) - limit} more characters]"
+
+
+def render_turns(item_inputs: List[list]) -> str:
+    """Agent input items as plain "role: text" lines for the summarizer."""
+    lines: List[str] = []
+    for item_input in item_inputs:
+        for part in item_input:
+            kind = part.get("type", "message")
+            if kind == "message":
+                content = part.get("content")
+                texts = [content] if isinstance(content, str) else [c.get("text", "") for c in content or []]
+                lines.append(f"{part.get('role', 'user')}: {_clip(' '.join(t for t in texts if t))}")
+            elif kind == "function_call":
+                lines.append(f"tool call: {part.get('name')}({_clip(part.get('arguments', ''), 200)})")
+            elif kind == "function_call_output":
+                lines.append(f"tool output: {_clip(str(part.get('output', '')), 200)}")
+    return "\n".join(lines)
+
+
+def _after_summary(
+    summary: HiddenContextItem, uncovered: List[Tuple[ThreadItem, ItemInput]]
+) -> List[Tuple[ThreadItem, ItemInput]]:
+    """The items of `uncovered` that come after the last item `summary` covers."""
+    ids = [item.id for item, _ in uncovered]
+    through = summary.content.get("through")
+    if through in ids:
+        return uncovered[ids.index(through) + 1:]
+    # The covered item has left the window: compare creation times instead
+    # (summaries written before `through_at` existed fall back to their own)
+    through_at = summary.content.get("through_at")
+    cutoff = datetime.fromisoformat(through_at) if through_at else summary.created_at
+    return [(item, item_input) for item, item_input in uncovered if item.created_at > cutoff]
+
+
+class HistoryCompactor:
+    """Builds each turn's agent input; also a store listener, to track summaries."""
+
+    def __init__(
+        self,
+        store: Store,
+        token_budget: int = HISTORY_TOKEN_BUDGET,
+        keep_recent: int = HISTORY_KEEP_RECENT,
+        max_threads: int = AGENT_INPUT_CACHE_MAX_THREADS,
+    ) -> None:
+        self.store = store
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.max_threads = max_threads
+        # Latest summary per thread, for when its item has left the history window
+        self._summaries: "OrderedDict[str, HiddenContextItem]" = OrderedDict()
+        self._folding: Dict[str, asyncio.Task] = {}
+
+    def _remember(self, thread_id: str, summary: HiddenContextItem) -> None:
+        self._summaries[thread_id] = summary
+        self._summaries.move_to_end(thread_id)
+        while len(self._summaries) > self.max_threads:
+            self._summaries.popitem(last=False)
+
+    # -- Store listener (store_events.py) ----------------------------------
+
+    def item_saved(self, thread_id: str, item: ThreadItem) -> None:
+        if is_history_summary(item):
+            self._remember(thread_id, item)
+
+    def item_deleted(self, thread_id: str, item_id: str) -> None:
+        summary = self._summaries.get(thread_id)
+        if summary is not None and summary.id == item_id:
+            del self._summaries[thread_id]
+
+    def thread_deleted(self, thread_id: str) -> None:
+        self._summaries.pop(thread_id, None)
+
+    def compact(
+        self,
+        thread: ThreadMetadata,
+        items: List[ThreadItem],
+        item_inputs: List[ItemInput],
+        context: Any,
+    ) -> list:
+        """Agent input for a turn: rolling summary + the recent items that fit the budget."""
+        summary: Optional[HiddenContextItem] = next((i for i in reversed(items) if is_history_summary(i)), None)
+        if summary is not None:
+            known = self._summaries.get(thread.id)
+            if known is None or known.created_at <= summary.created_at:
+                self._remember(thread.id, summary)
+        summary = self._summaries.get(thread.id)
+
+        # Items the summary doesn't cover yet, oldest first
+        uncovered: List[Tuple[ThreadItem, ItemInput]] = [
+            (item, item_input) for item, item_input in zip(items, item_inputs) if not is_history_summary(item)
+        ]
+        if summary is not None:
+            uncovered = _after_summary(summary, uncovered)
+
+        kept, tokens = 0, 0
+        for _, (_, item_tokens) in reversed(uncovered):
+            if kept and tokens + item_tokens > self.token_budget:
+                break
+            kept += 1
+            tokens += item_tokens
+
+        fold_count = len(uncovered) - kept
+        if len(uncovered) > 2 * self.keep_recent:
+            fold_count = max(fold_count, len(uncovered) - self.keep_recent)
+        if fold_count:
+            self._schedule_fold(thread, summary, uncovered[:fold_count], context)
+
+        # Only what fits the budget; the fold catches up with the rest
+        output: list = []
+        if summary is not None:
+            output.append(history_summary_input(summary.content[HISTORY_SUMMARY_KEY]))
+        for _, (item_input, _) in uncovered[len(uncovered) - kept:]:
+            output.extend(item_input)
+        metrics.agent_input_tokens.observe(tokens)
+        return output
+
+    # -- Background folding -------------------------------------------------
+
+    def _schedule_fold(
+        self,
+        thread: ThreadMetadata,
+        summary: Optional[HiddenContextItem],
+        folded: List[Tuple[ThreadItem, ItemInput]],
+        context: Any,
+    ) -> None:
+        if thread.id in self._folding:
+            return  # the next turn picks up whatever this one misses
+        task = asyncio.create_task(self._fold(thread, summary, folded, context))
+        self._folding[thread.id] = task
+        task.add_done_callback(lambda _: self._folding.pop(thread.id, None))
+
+    async def _fold(
+        self,
+        thread: ThreadMetadata,
+        summary: Optional[HiddenContextItem],
+        folded: List[Tuple[ThreadItem, ItemInput]],
+        context: Any,
+    ) -> None:
+        previous = summary.content[HISTORY_SUMMARY_KEY] if summary is not None else None
+        try:
+            text = await summarize_history(previous, render_turns([item_input for _, (item_input, _) in folded]))
+            item = HiddenContextItem(
+                id=self.store.generate_item_id("sdk_hidden_context", thread, context),
+                thread_id=thread.id,
+                created_at=datetime.now(),
+                content={
+                    HISTORY_SUMMARY_KEY: text,
+                    "through": folded[-1][0].id,
+                    "through_at": folded[-1][0].created_at.isoformat(),
+                },
+            )
+            await self.store.add_thread_item(thread.id, item, context)
+        except Exception as e:
+            metrics.history_summaries.inc(result="error")
+            logger.warning("History summary for thread %s failed: %s", thread.id, e)
+            return
+        metrics.history_summaries.inc(result="ok")
+        self._remember(thread.id, item)
+
+    async def aclose(self) -> None:
+        """Wait for running folds (e.g. on shutdown)."""
+        if self._folding:
+            await asyncio.gather(*self._folding.values(), return_exceptions=True)
@@ -0,0 +1,538 @@
+"""
+Background ingestion jobs.
+
+`POST /api/ingest` (and chat messages with a meeting URL) submit a job; a
+bounded pool of asyncio workers runs the ingestion pipeline, independent of
+the request that submitted it. Jobs and their progress events live in a
+local SQLite file shared by every worker process of the server:
+
+- workers claim jobs atomically and hold them under a lease they renew
+  while running. Jobs of a process that stopped or died are claimed again
+  by one worker once their lease runs out
+- one unfinished job per meeting, enforced by the store, so the same URL
+  posted to two processes joins the same job
+- events are appended to their own table; subscribers in any process
+  follow them from there
+"""
+
+from __future__ import annotations
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterator, Iterator
+
+from ingestion import IngestionError, ingest_meeting, transcript_source
+from utils.urls import canonical_meeting_key
+
+logger = logging.getLogger(__name__)
+
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", "2"))
+# Max queued + running jobs; submissions beyond this are rejected
+INGEST_MAX_PENDING = int(os.environ.get("INGEST_MAX_PENDING", "100"))
+INGEST_JOBS_PATH = os.environ.get(
+    "INGEST_JOBS_PATH",
+    os.path.join(os.path.dirname(__file__), ".data", "ingest_jobs.sqlite3"),
+)
+# A running job whose lease isn't renewed for this long is claimed again
+INGEST_JOB_LEASE = float(os.environ.get("INGEST_JOB_LEASE", "30"))
+# How often idle workers and event subscribers look for work from other processes
+INGEST_POLL_INTERVAL = float(os.environ.get("INGEST_POLL_INTERVAL", "1.0"))
+# Finished jobs (and their events) are deleted after this many seconds
+INGEST_JOB_RETENTION = float(os.environ.get("INGEST_JOB_RETENTION", str(7 * 24 * 3600)))
+PRUNE_INTERVAL = 3600
+
+QUEUED = "queued"
+RUNNING = "running"
+CANCELLING = "cancelling"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+UNFINISHED = (QUEUED, RUNNING, CANCELLING)
+FINISHED = {SUCCEEDED, FAILED, CANCELLED}
+
+
+class QueueFullError(Exception):
+    """Too many pending ingestion jobs."""
+
+
+@dataclass
+class IngestJob:
+    id: str
+    url: str
+    meeting_key: str
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    meeting_id: Any = None
+    already_existed: bool = False
+    index_message: str = ""
+    error: str | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def public(self) -> dict[str, Any]:
+        """The job as returned by the API."""
+        return asdict(self)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingest_jobs (
+    id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    meeting_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    meeting_id,
+    already_existed INTEGER NOT NULL DEFAULT 0,
+    index_message TEXT NOT NULL DEFAULT '',
+    error TEXT,
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ingest_jobs_status ON ingest_jobs (status, created_at);
+CREATE UNIQUE INDEX IF NOT EXISTS ingest_jobs_unfinished_key
+    ON ingest_jobs (meeting_key) WHERE status IN ('queued', 'running', 'cancelling');
+CREATE TABLE IF NOT EXISTS ingest_job_events (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+) WITHOUT ROWID;
+"""
+JOB_COLUMNS = "id, url, meeting_key, status, created_at, updated_at, meeting_id, already_existed, index_message, error"
+
+
+def _job(row: tuple) -> IngestJob:
+    job = IngestJob(*row)
+    job.already_existed = bool(job.already_existed)
+    return job
+
+
+class JobStore:
+    """
+    Jobs and their events in a local SQLite file (WAL mode), shared by every
+    process of the server. Writes run in `BEGIN IMMEDIATE` transactions, so
+    the read-then-write steps below are atomic across processes too.
+    """
+
+    def __init__(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # -- Events --------------------------------------------------------------
+
+    @staticmethod
+    def _append(conn: sqlite3.Connection, job_id: str, event: dict[str, Any]) -> dict[str, Any]:
+        (seq,) = conn.execute(
+            "SELECT COALESCE(MAX(seq), -1) + 1 FROM ingest_job_events WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        event = {"seq": seq, "job_id": job_id, **event}
+        conn.execute(
+            "INSERT INTO ingest_job_events (job_id, seq, data) VALUES (?, ?, ?)",
+            (job_id, seq, json.dumps(event, default=str)),
+        )
+        return event
+
+    def append_event(self, job_id: str, event: dict[str, Any]) -> None:
+        with self._transaction() as conn:
+            self._append(conn, job_id, event)
+
+    def events_after(self, job_id: str, seq: int) -> list[dict[str, Any]]:
+        rows = self._query(
+            "SELECT data FROM ingest_job_events WHERE job_id = ? AND seq > ? ORDER BY seq", (job_id, seq)
+        )
+        return [json.loads(data) for (data,) in rows]
+
+    # -- Jobs ----------------------------------------------------------------
+
+    def load(self, job_id: str) -> IngestJob | None:
+        rows = self._query(f"SELECT {JOB_COLUMNS} FROM ingest_jobs WHERE id = ?", (job_id,))
+        return _job(rows[0]) if rows else None
+
+    def submit(self, url: str, meeting_key: str, max_pending: int) -> tuple[IngestJob, bool]:
+        """The unfinished job for `meeting_key`, or a new queued one. Returns (job, created)."""
+        with self._transaction() as conn:
+            rows = conn.execute(
+                f"SELECT {JOB_COLUMNS} FROM ingest_jobs WHERE meeting_key = ? AND status IN (?, ?, ?)",
+                (meeting_key, *UNFINISHED),
+            ).fetchall()
+            if rows:
+                return _job(rows[0]), False
+
+            (pending,) = conn.execute(
+                "SELECT COUNT(*) FROM ingest_jobs WHERE status IN (?, ?, ?)", UNFINISHED
+            ).fetchone()
+            if pending >= max_pending:
+                raise QueueFullError("Too many ingestion jobs in progress, try again later.")
+
+            job = IngestJob(id="job_" + uuid.uuid4().hex, url=url, meeting_key=meeting_key)
+            conn.execute(
+                f"INSERT INTO ingest_jobs ({JOB_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", _job_values(job)
+            )
+            self._append(conn, job.id, {"event": "status", "status": QUEUED})
+            return job, True
+
+    def claim(self, owner: str, lease: float) -> tuple[IngestJob, bool] | None:
+        """
+        Take the oldest queued job (or one whose owner's lease ran out) and
+        mark it running under `owner`. Returns (job, resumed), or None.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            while True:
+                rows = conn.execute(
+                    f"SELECT {JOB_COLUMNS}, attempts FROM ingest_jobs"
+                    " WHERE status = ? OR (status IN (?, ?) AND lease_expires < ?)"
+                    " ORDER BY created_at LIMIT 1",
+                    (QUEUED, RUNNING, CANCELLING, now),
+                ).fetchall()
+                if not rows:
+                    return None
+                job, attempts = _job(rows[0][:-1]), rows[0][-1]
+
+                if job.status == CANCELLING:
+                    # Its owner went away after the job was cancelled: don't start it again
+                    job.status, job.updated_at = CANCELLED, now
+                    self._update(conn, job)
+                    self._append(conn, job.id, {"event": "status", **job.public()})
+                    continue
+
+                job.status, job.updated_at = RUNNING, now
+                conn.execute(
+                    "UPDATE ingest_jobs SET status = ?, updated_at = ?, owner = ?, lease_expires = ?,"
+                    " attempts = attempts + 1 WHERE id = ?",
+                    (RUNNING, now, owner, now + lease, job.id),
+                )
+                resumed = attempts > 0
+                self._append(conn, job.id, {"event": "status", "status": RUNNING, **({"resumed": True} if resumed else {})})
+                return job, resumed
+
+    def renew(self, job_id: str, owner: str, lease: float) -> str | None:
+        """Extend `owner`'s lease. Returns the job's status, or None if `owner` no longer holds it."""
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT status FROM ingest_jobs WHERE id = ? AND owner = ? AND status IN (?, ?)",
+                (job_id, owner, RUNNING, CANCELLING),
+            ).fetchall()
+            if not rows:
+                return None
+            conn.execute("UPDATE ingest_jobs SET lease_expires = ? WHERE id = ?", (time.time() + lease, job_id))
+            return rows[0][0]
+
+    def request_cancel(self, job_id: str) -> IngestJob | None:
+        """Cancel a queued job; mark a running one `cancelling` (its owner finishes it)."""
+        with self._transaction() as conn:
+            rows = conn.execute(f"SELECT {JOB_COLUMNS} FROM ingest_jobs WHERE id = ?", (job_id,)).fetchall()
+            if not rows:
+                return None
+            job = _job(rows[0])
+            if job.status == QUEUED:
+                job.status, job.updated_at = CANCELLED, time.time()
+                self._update(conn, job)
+                self._append(conn, job.id, {"event": "status", **job.public()})
+            elif job.status == RUNNING:
+                job.status, job.updated_at = CANCELLING, time.time()
+                self._update(conn, job)
+                self._append(conn, job.id, {"event": "status", "status": CANCELLING})
+            return job
+
+    def finish(self, job: IngestJob, owner: str) -> bool:
+        """Store the outcome of a job `owner` ran. False if another worker has taken it over."""
+        with self._transaction() as conn:
+            rows = conn.execute("SELECT 1 FROM ingest_jobs WHERE id = ? AND owner = ?", (job.id, owner)).fetchall()
+            if not rows:
+                return False
+            self._update(conn, job)
+            conn.execute("UPDATE ingest_jobs SET owner = NULL, lease_expires = NULL WHERE id = ?", (job.id,))
+            self._append(conn, job.id, {"event": "status", **job.public()})
+            return True
+
+    def release(self, owner: str) -> None:
+        """Hand `owner`'s unfinished jobs back (on shutdown), so another worker picks them up at once."""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE ingest_jobs SET status = ?, owner = NULL, lease_expires = NULL WHERE owner = ? AND status = ?",
+                (QUEUED, owner, RUNNING),
+            )
+            conn.execute(
+                "UPDATE ingest_jobs SET owner = NULL, lease_expires = 0 WHERE owner = ? AND status = ?",
+                (owner, CANCELLING),
+            )
+
+    def prune(self, before: float) -> int:
+        """Delete jobs that finished before `before`, with their events."""
+        with self._transaction() as conn:
+            finished = tuple(FINISHED)
+            conn.execute(
+                "DELETE FROM ingest_job_events WHERE job_id IN"
+                " (SELECT id FROM ingest_jobs WHERE status IN (?, ?, ?) AND updated_at < ?)",
+                (*finished, before),
+            )
+            return conn.execute(
+                "DELETE FROM ingest_jobs WHERE status IN (?, ?, ?) AND updated_at < ?", (*finished, before)
+            ).rowcount
+
+    @staticmethod
+    def _update(conn: sqlite3.Connection, job: IngestJob) -> None:
+        conn.execute(
+            "UPDATE ingest_jobs SET status = ?, updated_at = ?, meeting_id = ?, already_existed = ?,"
+            " index_message = ?, error = ? WHERE id = ?",
+            (job.status, job.updated_at, job.meeting_id, job.already_existed, job.index_message, job.error, job.id),
+        )
+
+
+def _job_values(job: IngestJob) -> tuple:
+    return (
+        job.id, job.url, job.meeting_key, job.status, job.created_at, job.updated_at,
+        job.meeting_id, job.already_existed, job.index_message, job.error,
+    )
+
+
+@dataclass
+class _Run:
+    """A job running in this process."""
+    task: asyncio.Task | None = None
+    # Past the point of no return: the save + index stage has started
+    saving: bool = False
+    cancelled: bool = False
+    lost: bool = False
+
+
+class IngestJobQueue:
+    """
+    Job queue backed by `JobStore`, with a fixed pool of asyncio workers per process.
+
+    - idempotent per meeting: submitting a URL while a job for the same
+      meeting is unfinished returns that job, whichever process runs it
+    - cancellable: queued jobs are cancelled at once; running jobs become
+      `cancelling` and are stopped, unless they have started saving, in
+      which case they finish (and report) normally. The meeting stays
+      reserved for the job until then
+    - observable: `events(job_id)` replays past events, then follows live ones
+    """
+
+    def __init__(self, store: JobStore, workers: int = INGEST_WORKERS, max_pending: int = INGEST_MAX_PENDING) -> None:
+        self.store = store
+        self.workers = workers
+        self.max_pending = max_pending
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wakeup = asyncio.Event()
+        self._running: dict[str, _Run] = {}
+        self._subscribers: dict[str, set[asyncio.Event]] = {}
+        self._workers: list[asyncio.Task] = []
+        self._pruned_at = 0.0
+
+    def start(self) -> None:
+        """Start the workers (needs a running event loop; safe to call repeatedly)."""
+        if self._workers:
+            return
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        # Interrupted jobs are queued again for the next worker (here or in another process)
+        await asyncio.to_thread(self.store.release, self.owner)
+
+    # --- Submitting and inspecting jobs ---
+
+    async def submit(self, url: str) -> tuple[IngestJob, bool]:
+        """Queue an ingestion for `url`. Returns (job, created)."""
+        if not transcript_source(url):
+            raise IngestionError("Unsupported URL type.")
+
+        self.start()
+        job, created = await asyncio.to_thread(
+            self.store.submit, url, canonical_meeting_key(url), self.max_pending
+        )
+        if created:
+            self._wakeup.set()
+        return job, created
+
+    async def get(self, job_id: str) -> IngestJob | None:
+        return await asyncio.to_thread(self.store.load, job_id)
+
+    async def cancel(self, job_id: str) -> IngestJob | None:
+        job = await asyncio.to_thread(self.store.request_cancel, job_id)
+        if job is not None:
+            self._notify(job_id)
+            if job.status == CANCELLING:
+                # Running here: stop it now. Elsewhere: its owner sees it on the next lease renewal
+                self._interrupt(job_id)
+        return job
+
+    async def events(self, job_id: str) -> AsyncIterator[dict[str, Any]]:
+        """Every event of a job, from the first one until it finishes."""
+        wake = asyncio.Event()
+        self._subscribers.setdefault(job_id, set()).add(wake)
+        try:
+            last_seq = -1
+            while True:
+                wake.clear()
+                # A job's final status and its last event are written together,
+                # so once the job reads as finished its events are complete
+                job = await asyncio.to_thread(self.store.load, job_id)
+                if job is None:
+                    return
+                for event in await asyncio.to_thread(self.store.events_after, job_id, last_seq):
+                    last_seq = event["seq"]
+                    yield event
+                if job.finished:
+                    return
+                try:
+                    await asyncio.wait_for(wake.wait(), INGEST_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass  # published by another process
+        finally:
+            subscribers = self._subscribers.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(wake)
+                if not subscribers:
+                    del self._subscribers[job_id]
+
+    # --- Internals ---
+
+    def _notify(self, job_id: str) -> None:
+        for wake in self._subscribers.get(job_id, ()):
+            wake.set()
+
+    async def _publish(self, job_id: str, event: dict[str, Any]) -> None:
+        await asyncio.to_thread(self.store.append_event, job_id, event)
+        self._notify(job_id)
+
+    def _interrupt(self, job_id: str) -> None:
+        run = self._running.get(job_id)
+        if run is None or run.cancelled:
+            return
+        run.cancelled = True
+        if not run.saving and run.task is not None:
+            run.task.cancel()
+
+    async def _heartbeat(self, job: IngestJob, run: _Run) -> None:
+        while True:
+            await asyncio.sleep(INGEST_JOB_LEASE / 3)
+            try:
+                status = await asyncio.to_thread(self.store.renew, job.id, self.owner, INGEST_JOB_LEASE)
+            except Exception as e:
+                logger.warning("Renewing the lease of ingestion job %s failed: %s", job.id, e)
+                continue
+            if status is None:
+                # Our lease ran out and another worker took the job over
+                run.lost = True
+                if run.task is not None:
+                    run.task.cancel()
+                return
+            if status == CANCELLING:
+                self._interrupt(job.id)
+
+    async def _prune(self) -> None:
+        if time.monotonic() - self._pruned_at < PRUNE_INTERVAL:
+            return
+        self._pruned_at = time.monotonic()
+        try:
+            pruned = await asyncio.to_thread(self.store.prune, time.time() - INGEST_JOB_RETENTION)
+        except Exception as e:
+            logger.warning("Pruning finished ingestion jobs failed: %s", e)
+            return
+        if pruned:
+            logger.info("Pruned %d finished ingestion jobs", pruned)
+
+    async def _worker(self) -> None:
+        while True:
+            await self._prune()
+            self._wakeup.clear()
+            try:
+                claimed = await asyncio.to_thread(self.store.claim, self.owner, INGEST_JOB_LEASE)
+            except Exception as e:
+                logger.warning("Claiming an ingestion job failed: %s", e)
+                claimed = None
+            if claimed is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), INGEST_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass  # submitted to another process, or a lease ran out
+                continue
+
+            job, _ = claimed
+            self._notify(job.id)
+            await self._run(job)
+
+    async def _run(self, job: IngestJob) -> None:
+        run = _Run()
+
+        def on_save() -> None:
+            run.saving = True
+
+        async def on_progress(text: str) -> None:
+            await self._publish(job.id, {"event": "progress", "text": text})
+
+        run.task = asyncio.create_task(ingest_meeting(job.url, on_progress, on_save=on_save))
+        self._running[job.id] = run
+        heartbeat = asyncio.create_task(self._heartbeat(job, run))
+        try:
+            result = await run.task
+            job.meeting_id = result.meeting_id
+            job.already_existed = result.already_existed
+            job.index_message = result.index_message
+            job.status = SUCCEEDED
+            if run.cancelled:
+                await on_progress("Cancel requested after the meeting started saving; it was saved and indexed.")
+        except asyncio.CancelledError:
+            if run.lost:
+                logger.warning("Ingestion job %s was taken over by another worker", job.id)
+                return
+            if not run.cancelled:
+                raise  # shutting down: `stop` hands the job back to the queue
+            job.status = CANCELLED
+        except IngestionError as e:
+            job.error = str(e)
+            job.status = FAILED
+        except Exception as e:
+            logger.exception("Ingestion job %s failed for %s", job.id, job.url)
+            job.error = f"Unexpected error: {e}"
+            job.status = FAILED
+        finally:
+            heartbeat.cancel()
+            self._running.pop(job.id, None)
+
+        job.updated_at = time.time()
+        if not await asyncio.to_thread(self.store.finish, job, self.owner):
+            logger.warning("Ingestion job %s was taken over by another worker", job.id)
+        self._notify(job.id)
+
+
+ingest_queue = IngestJobQueue(JobStore(INGEST_JOBS_PATH))
@@ -0,0 +1,194 @@
+"""Deterministic meeting ingestion pipeline: extract -> summarize -> save + index."""
+
+from __future__ import annotations
+
+import re
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from utils.db import run_query, supabase
+from utils.embeddings import embed_text, embed_texts
+from utils.rag import index_meeting_transcript, split_transcript
+from utils.response_cache import invalidate_meeting
+from utils.meeting_lookup import meeting_lookup
+from utils.urls import canonical_meeting_key
+from utils.vector_codec import embedding_columns
+from utils.transcript_fetcher import TranscriptFetchError, transcript_fetcher, transcript_source
+from utils.output_format import MeetingSummaryResponse
+from custom_agents.summarizer_agent import summarize_transcript
+
+ProgressCallback = Callable[[str], Awaitable[None]]
+
+_URL_RE = re.compile(r"https?://[^\s<>\"')\]]+")
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionError(Exception):
+    """A pipeline stage failed. The message is safe to show to the user."""
+
+
+@dataclass
+class IngestionResult:
+    url: str
+    meeting_id: Any
+    summary: MeetingSummaryResponse | None = None
+    already_existed: bool = False
+    index_message: str = ""
+
+
+# -----------------------------------------------------------------------------
+# Stages (also used by the orchestrator tools)
+# -----------------------------------------------------------------------------
+
+def find_meeting_url(text: str) -> str | None:
+    """First supported (YouTube / Zoom) URL in a chat message."""
+    for match in _URL_RE.finditer(text or ""):
+        url = match.group(0).rstrip(".,;:!?")
+        if transcript_source(url):
+            return url
+    return None
+
+
+async def find_meeting(url: str) -> dict[str, Any] | None:
+    """The stored meeting for a URL (matched on its canonical meeting key), if any."""
+    if not supabase:
+        raise IngestionError("Supabase not configured.")
+    return await meeting_lookup.find(supabase, url)
+
+
+async def fetch_transcript(url: str) -> str:
+    """Transcript for a URL (pooled client, retries, single-flight, disk cache)."""
+    try:
+        return await transcript_fetcher.fetch(url)
+    except TranscriptFetchError as e:
+        raise IngestionError(str(e))
+
+
+async def save_meeting(url: str, transcript: str, summary: MeetingSummaryResponse) -> Any:
+    """Upsert the meeting (with its summary embedding) and return its id."""
+    if not supabase:
+        raise IngestionError("Supabase not configured.")
+
+    # Cached, so re-saving the same summary is free
+    embedding_vector = None
+    try:
+        embedding_vector = await embed_text(summary.model_dump_json())
+    except Exception as e:
+        logger.warning("Embedding generation failed: %s", e)
+
+    data = {
+        "zoom_url": url,
+        "meeting_key": canonical_meeting_key(url),
+        "content": transcript,
+        "metadata": summary.model_dump(),
+        **(embedding_columns(embedding_vector) if embedding_vector is not None else {"embedding": None}),
+    }
+    try:
+        # Ask PostgREST to hand back only the id, so we never have to poll for it
+        response = await run_query(
+            supabase.table("meetinglist").upsert(data, on_conflict="meeting_key").select("id"),
+            "save_meeting",
+        )
+    except Exception as e:
+        raise IngestionError(f"Database Error: {str(e)}")
+    if not response.data:
+        raise IngestionError("Database Error: upsert returned no row.")
+
+    meeting_id = response.data[0]["id"]
+    meeting_lookup.remember(url, {
+        "id": meeting_id,
+        "zoom_url": url,
+        "meeting_key": data["meeting_key"],
+        "metadata": data["metadata"],
+    })
+    invalidate_meeting(meeting_id=meeting_id, url=url)
+    return meeting_id
+
+
+# -----------------------------------------------------------------------------
+# Pipeline
+# -----------------------------------------------------------------------------
+
+async def _no_progress(text: str) -> None:
+    return None
+
+
+async def ingest_meeting(
+    url: str,
+    on_progress: ProgressCallback = _no_progress,
+    transcript: str | None = None,
+    on_save: Callable[[], None] | None = None,
+) -> IngestionResult:
+    """
+    Run the whole ingestion for one URL without an LLM orchestrator.
+    Chunk embeddings are computed while the summary is generated and saved,
+    so indexing at the end mostly writes rows that are already embedded.
+    Pass `transcript` to skip extraction (e.g. transcripts read from files).
+    `on_save` is called when the save + index stage, which can't be
+    cancelled, is about to start.
+    """
+    # --- 0. Already ingested? ---
+    await on_progress("Checking if meeting exists...")
+    existing = await find_meeting(url)
+    if existing:
+        return IngestionResult(url=url, meeting_id=existing["id"], already_existed=True)
+
+    # --- 1. Extract ---
+    if transcript is None:
+        await on_progress("Extracting transcript...")
+        transcript = await fetch_transcript(url)
+
+    # Warm the embedding cache for every chunk in the background
+    warm_task = asyncio.create_task(embed_texts(split_transcript(transcript)))
+
+    try:
+        # --- 2. Summarize ---
+        await on_progress("Summarizing transcript...")
+        summary = await summarize_transcript(url, transcript)
+    except BaseException:
+        warm_task.cancel()
+        raise
+
+    # --- 3 + 4. Save and index ---
+    # Shielded: once we start saving, the meeting is always indexed as well,
+    # even if the caller is cancelled (no "saved but not indexed" meetings).
+    if on_save is not None:
+        on_save()
+    return await asyncio.shield(_save_and_index(url, transcript, summary, warm_task, on_progress))
+
+
+async def _save_and_index(
+    url: str,
+    transcript: str,
+    summary: MeetingSummaryResponse,
+    warm_task: asyncio.Task,
+    on_progress: ProgressCallback,
+) -> IngestionResult:
+    try:
+        # --- 3. Save (runs alongside the chunk embeddings) ---
+        await on_progress("Saving to database...")
+        meeting_id = await save_meeting(url, transcript, summary)
+
+        # --- 4. Index ---
+        await on_progress("Generating knowledge base...")
+        try:
+            await warm_task
+        except Exception as e:
+            # index_meeting_transcript embeds whatever is still missing
+            logger.warning("Background embedding failed: %s", e)
+    finally:
+        if not warm_task.done():
+            warm_task.cancel()
+
+    index_message = await index_meeting_transcript(
+        meeting_id, transcript, supabase, metadata=summary.model_dump()
+    )
+    return IngestionResult(
+        url=url,
+        meeting_id=meeting_id,
+        summary=summary,
+        index_message=index_message,
+    )
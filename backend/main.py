@@ -1,39 +1,57 @@
 import os
+import logging
 import uvicorn
 from fastapi import Depends, FastAPI, Request, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import Response, StreamingResponse
-from starlette.responses import JSONResponse
+from pydantic import BaseModel
 from dotenv import load_dotenv
 
 from chatkit.server import StreamingResult
-from supabase import create_client, Client
 
 # Local Imports
 from supabase_store import SupabaseStore 
+from sqlite_store import SQLiteStore
 from server import MyChatKitServer
 from request_context import RequestContext
+from utils import metrics
+from utils.fast_json import FastJSONResponse, dumps
+from utils.db import run_query, supabase
+from utils.retrieval import retrieval_engine
+from utils.response_cache import analysis_cache, etag_matches
+from utils.rag import display_views
+from utils.transcript_fetcher import transcript_fetcher
+from utils.meeting_lookup import LOOKUP_COLUMNS, meeting_lookup
+from utils.urls import canonical_meeting_key
 
 from meeting_store import get_meeting_url
+from ingestion import IngestionError
+from ingest_jobs import QueueFullError, ingest_queue
 
 
 load_dotenv()
 
-SUPABASE_URL = os.environ.get("SUPABASE_URL")
-SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_KEY")
-
-if not SUPABASE_URL or not SUPABASE_KEY:
-    print("⚠️ WARNING: Supabase Keys missing.")
+logging.basicConfig(
+    level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+logger = logging.getLogger(__name__)
 
-supabase: Client | None = None
-if SUPABASE_URL and SUPABASE_KEY:
-    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+if not supabase:
+    logger.warning("Supabase keys missing.")
 
 # --- Setup Server ---
-store = SupabaseStore(supabase_client=supabase)
+# ChatKit threads/items: "supabase" (default) or "sqlite" (embedded, single node / local dev)
+CHATKIT_STORE = os.environ.get("CHATKIT_STORE", "supabase")
+if CHATKIT_STORE == "sqlite":
+    store = SQLiteStore()
+else:
+    store = SupabaseStore(supabase_client=supabase)
 simple_server = MyChatKitServer(data_store=store)
 
-app = FastAPI(title="ChatKit Meeting Agent")
+# orjson-backed JSON for every endpoint; hot endpoints return FastJSONResponse
+# directly, which also skips FastAPI's jsonable_encoder pass
+app = FastAPI(title="ChatKit Meeting Agent", default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -41,10 +59,33 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
 
 def get_server() -> MyChatKitServer:
     return simple_server
 
+@app.on_event("startup")
+def start_ingest_workers() -> None:
+    # Jobs interrupted by the last shutdown are claimed again from the job store
+    ingest_queue.start()
+
+@app.on_event("shutdown")
+async def stop_ingest_workers() -> None:
+    await ingest_queue.stop()
+
+@app.on_event("shutdown")
+async def flush_store() -> None:
+    # Don't lose buffered (write-behind) thread items or running history summaries on shutdown
+    await simple_server.compactor.aclose()
+    await store.flush_all()
+    close = getattr(store, "close", None)
+    if close:
+        close()
+
+@app.on_event("shutdown")
+async def close_http_clients() -> None:
+    await transcript_fetcher.aclose()
+
 # --- Endpoints ---
 
 @app.post("/chatkit")
@@ -61,64 +102,237 @@ async def chatkit_endpoint(
     if hasattr(result, "json"):
         return Response(content=result.json, media_type="application/json")
         
-    return JSONResponse(result)
+    return FastJSONResponse(result)
 
 
 # --- UPDATED: Data Fetching by URL ---
 @app.get("/api/analysis")
-async def get_meeting_analysis(url: str = Query(..., description="The YouTube or Zoom URL")):
+async def get_meeting_analysis(
+    request: Request,
+    url: str = Query(..., description="The YouTube or Zoom URL"),
+):
     """
-    Fetch meeting + transcript chunks by URL.
+    Fetch meeting metadata + transcript by URL.
     Usage: GET /api/analysis?url=https://youtube.com/...
+
+    Responses are cached per meeting and carry a strong ETag; send it back in
+    If-None-Match to get a 304. The cache is invalidated whenever the meeting
+    or its chunks are written.
     """
+    # Every form of the same meeting URL shares one cache entry
+    cache_key = canonical_meeting_key(url)
+    cached = await analysis_cache.get_or_build(cache_key, lambda: _build_analysis(url))
+
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+async def _build_analysis(url: str) -> tuple[dict, set]:
+    # The transcript is stored once, canonically, in meetinglist.content
+    meeting = await _meeting_for_url(url, "id, metadata, content")
+
+    payload = {
+        "metadata": meeting.get("metadata", {}),
+        "transcript": meeting.get("content") or "",
+    }
+    # Tagged with the meeting id, so writes to the meeting invalidate it
+    return payload, {("meeting", meeting["id"])}
+
+async def _meeting_for_url(url: str, columns: str = "id") -> dict:
     if not supabase:
         raise HTTPException(status_code=500, detail="Database not initialized")
+    # Resolved through the (cached) canonical-key lookup; unknown URLs 404 without a query
+    meeting = await meeting_lookup.find(supabase, url)
+    if meeting is None:
+        raise HTTPException(status_code=404, detail="Meeting not found")
 
-    # 1. Get the main meeting record by URL
-    meeting_result = (
+    lookup_columns = {c.strip() for c in LOOKUP_COLUMNS.split(",")}
+    if {c.strip() for c in columns.split(",")} <= lookup_columns:
+        return meeting
+    meeting_result = await run_query(
         supabase.table("meetinglist")
-        .select("*")
-        .eq("zoom_url", url)
-        .execute() # .single() might crash if not found, so we check list
+        .select(columns)
+        .eq("id", meeting["id"]), # .single() might crash if not found, so we check list
+        "load_meeting",
     )
-    
-    if not meeting_result.data or len(meeting_result.data) == 0:
+    if not meeting_result.data:
         raise HTTPException(status_code=404, detail="Meeting not found")
-    
-    meeting = meeting_result.data[0]
-    meeting_id = meeting["id"]
+    return meeting_result.data[0]
+
 
-    # 2. Fetch chunks
-    chunks_result = (
+async def _load_chunk_range(meeting_id, from_chunk: int, limit: int) -> list[dict]:
+    result = await run_query(
         supabase.table("transcript_chunks")
-        .select("content")
-        .eq("transcript_id", meeting_id) 
+        .select("chunk_index, start_offset, end_offset, content")
+        .eq("transcript_id", meeting_id)
+        .gte("chunk_index", from_chunk)
         .order("chunk_index", desc=False)
-        .execute()
+        .limit(limit),
+        "load_chunk_range",
+    )
+    return result.data or []
+
+
+async def _chunk_views(meeting_id, rows: list[dict], next_start: int | None) -> list[dict]:
+    """
+    Display views of `rows`, reading only the part of the transcript they
+    cover (from the first chunk to `next_start`) instead of all of it.
+    """
+    starts = [row["start_offset"] for row in rows if row.get("start_offset") is not None]
+    if not starts:
+        # Older rows carry their own content
+        return display_views("", rows, next_start)
+    base = min(starts)
+    result = await run_query(
+        supabase.rpc("transcript_slice", {"meeting": meeting_id, "from_offset": base, "to_offset": next_start}),
+        "transcript_slice",
     )
+    # Offsets relative to the slice
+    shifted = [
+        {**row, "start_offset": row["start_offset"] - base, "end_offset": row["end_offset"] - base}
+        if row.get("start_offset") is not None else row
+        for row in rows
+    ]
+    return display_views(result.data or "", shifted, next_start - base if next_start is not None else None)
 
-    chunks = chunks_result.data or []
 
-    # 3. Join chunks (or fallback to the 'content' column)
-    if chunks:
-        # Join with double newline for readability
-        raw_transcript = "\n\n".join([c["content"] for c in chunks])
-    else:
-        raw_transcript = meeting.get("content", "")
+@app.get("/api/analysis/transcript")
+async def get_transcript_page(
+    url: str = Query(..., description="The YouTube or Zoom URL"),
+    from_chunk: int = Query(0, ge=0, description="First chunk_index to return"),
+    limit: int = Query(20, ge=1, le=200),
+):
+    """
+    One page of the transcript, for lazy loading. Chunks are returned as
+    non-overlapping views of the canonical transcript, so concatenating
+    every page gives back the exact transcript.
+    Usage: GET /api/analysis/transcript?url=...&from_chunk=0&limit=20
+    `next_chunk` is the from_chunk of the next page (null on the last page).
+    """
+    meeting = await _meeting_for_url(url)
 
-    return {
-        "metadata": meeting.get("metadata", {}),
-        "transcript": raw_transcript,
-    }
+    # Fetch one extra chunk to know whether there is another page (and where it starts)
+    rows = await _load_chunk_range(meeting["id"], from_chunk, limit + 1)
+    next_row = rows[limit] if len(rows) > limit else None
+
+    return FastJSONResponse({
+        "meeting_id": meeting["id"],
+        "chunks": await _chunk_views(meeting["id"], rows[:limit], next_row["start_offset"] if next_row else None),
+        "next_chunk": next_row["chunk_index"] if next_row else None,
+    })
+
+
+STREAM_PAGE_SIZE = 50
+
+@app.get("/api/analysis/transcript/stream")
+async def stream_transcript(url: str = Query(..., description="The YouTube or Zoom URL")):
+    """
+    Stream the transcript as NDJSON, one chunk per line, reading the chunks
+    (and the text they cover) from the database page by page as they are
+    sent. Only one page is held in memory at a time.
+    Usage: GET /api/analysis/transcript/stream?url=...
+    """
+    meeting = await _meeting_for_url(url)
+    # Read one row ahead so each view can end where the next chunk starts
+    first_page = await _load_chunk_range(meeting["id"], 0, STREAM_PAGE_SIZE + 1)
+
+    async def lines():
+        page = first_page
+        while page:
+            next_row = page[STREAM_PAGE_SIZE] if len(page) > STREAM_PAGE_SIZE else None
+            views = await _chunk_views(meeting["id"], page[:STREAM_PAGE_SIZE], next_row["start_offset"] if next_row else None)
+            for view in views:
+                yield dumps(view) + b"\n"
+            if next_row is None:
+                break
+            page = await _load_chunk_range(meeting["id"], next_row["chunk_index"], STREAM_PAGE_SIZE + 1)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/api/search")
+async def search_meetings(
+    q: str = Query(..., description="Search query"),
+    url: str | None = Query(None, description="Limit the search to this meeting URL"),
+    k: int = Query(5, ge=1, le=50),
+):
+    """
+    Hybrid (vector + BM25) search over transcript chunks, answered from memory.
+    Usage: GET /api/search?q=budget&url=https://youtube.com/...
+    """
+    if not supabase:
+        raise HTTPException(status_code=500, detail="Database not initialized")
+
+    meeting_id = (await _meeting_for_url(url))["id"] if url else None
+
+    results = await retrieval_engine.search(supabase, q, meeting_id=meeting_id, k=k)
+    return FastJSONResponse({"query": q, "results": results})
+
+class IngestRequest(BaseModel):
+    url: str
+
+@app.post("/api/ingest", status_code=202)
+async def submit_ingest(body: IngestRequest):
+    """
+    Queue a meeting for ingestion (extract -> summarize -> save -> index).
+    Returns at once with a job ID. Submitting a URL whose meeting is already
+    queued or running returns the existing job (`created: false`).
+    """
+    try:
+        job, created = await ingest_queue.submit(body.url)
+    except IngestionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {**job.public(), "created": created}
+
+@app.get("/api/ingest/{job_id}")
+async def get_ingest_job(job_id: str):
+    job = await ingest_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.public()
+
+@app.delete("/api/ingest/{job_id}")
+async def cancel_ingest_job(job_id: str):
+    """
+    Cancel a job. A running job is `cancelling` until it stops; one that has
+    already started saving its meeting finishes (and succeeds) instead.
+    """
+    job = await ingest_queue.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.public()
+
+@app.get("/api/ingest/{job_id}/events")
+async def ingest_job_events(job_id: str):
+    """
+    Job progress as Server-Sent Events: every past event is replayed, then
+    live events follow until the job finishes. Event types: `status`, `progress`.
+    """
+    if await ingest_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def stream():
+        async for event in ingest_queue.events(job_id):
+            yield f"id: {event['seq']}\nevent: {event['event']}\ndata: {dumps(event).decode()}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus scrape endpoint (latency histograms, DB round trips, tokens, chunks)."""
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 @app.get("/api/meeting/{thread_id}/url")
 async def meeting_url(thread_id: str):
-    url = get_meeting_url(thread_id)
+    url = await get_meeting_url(thread_id)
     if not url:
         return {"error": "No meeting URL found"}
     return {"url": url}
 
 
 if __name__ == "__main__":
-    print("🚀 Meeting Agent Backend running on http://localhost:8000")
+    logger.info("Meeting Agent Backend running on http://localhost:8000")
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,13 +1,142 @@
 # meeting_store.py
-from typing import Dict
+"""
+Thread -> meeting URL mapping.
 
-# Simple in-memory store (replace with Supabase/DB for persistence)
-_meeting_urls: Dict[str, str] = {}
+A bounded LRU in front of a durable backend (write-through):
+- "sqlite" (default): local SQLite file, shared by every worker on this machine
+- "supabase": the `thread_meetings` table (sql/004_thread_meetings.sql), shared by every host
+Choose with MEETING_STORE_BACKEND.
+"""
+import os
+import time
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
 
-def save_meeting_url(thread_id: str, url: str) -> None:
+from utils.db import run_query, supabase
+
+MEETING_STORE_BACKEND = os.environ.get("MEETING_STORE_BACKEND", "sqlite")
+MEETING_STORE_PATH = os.environ.get(
+    "MEETING_STORE_PATH",
+    os.path.join(os.path.dirname(__file__), ".data", "thread_meetings.sqlite3"),
+)
+MEETING_STORE_CACHE_MAX_ENTRIES = int(os.environ.get("MEETING_STORE_CACHE_MAX_ENTRIES", "10000"))
+# Another worker may re-point a thread at a new meeting, so cached entries expire
+MEETING_STORE_CACHE_TTL = float(os.environ.get("MEETING_STORE_CACHE_TTL", "60"))
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteMeetingBackend:
+    def __init__(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS thread_meetings ("
+            " thread_id TEXT PRIMARY KEY,"
+            " url TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+
+    # Local SQLite calls take microseconds, so they run inline
+    async def save(self, thread_id: str, url: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO thread_meetings (thread_id, url, updated_at) VALUES (?, ?, ?)",
+                (thread_id, url, time.time()),
+            )
+
+    async def get(self, thread_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url FROM thread_meetings WHERE thread_id = ?", (thread_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+
+class SupabaseMeetingBackend:
+    def __init__(self, supabase_client) -> None:
+        self.supabase = supabase_client
+
+    async def save(self, thread_id: str, url: str) -> None:
+        await run_query(
+            self.supabase.table("thread_meetings").upsert(
+                {"thread_id": thread_id, "url": url}, on_conflict="thread_id"
+            ),
+            "save_thread_meeting",
+        )
+
+    async def get(self, thread_id: str) -> Optional[str]:
+        result = await run_query(
+            self.supabase.table("thread_meetings").select("url").eq("thread_id", thread_id).limit(1),
+            "load_thread_meeting",
+        )
+        return result.data[0]["url"] if result.data else None
+
+
+class MeetingStore:
+    def __init__(self, backend, max_entries: int = MEETING_STORE_CACHE_MAX_ENTRIES, ttl_seconds: float = MEETING_STORE_CACHE_TTL) -> None:
+        self.backend = backend
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # thread_id -> (expires_at, url)
+        self._cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    def _remember(self, thread_id: str, url: str) -> None:
+        self._cache[thread_id] = (time.monotonic() + self.ttl_seconds, url)
+        self._cache.move_to_end(thread_id)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    async def save(self, thread_id: str, url: str) -> None:
+        self._remember(thread_id, url)
+        try:
+            await self.backend.save(thread_id, url)
+        except Exception as e:
+            # Still served from this worker's cache; other workers won't see it
+            logger.warning("Failed to persist meeting URL for thread %s: %s", thread_id, e)
+
+    async def get(self, thread_id: str) -> Optional[str]:
+        entry = self._cache.get(thread_id)
+        if entry is not None:
+            expires_at, url = entry
+            if expires_at >= time.monotonic():
+                self._cache.move_to_end(thread_id)
+                return url
+        try:
+            url = await self.backend.get(thread_id)
+        except Exception as e:
+            logger.warning("Failed to load meeting URL for thread %s: %s", thread_id, e)
+            return entry[1] if entry else None
+        if url is None:
+            # Not cached, so a URL saved by another worker shows up on the next call
+            self._cache.pop(thread_id, None)
+            return None
+        self._remember(thread_id, url)
+        return url
+
+
+def _make_backend():
+    if MEETING_STORE_BACKEND == "supabase":
+        if supabase is None:
+            raise RuntimeError("MEETING_STORE_BACKEND=supabase but Supabase is not configured.")
+        return SupabaseMeetingBackend(supabase)
+    if MEETING_STORE_BACKEND == "sqlite":
+        return SQLiteMeetingBackend(MEETING_STORE_PATH)
+    raise RuntimeError(f"Unknown MEETING_STORE_BACKEND: {MEETING_STORE_BACKEND!r}")
+
+
+meeting_store = MeetingStore(_make_backend())
+
+async def save_meeting_url(thread_id: str, url: str) -> None:
     """Save the meeting URL for a given thread."""
-    _meeting_urls[thread_id] = url
+    await meeting_store.save(thread_id, url)
 
-def get_meeting_url(thread_id: str) -> str | None:
+async def get_meeting_url(thread_id: str) -> str | None:
     """Fetch the meeting URL for a thread."""
-    return _meeting_urls.get(thread_id)
\ No newline at end of file
+    return await meeting_store.get(thread_id)
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import logging
+from datetime import datetime
 from typing import Any, AsyncIterator
 
 from dotenv import load_dotenv
@@ -14,6 +15,10 @@ from chatkit.agents import stream_agent_response
 from chatkit.server import ChatKitServer
 from chatkit.store import Store
 from chatkit.types import (
+    AssistantMessageContent,
+    AssistantMessageItem,
+    ProgressUpdateEvent,
+    ThreadItemDoneEvent,
     ThreadMetadata,
     UserMessageItem,
     ThreadStreamEvent
@@ -26,8 +31,13 @@ from openai.types.responses import (
 
 # Local Imports
 from thread_item_converter import BasicThreadItemConverter
+from agent_input_cache import HISTORY_LIMIT, AgentInputCache
+from history_compactor import HistoryCompactor
 # Import the new Agent and Context
 from custom_agents.transcript_maker import transcript_maker_agent, MeetingAgentContext
+from ingestion import IngestionError, find_meeting_url
+from ingest_jobs import CANCELLED, FAILED, IngestJob, QueueFullError, ingest_queue
+from meeting_store import save_meeting_url
 
 from request_context import RequestContext
 
@@ -41,6 +51,14 @@ class MyChatKitServer(ChatKitServer):
     def __init__(self, data_store: Store, file_store: Any | None = None):
         super().__init__(data_store, file_store)
         self.thread_item_converter = BasicThreadItemConverter()
+        # Converted history per thread, kept current by the store's item writes
+        self.agent_inputs = AgentInputCache(self.thread_item_converter)
+        # Token budget: older turns become a rolling summary
+        self.compactor = HistoryCompactor(data_store)
+        add_listener = getattr(data_store, "add_listener", None)
+        if add_listener:
+            add_listener(self.agent_inputs)
+            add_listener(self.compactor)
 
     async def respond(
         self,
@@ -49,16 +67,38 @@ class MyChatKitServer(ChatKitServer):
         context: RequestContext,
     ) -> AsyncIterator[ThreadStreamEvent]:
 
-        # 1. Load Recent Thread Items
-        items_page = await self.store.load_thread_items(
-            thread.id,
-            after=None,
-            limit=20,
-            order="desc",
-            context=context,
-        )
-        items = list(reversed(items_page.data))
-        input_items = await self.thread_item_converter.to_agent_input(items)
+        # 0. Meeting URLs go straight to the ingestion pipeline (no LLM orchestration)
+        url = find_meeting_url(self._user_text(item)) if item else None
+        if url:
+            async for event in self._ingest(thread, url, context):
+                yield event
+            await self._flush(thread)
+            return
+
+        # 1. Recent Thread Items (cached per thread; only new items are converted)
+        async def load_recent(thread_id: str) -> list:
+            items_page = await self.store.load_thread_items(
+                thread_id,
+                after=None,
+                limit=HISTORY_LIMIT,
+                order="desc",
+                context=context,
+            )
+            return list(reversed(items_page.data))
+
+        async def latest_item_id(thread_id: str) -> str | None:
+            # Items added by other worker processes aren't announced to this one
+            # (only called with AGENT_INPUT_CACHE_CHECK_STORE=1)
+            page = await self.store.load_thread_items(thread_id, after=None, limit=1, order="desc", context=context)
+            return page.data[0].id if page.data else None
+
+        if getattr(self.store, "add_listener", None):
+            items = await self.agent_inputs.items(thread.id, load_recent, latest_item_id)
+        else:
+            # Store without write notifications: the cached window could go stale
+            items = await load_recent(thread.id)
+        item_inputs = await self.agent_inputs.item_inputs(thread.id, items)
+        input_items = self.compactor.compact(thread, items, item_inputs, context)
 
         # 2. Setup the Agent Context
         # We now use the custom MeetingAgentContext defined in the agent file
@@ -81,7 +121,64 @@ class MyChatKitServer(ChatKitServer):
         async for event in stream_agent_response(agent_context, result):
             yield event
 
+        # 5. End of turn: write any buffered items in one go
+        await self._flush(thread)
+
         return
 
+    async def _flush(self, thread: ThreadMetadata) -> None:
+        flush = getattr(self.store, "flush", None)
+        if flush:
+            await flush(thread.id)
+
+    @staticmethod
+    def _user_text(item: UserMessageItem) -> str:
+        return " ".join(part.text for part in item.content if getattr(part, "type", None) == "input_text")
+
+    async def _ingest(
+        self,
+        thread: ThreadMetadata,
+        url: str,
+        context: RequestContext,
+    ) -> AsyncIterator[ThreadStreamEvent]:
+        """
+        Queue an ingestion job for `url` and stream its progress. The job runs
+        in the background worker pool, so it finishes even if the client
+        disconnects, and a URL that is already being ingested joins that job.
+        """
+        await save_meeting_url(thread.id, url)
+
+        try:
+            job, _ = await ingest_queue.submit(url)
+        except (IngestionError, QueueFullError) as e:
+            text = f"Sorry, I couldn't process this meeting: {e}"
+        else:
+            async for event in ingest_queue.events(job.id):
+                if event["event"] == "progress":
+                    yield ProgressUpdateEvent(text=event["text"])
+            text = self._ingestion_message(await ingest_queue.get(job.id) or job)
+
+        yield ThreadItemDoneEvent(
+            item=AssistantMessageItem(
+                id=self.store.generate_item_id("message", thread, context),
+                thread_id=thread.id,
+                created_at=datetime.now(),
+                content=[AssistantMessageContent(text=text)],
+            )
+        )
+
+    @staticmethod
+    def _ingestion_message(job: IngestJob) -> str:
+        if job.status == FAILED:
+            return f"Sorry, I couldn't process this meeting: {job.error}"
+        if job.status == CANCELLED:
+            return "Processing of this meeting was cancelled."
+        if job.already_existed:
+            return "This meeting has already been processed. Ask me anything about it."
+        text = "Your meeting has been processed, summarized, saved, and indexed successfully."
+        if not job.index_message.startswith(("Successfully", "Index already")):
+            text += f"\n\nNote: search indexing reported: {job.index_message}"
+        return text
+
     async def to_message_content(self, input: FilePart | ImagePart) -> ResponseInputContentParam:
         raise NotImplementedError()
\ No newline at end of file
@@ -0,0 +1,6 @@
+-- Indexes backing keyset pagination on (created_at, id) in SupabaseStore.
+create index if not exists chatkit_threads_created_at_id_idx
+    on chatkit_threads (created_at, id);
+
+create index if not exists chatkit_items_thread_created_at_id_idx
+    on chatkit_items (thread_id, created_at, id);
@@ -0,0 +1,11 @@
+-- Store transcript chunks as offsets into meetinglist.content instead of
+-- a second (overlapping) copy of the text.
+alter table transcript_chunks add column if not exists start_offset integer;
+alter table transcript_chunks add column if not exists end_offset integer;
+alter table transcript_chunks add column if not exists content_hash text;
+alter table transcript_chunks alter column content drop not null;
+
+-- Rows written before this migration keep their `content` and are rewritten
+-- with offsets the next time the meeting is re-indexed. Once every meeting has
+-- been re-indexed, the old copies can be dropped:
+--   update transcript_chunks set content = null where start_offset is not null;
@@ -0,0 +1,38 @@
+-- Canonical meeting key (utils/urls.py: canonical_meeting_key), so every form
+-- of a YouTube / Zoom link resolves to the same meetinglist row.
+alter table meetinglist add column if not exists meeting_key text;
+
+-- Backfill existing rows. Mirrors canonical_meeting_key for YouTube and Zoom;
+-- other URLs keep a null key and are still found by zoom_url.
+update meetinglist
+set meeting_key = 'youtube:' || (regexp_match(
+    zoom_url,
+    '^(?:https?://)?(?:[a-z0-9-]+\.)?(?:youtube\.com/(?:watch\?(?:.*&)?v=|shorts/|embed/|live/|v/)|youtu\.be/)([A-Za-z0-9_-]{11})',
+    'i'
+))[1]
+where meeting_key is null
+  and zoom_url ~* '^(?:https?://)?(?:[a-z0-9-]+\.)?(?:youtube\.com/(?:watch\?(?:.*&)?v=|shorts/|embed/|live/|v/)|youtu\.be/)[A-Za-z0-9_-]{11}';
+
+update meetinglist
+set meeting_key = 'zoom:' || (regexp_match(
+    zoom_url,
+    '^(?:https?://)?(?:[a-z0-9-]+\.)?zoom\.us/(rec/(?:share|play)/[^/?#]+|j/[0-9]+|w/[0-9]+)',
+    'i'
+))[1]
+where meeting_key is null
+  and zoom_url ~* '^(?:https?://)?(?:[a-z0-9-]+\.)?zoom\.us/(rec/(?:share|play)/[^/?#]+|j/[0-9]+|w/[0-9]+)';
+
+-- Meetings that were ingested more than once: keep the key on one row (highest id)
+-- so the unique index can be built. The duplicates can be deleted afterwards.
+update meetinglist m
+set meeting_key = null
+where meeting_key is not null
+  and exists (
+    select 1 from meetinglist newer
+    where newer.meeting_key = m.meeting_key
+      and newer.id > m.id
+  );
+
+-- Unique (not partial), so `upsert(..., on_conflict="meeting_key")` can use it.
+create unique index if not exists meetinglist_meeting_key_idx
+  on meetinglist (meeting_key);
@@ -0,0 +1,6 @@
+-- Thread -> meeting URL mapping (meeting_store.py with MEETING_STORE_BACKEND=supabase).
+create table if not exists thread_meetings (
+    thread_id text primary key,
+    url text not null,
+    updated_at timestamptz not null default now()
+);
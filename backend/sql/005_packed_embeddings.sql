@@ -0,0 +1,8 @@
+-- Packed embeddings (utils/vector_codec.py), written when EMBEDDING_STORAGE is
+-- "float16" or "int8". Rows written that way leave the pgvector column null.
+-- Retrieval always selects embedding_q, so apply this whatever the setting.
+alter table transcript_chunks add column if not exists embedding_q bytea;
+alter table transcript_chunks alter column embedding drop not null;
+
+alter table meetinglist add column if not exists embedding_q bytea;
+alter table meetinglist alter column embedding drop not null;
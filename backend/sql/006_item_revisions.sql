@@ -0,0 +1,3 @@
+-- Write revision of each ChatKit item (supabase_store.py). Rows read back with
+-- the revision this server wrote are not parsed and validated again.
+alter table chatkit_items add column if not exists revision text;
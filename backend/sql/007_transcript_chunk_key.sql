@@ -0,0 +1,13 @@
+-- One row per (meeting, chunk index), so re-indexing (utils/rag.py) can upsert
+-- new and changed chunks in place before deleting the ones that no longer exist.
+
+-- Older runs could leave duplicate rows for the same index: keep the newest.
+delete from transcript_chunks c
+using transcript_chunks newer
+where newer.transcript_id = c.transcript_id
+  and newer.chunk_index = c.chunk_index
+  and newer.id > c.id;
+
+-- Unique (not partial), so `upsert(..., on_conflict="transcript_id,chunk_index")` can use it.
+create unique index if not exists transcript_chunks_transcript_chunk_idx
+  on transcript_chunks (transcript_id, chunk_index);
@@ -0,0 +1,16 @@
+-- A slice of a meeting's canonical transcript (meetinglist.content), so the
+-- paged and streamed transcript endpoints read only the text they send.
+-- Offsets are 0-based character offsets, like Python string indexes
+-- (transcript_chunks.start_offset / end_offset); a null end reads to the end.
+create or replace function transcript_slice(meeting bigint, from_offset integer, to_offset integer default null)
+returns text
+language sql
+stable
+as $$
+  select case
+    when to_offset is null then substr(content, from_offset + 1)
+    else substr(content, from_offset + 1, greatest(to_offset - from_offset, 0))
+  end
+  from meetinglist
+  where id = meeting;
+$$;
@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import os
+import asyncio
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Tuple
+
+from chatkit.store import NotFoundError, Store
+from chatkit.types import Attachment, Page, ThreadItem, ThreadMetadata
+from pydantic import TypeAdapter
+
+from store_events import StoreEvents
+
+item_adapter = TypeAdapter(ThreadItem)
+attachment_adapter = TypeAdapter(Attachment)
+
+CHATKIT_SQLITE_PATH = os.environ.get(
+    "CHATKIT_SQLITE_PATH",
+    os.path.join(os.path.dirname(__file__), ".data", "chatkit.sqlite3"),
+)
+# How long item writes may be buffered before they are flushed (0 = write immediately)
+SQLITE_WRITE_BEHIND_DELAY = float(os.environ.get("SQLITE_STORE_WRITE_BEHIND_DELAY", "0.2"))
+
+logger = logging.getLogger(__name__)
+
+# `seq` is the insertion order; pages are keyset-paginated on it
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS threads (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    created_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    thread_id TEXT NOT NULL,
+    created_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_thread_seq ON items (thread_id, seq);
+CREATE TABLE IF NOT EXISTS attachments (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+"""
+
+# Upserts keep the original `seq`, so an updated item keeps its place in the thread
+UPSERT_THREAD = (
+    "INSERT INTO threads (id, created_at, data) VALUES (?, ?, ?) "
+    "ON CONFLICT(id) DO UPDATE SET created_at = excluded.created_at, data = excluded.data"
+)
+UPSERT_ITEM = (
+    "INSERT INTO items (id, thread_id, created_at, data) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(id) DO UPDATE SET data = excluded.data"
+)
+
+
+class SQLiteStore(StoreEvents, Store[dict[str, Any]]):
+    """
+    Embedded ChatKit store on a local SQLite file (WAL mode).
+
+    For single-node deployments, local development and tests. Statements are
+    parameterized and reused from the connection's statement cache, and
+    queries take microseconds, so they run inline under one lock instead of
+    on a thread pool.
+
+    Item writes are buffered per thread and written in one transaction at
+    the end of a turn (`flush`) or after `write_behind_delay` seconds. Every
+    read of a thread's items flushes that thread first.
+    """
+
+    def __init__(self, path: str = CHATKIT_SQLITE_PATH, write_behind_delay: float = SQLITE_WRITE_BEHIND_DELAY) -> None:
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.write_behind_delay = write_behind_delay
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, cached_statements=256)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        # thread_id -> {item_id: (row, item)}, in insertion order
+        self._pending: Dict[str, Dict[str, Tuple[tuple, ThreadItem]]] = {}
+        self._flush_timers: Dict[str, asyncio.TimerHandle] = {}
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _write(self, sql: str, params: tuple = ()) -> None:
+        with self._lock:
+            self._conn.execute(sql, params)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                yield self._conn
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def close(self) -> None:
+        """Flush buffered items, checkpoint the WAL and close the connection (e.g. on shutdown)."""
+        self.flush_all_sync()
+        for timer in self._flush_timers.values():
+            timer.cancel()
+        self._flush_timers.clear()
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._conn.close()
+
+    # -- Write-behind buffer ---------------------------------------------
+
+    def _schedule_flush(self, thread_id: str) -> None:
+        if thread_id not in self._flush_timers:
+            self._flush_timers[thread_id] = asyncio.get_running_loop().call_later(
+                self.write_behind_delay, self._background_flush, thread_id
+            )
+
+    def _background_flush(self, thread_id: str) -> None:
+        self._flush_timers.pop(thread_id, None)
+        try:
+            self._flush_sync(thread_id)
+        except Exception:
+            # Already logged; the rows stay buffered, so try again later
+            self._schedule_flush(thread_id)
+
+    def _flush_sync(self, thread_id: str) -> None:
+        timer = self._flush_timers.pop(thread_id, None)
+        if timer is not None:
+            timer.cancel()
+        pending = self._pending.pop(thread_id, None)
+        if not pending:
+            return
+        try:
+            with self._transaction() as conn:
+                conn.executemany(UPSERT_ITEM, [row for row, _ in pending.values()])
+        except Exception as e:
+            # Keep the rows (in front of anything buffered since) for the next flush
+            pending.update(self._pending.pop(thread_id, {}))
+            self._pending[thread_id] = pending
+            logger.warning("Flushing %d items for thread %s failed: %s", len(pending), thread_id, e)
+            raise
+
+    async def flush(self, thread_id: str) -> None:
+        """Write all buffered items of a thread in one transaction."""
+        self._flush_sync(thread_id)
+
+    def flush_all_sync(self) -> None:
+        for thread_id in list(self._pending):
+            self._flush_sync(thread_id)
+
+    async def flush_all(self) -> None:
+        """Flush every thread (e.g. on shutdown)."""
+        self.flush_all_sync()
+
+    # -- Keyset pagination -----------------------------------------------
+
+    def _load_page(
+        self, table: str, where: str, params: tuple, limit: int, after: str | None, order: str
+    ) -> Tuple[List[tuple], bool, str | None]:
+        """
+        Rows (id, data) of `table` matching `where`, ordered by seq, starting
+        after the row with id `after`. An `after` that matches no such row
+        (deleted, or of another thread) gives an empty page. Returns
+        (rows, has_more, next_after).
+        """
+        desc = order == "desc"
+        sql = f"SELECT id, data FROM {table} WHERE {where}"
+        if after:
+            cursor = self._query(f"SELECT seq FROM {table} WHERE {where} AND id = ?", params + (after,))
+            if not cursor:
+                return [], False, None
+            sql += f" AND seq {'<' if desc else '>'} ?"
+            params += (cursor[0][0],)
+        # Fetch one extra row to know whether there is another page
+        sql += f" ORDER BY seq {'DESC' if desc else 'ASC'} LIMIT ?"
+        rows = self._query(sql, params + ((limit + 1) if limit else -1,))
+
+        has_more = bool(limit) and len(rows) > limit
+        if has_more:
+            rows = rows[:limit]
+        return rows, has_more, (rows[-1][0] if has_more else None)
+
+    # -- Thread Metadata -------------------------------------------------
+
+    async def load_thread(self, thread_id: str, context: dict[str, Any]) -> ThreadMetadata:
+        rows = self._query("SELECT data FROM threads WHERE id = ?", (thread_id,))
+        if not rows:
+            # Same as SupabaseStore: unknown threads load as a new, empty thread
+            return ThreadMetadata(id=thread_id, created_at=datetime.now())
+        return ThreadMetadata.model_validate_json(rows[0][0])
+
+    async def save_thread(self, thread: ThreadMetadata, context: dict[str, Any]) -> None:
+        self._write(
+            UPSERT_THREAD,
+            (thread.id, thread.created_at.isoformat() if thread.created_at else None, thread.model_dump_json()),
+        )
+
+    async def load_threads(
+        self,
+        limit: int,
+        after: str | None,
+        order: str,
+        context: dict[str, Any],
+    ) -> Page[ThreadMetadata]:
+        rows, has_more, next_after = self._load_page("threads", "1 = 1", (), limit, after, order)
+        threads = [ThreadMetadata.model_validate_json(data) for _, data in rows]
+        return Page(data=threads, has_more=has_more, after=next_after)
+
+    async def delete_thread(self, thread_id: str, context: dict[str, Any]) -> None:
+        self._pending.pop(thread_id, None)
+        timer = self._flush_timers.pop(thread_id, None)
+        if timer is not None:
+            timer.cancel()
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM items WHERE thread_id = ?", (thread_id,))
+            conn.execute("DELETE FROM threads WHERE id = ?", (thread_id,))
+        self._notify_thread_deleted(thread_id)
+
+    # -- Thread Items (Messages) -----------------------------------------
+
+    async def load_thread_items(
+        self,
+        thread_id: str,
+        after: str | None,
+        limit: int,
+        order: str,
+        context: dict[str, Any],
+    ) -> Page[ThreadItem]:
+        # Read-your-writes: push buffered items for this thread first
+        self._flush_sync(thread_id)
+
+        rows, has_more, next_after = self._load_page("items", "thread_id = ?", (thread_id,), limit, after, order)
+        items = []
+        for item_id, data in rows:
+            try:
+                items.append(item_adapter.validate_json(data))
+            except Exception as e:
+                logger.warning("Failed to parse item %s: %s", item_id, e)
+        return Page(data=items, has_more=has_more, after=next_after)
+
+    async def add_thread_item(
+        self, thread_id: str, item: ThreadItem, context: dict[str, Any]
+    ) -> None:
+        pending = self._pending.setdefault(thread_id, {})
+        row = (item.id, thread_id, item.created_at.isoformat(), item.model_dump_json())
+        pending[item.id] = (row, item)
+        self._notify_item_saved(thread_id, item)
+
+        if self.write_behind_delay <= 0:
+            self._flush_sync(thread_id)
+        else:
+            self._schedule_flush(thread_id)
+
+    async def save_item(self, thread_id: str, item: ThreadItem, context: dict[str, Any]) -> None:
+        await self.add_thread_item(thread_id, item, context)
+
+    async def load_item(self, thread_id: str, item_id: str, context: dict[str, Any]) -> ThreadItem:
+        buffered = self._pending.get(thread_id, {}).get(item_id)
+        if buffered:
+            return buffered[1]
+
+        rows = self._query("SELECT data FROM items WHERE id = ?", (item_id,))
+        if not rows:
+            raise NotFoundError(f"Item {item_id} not found")
+        return item_adapter.validate_json(rows[0][0])
+
+    async def delete_thread_item(
+        self, thread_id: str, item_id: str, context: dict[str, Any]
+    ) -> None:
+        self._pending.get(thread_id, {}).pop(item_id, None)
+        self._write("DELETE FROM items WHERE id = ?", (item_id,))
+        self._notify_item_deleted(thread_id, item_id)
+
+    # -- Attachments -----------------------------------------------------
+
+    async def save_attachment(self, attachment: Attachment, context: dict[str, Any]) -> None:
+        self._write(
+            "INSERT OR REPLACE INTO attachments (id, data) VALUES (?, ?)",
+            (attachment.id, attachment.model_dump_json()),
+        )
+
+    async def load_attachment(self, attachment_id: str, context: dict[str, Any]) -> Attachment:
+        rows = self._query("SELECT data FROM attachments WHERE id = ?", (attachment_id,))
+        if not rows:
+            raise NotFoundError(f"Attachment {attachment_id} not found")
+        return attachment_adapter.validate_json(rows[0][0])
+
+    async def delete_attachment(self, attachment_id: str, context: dict[str, Any]) -> None:
+        self._write("DELETE FROM attachments WHERE id = ?", (attachment_id,))
@@ -0,0 +1,40 @@
+# store_events.py
+"""
+Item-write notifications for ChatKit Store implementations.
+
+In-process caches built from thread items (e.g. AgentInputCache) register as
+listeners instead of re-reading the store. A listener implements:
+    item_saved(thread_id, item)       item added or replaced
+    item_deleted(thread_id, item_id)
+    thread_deleted(thread_id)
+"""
+import logging
+from typing import Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StoreEvents:
+    """Mixin for Store classes; call the `_notify_*` methods after each successful write."""
+
+    _listeners: Tuple[Any, ...] = ()
+
+    def add_listener(self, listener: Any) -> None:
+        self._listeners = (*self._listeners, listener)
+
+    def _notify(self, method: str, *args: Any) -> None:
+        for listener in self._listeners:
+            try:
+                getattr(listener, method)(*args)
+            except Exception:
+                # A broken cache must never fail the write itself
+                logger.exception("Store listener %r failed in %s", listener, method)
+
+    def _notify_item_saved(self, thread_id: str, item: Any) -> None:
+        self._notify("item_saved", thread_id, item)
+
+    def _notify_item_deleted(self, thread_id: str, item_id: str) -> None:
+        self._notify("item_deleted", thread_id, item_id)
+
+    def _notify_thread_deleted(self, thread_id: str) -> None:
+        self._notify("thread_deleted", thread_id)
@@ -1,29 +1,226 @@
 from __future__ import annotations
 
-import json
+import os
+import asyncio
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, AsyncIterator, Dict, List, Tuple
+from uuid import uuid4
 
 from supabase import Client
 from chatkit.store import NotFoundError, Store
 from chatkit.types import Attachment, Page, ThreadItem, ThreadMetadata
 from pydantic import TypeAdapter
 
+from utils.db import SUPABASE_MAX_CONCURRENCY, QueryExecutor
+from store_events import StoreEvents
+
 # Adapter to help convert JSON back into Pydantic objects (Messages)
 item_adapter = TypeAdapter(ThreadItem)
 
-class SupabaseStore(Store[dict[str, Any]]):
+logger = logging.getLogger(__name__)
+
+# How long item writes may be buffered before they are flushed (0 = write immediately)
+WRITE_BEHIND_DELAY = float(os.environ.get("SUPABASE_WRITE_BEHIND_DELAY", "0.5"))
+KNOWN_THREADS_MAX = 10_000
+# Items this process wrote or already validated, keyed by id (see _cached_item)
+ITEM_CACHE_MAX = int(os.environ.get("SUPABASE_ITEM_CACHE_MAX", "20000"))
+
+class SupabaseStore(StoreEvents, Store[dict[str, Any]]):
     """
     Persistent store using Supabase (PostgreSQL) for ChatKit.
+
+    supabase-py's client is synchronous, so every query runs on a bounded
+    thread pool (`max_concurrency` threads) instead of on the event loop.
+
+    Item writes are buffered per thread (write-behind) and sent as one bulk
+    upsert at the end of a turn (`flush`) or after `write_behind_delay`
+    seconds. Every read of a thread's items flushes that thread first, so
+    reads always see earlier writes in order.
+
+    Item writes and deletes are announced to listeners (store_events.py).
+
+    Every item write stores a random `revision` next to item_data. Items are
+    kept in memory with their revision, so rows this process wrote (or has
+    already parsed) are not validated again when they are read back. Thread
+    metadata is kept serialized, and saving an unchanged thread is a no-op.
     """
 
-    def __init__(self, supabase_client: Client) -> None:
+    def __init__(
+        self,
+        supabase_client: Client,
+        max_concurrency: int = SUPABASE_MAX_CONCURRENCY,
+        write_behind_delay: float = WRITE_BEHIND_DELAY,
+    ) -> None:
         self.supabase = supabase_client
+        self.executor = QueryExecutor(max_concurrency)
+        self.write_behind_delay = write_behind_delay
+
+        # Thread IDs we know exist in chatkit_threads (bounded LRU)
+        self._known_threads: OrderedDict[str, None] = OrderedDict()
+        # thread_id -> {item_id: (row, item)}, in insertion order
+        self._pending: Dict[str, Dict[str, Tuple[dict[str, Any], ThreadItem]]] = {}
+        # thread_id -> (lock, number of holders + waiters); removed when unused
+        self._flush_locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+        self._flush_timers: Dict[str, asyncio.Task] = {}
+        # item_id -> (revision, item), bounded LRU
+        self._items: OrderedDict[str, Tuple[str, ThreadItem]] = OrderedDict()
+        # thread_id -> metadata as last written / read, bounded like _known_threads
+        self._thread_metadata: OrderedDict[str, dict[str, Any]] = OrderedDict()
+
+    async def _execute(self, query: Any, op: str) -> Any:
+        return await self.executor.execute(query, op)
+
+    def _remember_thread(self, thread_id: str) -> None:
+        self._known_threads[thread_id] = None
+        self._known_threads.move_to_end(thread_id)
+        if len(self._known_threads) > KNOWN_THREADS_MAX:
+            self._known_threads.popitem(last=False)
+
+    def _cache_item(self, item_id: str, revision: str | None, item: ThreadItem) -> None:
+        if not revision:
+            return
+        self._items[item_id] = (revision, item)
+        self._items.move_to_end(item_id)
+        if len(self._items) > ITEM_CACHE_MAX:
+            self._items.popitem(last=False)
+
+    def _cached_item(self, row: dict[str, Any]) -> ThreadItem:
+        """The item of a row; only validated when its revision isn't the one we hold."""
+        cached = self._items.get(row["id"])
+        if cached is not None and row.get("revision") and cached[0] == row["revision"]:
+            self._items.move_to_end(row["id"])
+            return cached[1]
+        item = item_adapter.validate_python(row["item_data"])
+        self._cache_item(row["id"], row.get("revision"), item)
+        return item
+
+    def _remember_metadata(self, thread_id: str, metadata: dict[str, Any]) -> None:
+        self._thread_metadata[thread_id] = metadata
+        self._thread_metadata.move_to_end(thread_id)
+        if len(self._thread_metadata) > KNOWN_THREADS_MAX:
+            self._thread_metadata.popitem(last=False)
+
+    async def _ensure_thread(self, thread_id: str, context: dict[str, Any]) -> None:
+        """Make sure the thread row exists (Foreign Key constraint), using the cache when we can."""
+        if thread_id in self._known_threads:
+            self._known_threads.move_to_end(thread_id)
+            return
+
+        response = await self._execute(
+            self.supabase.table("chatkit_threads").select("id").eq("id", thread_id).limit(1),
+            "ensure_thread",
+        )
+        if response.data:
+            self._remember_thread(thread_id)
+        else:
+            # Create a dummy thread entry if it doesn't exist to satisfy FK
+            await self.save_thread(ThreadMetadata(id=thread_id, created_at=datetime.now()), context)
+
+    # -- Write-behind buffer ---------------------------------------------
+
+    def _schedule_flush(self, thread_id: str) -> None:
+        if thread_id in self._flush_timers:
+            return
+
+        async def delayed_flush() -> None:
+            await asyncio.sleep(self.write_behind_delay)
+            self._flush_timers.pop(thread_id, None)
+            try:
+                await self.flush(thread_id)
+            except Exception as e:
+                logger.warning("Background flush failed for thread %s: %s", thread_id, e)
+
+        self._flush_timers[thread_id] = asyncio.create_task(delayed_flush())
+
+    @asynccontextmanager
+    async def _thread_lock(self, thread_id: str) -> AsyncIterator[None]:
+        """Serializes a thread's flushes and deletes (so a delete can't race an upsert in flight)."""
+        lock, users = self._flush_locks.get(thread_id, (None, 0))
+        lock = lock or asyncio.Lock()
+        self._flush_locks[thread_id] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._flush_locks[thread_id]
+            if users == 1:
+                del self._flush_locks[thread_id]
+            else:
+                self._flush_locks[thread_id] = (lock, users - 1)
+
+    async def flush(self, thread_id: str) -> None:
+        """Write all buffered items of a thread in one bulk upsert."""
+        async with self._thread_lock(thread_id):
+            pending = self._pending.pop(thread_id, None)
+            if not pending:
+                return
+            rows = [row for row, _ in pending.values()]
+            try:
+                await self._execute(self.supabase.table("chatkit_items").upsert(rows), "flush_items")
+            except Exception:
+                # Put the rows back in front of anything buffered meanwhile, then surface the error
+                newer = self._pending.pop(thread_id, {})
+                pending.update(newer)
+                self._pending[thread_id] = pending
+                self._schedule_flush(thread_id)
+                raise
+
+    async def flush_all(self) -> None:
+        """Flush every thread (e.g. on shutdown)."""
+        for thread_id in list(self._pending):
+            await self.flush(thread_id)
+
+    # -- Keyset pagination -----------------------------------------------
+
+    async def _load_page(
+        self,
+        table: str,
+        query: Any,
+        limit: int,
+        after: str | None,
+        order: str,
+        scope: dict[str, Any] | None = None,
+    ) -> Tuple[List[dict[str, Any]], bool, str | None]:
+        """
+        Run a list query with keyset pagination on (created_at, id).
+        `after` is the id of the last row of the previous page, and must
+        match `scope` (the same filters as `query`). An unknown cursor (a
+        deleted row, or one of another thread) gives an empty page rather
+        than the first page again. Returns (rows, has_more, next_after).
+        """
+        desc = order == "desc"
+
+        if after:
+            cursor_query = self.supabase.table(table).select("id, created_at").eq("id", after)
+            for column, value in (scope or {}).items():
+                cursor_query = cursor_query.eq(column, value)
+            cursor = await self._execute(cursor_query.limit(1), f"{table}.cursor")
+            if not cursor.data:
+                return [], False, None
+            ts, row_id = cursor.data[0]["created_at"], cursor.data[0]["id"]
+            op = "lt" if desc else "gt"
+            query = query.or_(f'created_at.{op}."{ts}",and(created_at.eq."{ts}",id.{op}."{row_id}")')
+
+        query = query.order("created_at", desc=desc).order("id", desc=desc)
+        if limit:
+            # Fetch one extra row to know whether there is another page
+            query = query.limit(limit + 1)
+
+        response = await self._execute(query, f"{table}.page")
+        rows = response.data or []
+
+        has_more = bool(limit) and len(rows) > limit
+        if has_more:
+            rows = rows[:limit]
+        return rows, has_more, (rows[-1]["id"] if has_more else None)
 
     # -- Thread Metadata -------------------------------------------------
     
     async def load_thread(self, thread_id: str, context: dict[str, Any]) -> ThreadMetadata:
-        response = self.supabase.table("chatkit_threads").select("*").eq("id", thread_id).execute()
+        response = await self._execute(self.supabase.table("chatkit_threads").select("metadata").eq("id", thread_id), "load_thread")
         
         if not response.data:
             # If thread doesn't exist, we return a default one (or raise NotFound)
@@ -31,17 +228,26 @@ class SupabaseStore(Store[dict[str, Any]]):
             return ThreadMetadata(id=thread_id, created_at=datetime.now())
             
         row = response.data[0]
+        self._remember_metadata(thread_id, row["metadata"])
         # Reconstruct Metadata from the stored JSON
         return ThreadMetadata(**row["metadata"])
 
     async def save_thread(self, thread: ThreadMetadata, context: dict[str, Any]) -> None:
+        metadata = thread.model_dump(mode="json")
+        if self._thread_metadata.get(thread.id) == metadata:
+            # Unchanged since we last wrote or read it (ChatKit saves the thread on every turn)
+            self._thread_metadata.move_to_end(thread.id)
+            return
+
         # Prepare data for DB
         data = {
             "id": thread.id,
             "created_at": thread.created_at.isoformat() if thread.created_at else None,
-            "metadata": thread.model_dump(mode="json"),
+            "metadata": metadata,
         }
-        self.supabase.table("chatkit_threads").upsert(data).execute()
+        await self._execute(self.supabase.table("chatkit_threads").upsert(data), "save_thread")
+        self._remember_thread(thread.id)
+        self._remember_metadata(thread.id, metadata)
 
     async def load_threads(
         self,
@@ -50,24 +256,26 @@ class SupabaseStore(Store[dict[str, Any]]):
         order: str,
         context: dict[str, Any],
     ) -> Page[ThreadMetadata]:
-        # Basic pagination implementation
-        query = self.supabase.table("chatkit_threads").select("*").order("created_at", desc=(order == "desc"))
-        
-        if limit:
-            query = query.limit(limit)
-            
-        response = query.execute()
-        
-        threads = [ThreadMetadata(**row["metadata"]) for row in response.data]
-        
-        return Page(
-            data=threads,
-            has_more=False, # Simplified for now
-            after=None,
-        )
+        query = self.supabase.table("chatkit_threads").select("id, created_at, metadata")
+        rows, has_more, next_after = await self._load_page("chatkit_threads", query, limit, after, order)
+
+        threads = []
+        for row in rows:
+            self._remember_metadata(row["id"], row["metadata"])
+            threads.append(ThreadMetadata(**row["metadata"]))
+        return Page(data=threads, has_more=has_more, after=next_after)
 
     async def delete_thread(self, thread_id: str, context: dict[str, Any]) -> None:
-        self.supabase.table("chatkit_threads").delete().eq("id", thread_id).execute()
+        # Under the flush lock: an upsert in flight would re-insert items of the deleted thread
+        async with self._thread_lock(thread_id):
+            self._pending.pop(thread_id, None)
+            timer = self._flush_timers.pop(thread_id, None)
+            if timer is not None:
+                timer.cancel()
+            self._known_threads.pop(thread_id, None)
+            self._thread_metadata.pop(thread_id, None)
+            await self._execute(self.supabase.table("chatkit_threads").delete().eq("id", thread_id), "delete_thread")
+        self._notify_thread_deleted(thread_id)
 
     # -- Thread Items (Messages) -----------------------------------------
 
@@ -79,64 +287,77 @@ class SupabaseStore(Store[dict[str, Any]]):
         order: str,
         context: dict[str, Any],
     ) -> Page[ThreadItem]:
-        
-        query = self.supabase.table("chatkit_items").select("*").eq("thread_id", thread_id)
-        
-        # Ordering
-        query = query.order("created_at", desc=(order == "desc"))
-        
-        # Pagination (simplified)
-        if limit:
-            query = query.limit(limit)
+        # Read-your-writes: push buffered items for this thread first
+        await self.flush(thread_id)
+
+        query = self.supabase.table("chatkit_items").select("id, created_at, revision, item_data").eq("thread_id", thread_id)
+        rows, has_more, next_after = await self._load_page(
+            "chatkit_items", query, limit, after, order, scope={"thread_id": thread_id}
+        )
 
-        response = query.execute()
-        
         # Convert JSON rows back to Pydantic objects
         items = []
-        for row in response.data:
+        for row in rows:
             try:
                 # item_data contains the full JSON structure
-                item = item_adapter.validate_python(row["item_data"])
-                items.append(item)
+                items.append(self._cached_item(row))
             except Exception as e:
-                print(f"Failed to parse item {row['id']}: {e}")
+                logger.warning("Failed to parse item %s: %s", row["id"], e)
 
-        return Page(data=items, has_more=False, after=None)
+        return Page(data=items, has_more=has_more, after=next_after)
 
     async def add_thread_item(
         self, thread_id: str, item: ThreadItem, context: dict[str, Any]
     ) -> None:
         # Ensure thread exists first (Foreign Key constraint)
-        # We try to get the thread; if it fails, we assume we need to create it.
-        # Ideally, save_thread should be called explicitly, but for safety:
-        try:
-            await self.load_thread(thread_id, context)
-        except:
-            # Create a dummy thread entry if it doesn't exist to satisfy FK
-            await self.save_thread(ThreadMetadata(id=thread_id, created_at=datetime.now()), context)
+        await self._ensure_thread(thread_id, context)
 
+        pending = self._pending.setdefault(thread_id, {})
+        previous = pending.get(item.id)
         data = {
             "id": item.id,
             "thread_id": thread_id,
-            "created_at": datetime.now().isoformat(), # Use current time for sorting
+            # Use current time for sorting (kept stable while the item is still buffered)
+            "created_at": previous[0]["created_at"] if previous else datetime.now().isoformat(),
             "item_data": item.model_dump(mode="json"),
+            "revision": uuid4().hex,
         }
-        self.supabase.table("chatkit_items").upsert(data).execute()
+        pending[item.id] = (data, item)
+        self._cache_item(item.id, data["revision"], item)
+        self._notify_item_saved(thread_id, item)
+
+        if self.write_behind_delay <= 0:
+            await self.flush(thread_id)
+        else:
+            self._schedule_flush(thread_id)
 
     async def save_item(self, thread_id: str, item: ThreadItem, context: dict[str, Any]) -> None:
         await self.add_thread_item(thread_id, item, context)
 
     async def load_item(self, thread_id: str, item_id: str, context: dict[str, Any]) -> ThreadItem:
-        response = self.supabase.table("chatkit_items").select("*").eq("id", item_id).single().execute()
+        buffered = self._pending.get(thread_id, {}).get(item_id)
+        if buffered:
+            return buffered[1]
+
+        response = await self._execute(
+            self.supabase.table("chatkit_items").select("id, revision, item_data").eq("id", item_id).single(),
+            "load_item",
+        )
         if not response.data:
             raise NotFoundError(f"Item {item_id} not found")
-        
-        return item_adapter.validate_python(response.data["item_data"])
+
+        return self._cached_item(response.data)
 
     async def delete_thread_item(
         self, thread_id: str, item_id: str, context: dict[str, Any]
     ) -> None:
-        self.supabase.table("chatkit_items").delete().eq("id", item_id).execute()
+        # Drop it from the buffer (if it was never written) and from the DB, after
+        # any upsert in flight (which would otherwise re-create it)
+        async with self._thread_lock(thread_id):
+            self._pending.get(thread_id, {}).pop(item_id, None)
+            self._items.pop(item_id, None)
+            await self._execute(self.supabase.table("chatkit_items").delete().eq("id", item_id), "delete_item")
+        self._notify_item_deleted(thread_id, item_id)
 
     # -- Attachments (Unsupported) ---------------------------------------
     async def save_attachment(self, attachment: Attachment, context: dict[str, Any]) -> None:
@@ -2,23 +2,63 @@
 
 from __future__ import annotations
 
+import json
+import os
+
 from chatkit.agents import ThreadItemConverter
-from chatkit.types import HiddenContextItem
+from chatkit.types import ClientToolCallItem, HiddenContextItem, WidgetItem
 from openai.types.responses import ResponseInputTextParam
 from openai.types.responses.response_input_item_param import Message
 
+# HiddenContextItem content key of the rolling conversation summary (history_compactor.py)
+HISTORY_SUMMARY_KEY = "history_summary"
+# Tool outputs / widget JSON longer than this are cut before they reach the model
+TOOL_PAYLOAD_MAX_CHARS = int(os.environ.get("TOOL_PAYLOAD_MAX_CHARS", "4000"))
+
+
+def _text_message(text: str) -> Message:
+    return Message(
+        type="message",
+        content=[
+            ResponseInputTextParam(
+                type="input_text",
+                text=text,
+            )
+        ],
+        role="user",
+    )
+
+
+def history_summary_input(summary: str) -> Message:
+    return _text_message(
+        "Summary of the earlier conversation (not shown to the user):\n"
+        f"<ConversationSummary>\n{summary}\n</ConversationSummary>"
+    )
+
+
+def _cap(text: str, limit: int = TOOL_PAYLOAD_MAX_CHARS) -> str:
+    if len(text) <= limit:
+        return text
+    return text[:limit] + f"... [{len(text) - limit} characters omitted]"
+
 
 class BasicThreadItemConverter(ThreadItemConverter):
-    """Adds HiddenContextItem support for the boilerplate demo."""
+    """Adds HiddenContextItem support for the boilerplate demo, and caps bulky tool payloads."""
 
     async def hidden_context_to_input(self, item: HiddenContextItem):
-        return Message(
-            type="message",
-            content=[
-                ResponseInputTextParam(
-                    type="input_text",
-                    text=item.content,
-                )
-            ],
-            role="user",
+        if isinstance(item.content, dict) and HISTORY_SUMMARY_KEY in item.content:
+            return history_summary_input(item.content[HISTORY_SUMMARY_KEY])
+        return _text_message(item.content)
+
+    async def client_tool_call_to_input(self, item: ClientToolCallItem):
+        out = await super().client_tool_call_to_input(item)
+        for part in out or []:
+            if part.get("type") == "function_call_output":
+                part["output"] = _cap(part["output"])
+        return out
+
+    async def widget_to_input(self, item: WidgetItem):
+        widget = item.widget.model_dump_json(exclude_unset=True, exclude_none=True)
+        return _text_message(
+            f"The following graphical UI widget (id: {item.id}) was displayed to the user:" + _cap(widget)
         )
@@ -0,0 +1,68 @@
+import os
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from dotenv import load_dotenv
+from supabase import create_client, Client
+
+from utils import metrics
+
+load_dotenv()
+
+SUPABASE_URL = os.environ.get("SUPABASE_URL")
+SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_KEY")
+
+# Shared Supabase client (None when the keys are missing)
+supabase: Client | None = None
+if SUPABASE_URL and SUPABASE_KEY:
+    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+# Max number of Supabase queries running at the same time (per process)
+SUPABASE_MAX_CONCURRENCY = int(os.environ.get("SUPABASE_MAX_CONCURRENCY", "16"))
+
+
+class QueryExecutor:
+    """
+    Runs blocking supabase-py queries off the event loop.
+
+    The sync client keeps one pooled httpx connection pool, so every worker
+    thread reuses the same keep-alive connections. The pool size caps how many
+    queries are in flight, and a slow query only ties up its own thread
+    instead of freezing every other request on the loop.
+    """
+
+    def __init__(self, max_concurrency: int = SUPABASE_MAX_CONCURRENCY) -> None:
+        self.max_concurrency = max_concurrency
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="supabase")
+
+    async def execute(self, query: Any, op: str = "query") -> Any:
+        """
+        Await `query.execute()` (a PostgREST request builder) without blocking the loop.
+
+        `op` labels the call in the Supabase latency metrics; every call also
+        counts as one round trip of the current HTTP request.
+        """
+        loop = asyncio.get_running_loop()
+        metrics.record_db_call()
+        started = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._pool, query.execute)
+        except Exception:
+            metrics.db_query_errors.inc(op=op)
+            raise
+        finally:
+            metrics.db_query_seconds.observe(time.perf_counter() - started, op=op)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False)
+
+
+# Shared executor for code that talks to Supabase outside of SupabaseStore
+default_executor = QueryExecutor()
+
+
+async def run_query(query: Any, op: str = "query") -> Any:
+    """Execute a PostgREST query on the shared executor."""
+    return await default_executor.execute(query, op)
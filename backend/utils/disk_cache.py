@@ -0,0 +1,104 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+# Default location for on-disk caches (embeddings, summaries, transcripts...)
+CACHE_DIR = os.environ.get("CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache"))
+
+
+class DiskCache:
+    """
+    Small persistent key/value cache backed by a local SQLite file.
+
+    Values are raw bytes. When the number of entries goes over `max_entries`,
+    the least recently used entries are evicted.
+    Safe to share between threads and between processes on the same machine.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100_000) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+        # Upper bound on the row count, so we only run COUNT(*) when eviction may be needed
+        self._approx_count = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: list[str]) -> dict[str, bytes]:
+        if not keys:
+            return {}
+        found: dict[str, bytes] = {}
+        now = time.time()
+        with self._lock:
+            # SQLite limits the number of bound parameters, so look up in slices
+            for start in range(0, len(keys), 500):
+                part = keys[start:start + 500]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM cache WHERE key IN ({marks})", part
+                ).fetchall()
+                found.update({k: v for k, v in rows})
+            if found:
+                self._conn.executemany(
+                    "UPDATE cache SET accessed_at = ? WHERE key = ?",
+                    [(now, k) for k in found],
+                )
+        return found
+
+    def set(self, key: str, value: bytes) -> None:
+        self.set_many({key: value})
+
+    def set_many(self, items: dict[str, bytes]) -> None:
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO cache (key, value, accessed_at) VALUES (?, ?, ?)",
+                    [(k, sqlite3.Binary(v), now) for k, v in items.items()],
+                )
+                self._approx_count += len(items)
+                if self._approx_count > self.max_entries:
+                    self._evict()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._approx_count = max(self._approx_count - 1, 0)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def _evict(self) -> None:
+        # Trim down to 90% of the limit so we don't have to evict on every write
+        count = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        if count > self.max_entries:
+            target = int(self.max_entries * 0.9)
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN "
+                "(SELECT key FROM cache ORDER BY accessed_at ASC LIMIT ?)",
+                (count - target,),
+            )
+            count = target
+        self._approx_count = count
@@ -0,0 +1,214 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import hashlib
+from array import array
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Tuple, TypeVar
+
+from openai import AsyncOpenAI
+from dotenv import load_dotenv
+
+from utils import metrics
+from utils.disk_cache import CACHE_DIR, DiskCache
+
+try:
+    import tiktoken
+except ImportError:  # token counts fall back to a character estimate
+    tiktoken = None
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Batching limits (OpenAI allows 2048 inputs and 300k tokens per request)
+BATCH_MAX_TOKENS = int(os.environ.get("EMBEDDING_BATCH_MAX_TOKENS", "100000"))
+BATCH_MAX_INPUTS = int(os.environ.get("EMBEDDING_BATCH_MAX_INPUTS", "2048"))
+# Embedding requests in flight at once, shared by every caller in the process
+MAX_CONCURRENCY = int(os.environ.get("EMBEDDING_MAX_CONCURRENCY", "4"))
+MAX_RETRIES = int(os.environ.get("EMBEDDING_MAX_RETRIES", "4"))
+# Calls with at least this many texts hash, look up and batch them on a worker thread
+THREAD_MIN_TEXTS = int(os.environ.get("EMBEDDING_THREAD_MIN_TEXTS", "64"))
+
+# Initialize OpenAI Client
+aclient = AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+
+# Content-addressed cache: the same text embedded with the same model always
+# gives the same vector, so we never pay for it twice.
+embedding_cache = DiskCache(
+    os.environ.get("EMBEDDING_CACHE_PATH", os.path.join(CACHE_DIR, "embeddings.sqlite3")),
+    max_entries=int(os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", "200000")),
+)
+
+
+def embedding_cache_key(text: str, model: str = EMBEDDING_MODEL) -> str:
+    """Hash of (model, text) used as the cache key."""
+    return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+
+@dataclass
+class EmbeddingStats:
+    """Running totals for this process (reported by bulk_ingest.py)."""
+    requests: int = 0
+    inputs: int = 0
+    tokens: int = 0
+    cache_hits: int = 0
+
+
+embedding_stats = EmbeddingStats()
+
+# One limit for the whole process, so concurrent ingests (job workers,
+# bulk_ingest --concurrency) don't each get MAX_CONCURRENCY requests
+_request_slots = asyncio.Semaphore(MAX_CONCURRENCY)
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in `text` (approximate if tiktoken is not installed)."""
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # The encoding file is downloaded on first use; offline, estimate instead
+            logger.warning("tiktoken unavailable (%s), estimating token counts.", e)
+            _encoding = False
+    if not _encoding:
+        return len(text) // 4 + 1
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+def make_batches(
+    texts: List[str],
+    max_tokens: int = BATCH_MAX_TOKENS,
+    max_inputs: int = BATCH_MAX_INPUTS,
+) -> List[List[int]]:
+    """
+    Group texts into request-sized batches by token count.
+    Returns lists of indexes into `texts`, in order.
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    for i, text in enumerate(texts):
+        tokens = count_tokens(text)
+        if current and (current_tokens + tokens > max_tokens or len(current) >= max_inputs):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def _embed_batch(texts: List[str], model: str) -> List[List[float]]:
+    """Embed one batch, retrying with exponential backoff and jitter."""
+    async with _request_slots:
+        for attempt in range(MAX_RETRIES + 1):
+            started = time.perf_counter()
+            try:
+                response = await aclient.embeddings.create(input=texts, model=model)
+                metrics.embedding_request_seconds.observe(time.perf_counter() - started)
+                usage = getattr(response, "usage", None)
+                tokens = usage.total_tokens if usage is not None else sum(count_tokens(t) for t in texts)
+                embedding_stats.requests += 1
+                embedding_stats.inputs += len(texts)
+                embedding_stats.tokens += tokens
+                metrics.embedding_inputs.inc(len(texts))
+                metrics.embedding_tokens.inc(tokens)
+                return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+            except Exception as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                delay = min(2 ** attempt, 30) * (0.5 + random.random())
+                logger.warning("Embedding batch of %d failed (%s), retrying in %.1fs...", len(texts), e, delay)
+                await asyncio.sleep(delay)
+    raise RuntimeError("unreachable")
+
+
+def _pack(vector: List[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _unpack(data: bytes) -> List[float]:
+    vector = array("f")
+    vector.frombytes(data)
+    return vector.tolist()
+
+
+def _lookup(texts: List[str], model: str) -> Tuple[List[str], Dict[str, List[float]]]:
+    """Cache keys of `texts`, and the vectors already cached for them."""
+    keys = [embedding_cache_key(text, model) for text in texts]
+    cached = embedding_cache.get_many(list(set(keys)))
+    return keys, {key: _unpack(data) for key, data in cached.items()}
+
+
+def _store(vectors: Dict[str, List[float]]) -> None:
+    embedding_cache.set_many({key: _pack(vec) for key, vec in vectors.items()})
+
+
+async def _maybe_in_thread(size: int, fn: Callable[..., T], *args: Any) -> T:
+    # Hashing, SQLite and tokenizing are cheap for a few texts, but would
+    # block the event loop for a whole transcript
+    if size >= THREAD_MIN_TEXTS:
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+
+async def embed_texts(texts: List[str], model: str = EMBEDDING_MODEL) -> List[List[float]]:
+    """
+    Embed a list of texts, using the persistent cache where possible.
+    Only texts that were never embedded with this model are sent to OpenAI.
+    Misses are split into token-bounded batches that run concurrently (at most
+    MAX_CONCURRENCY requests in flight across the process); each
+    batch is retried on its own and cached as soon as it succeeds, so a
+    failure never throws away the batches that already worked.
+    Embeddings are returned in the same order as `texts`.
+    """
+    if not texts:
+        return []
+
+    keys, vectors = await _maybe_in_thread(len(texts), _lookup, texts, model)
+    embedding_stats.cache_hits += len(vectors)
+    metrics.embedding_cache_hits.inc(len(vectors))
+
+    # De-duplicate the misses so repeated chunks are only embedded once
+    missing: dict[str, str] = {}
+    for key, text in zip(keys, texts):
+        if key not in vectors and key not in missing:
+            missing[key] = text
+
+    if missing:
+        missing_keys = list(missing.keys())
+        missing_texts = list(missing.values())
+
+        async def run_batch(indexes: List[int]) -> None:
+            batch_vectors = await _embed_batch([missing_texts[i] for i in indexes], model)
+            new_vectors = {missing_keys[i]: vec for i, vec in zip(indexes, batch_vectors)}
+            await _maybe_in_thread(len(new_vectors), _store, new_vectors)
+            vectors.update(new_vectors)
+
+        batches = await _maybe_in_thread(len(missing_texts), make_batches, missing_texts)
+        results = await asyncio.gather(
+            *(run_batch(indexes) for indexes in batches),
+            return_exceptions=True,
+        )
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            raise errors[0]
+
+    return [vectors[key] for key in keys]
+
+
+async def embed_text(text: str, model: str = EMBEDDING_MODEL) -> List[float]:
+    """Embed a single text (cached)."""
+    vectors = await embed_texts([text], model=model)
+    return vectors[0]
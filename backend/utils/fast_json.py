@@ -0,0 +1,46 @@
+"""
+JSON encoding for responses, caches and SSE.
+
+Uses orjson when it is installed (roughly 10-30x faster than the json module
+for large payloads such as transcripts), otherwise falls back to json with
+the same compact output.
+"""
+
+import json
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # same output, just slower
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON; datetimes as ISO 8601, other unknown types (UUIDs, ...) with str()."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=_default).encode("utf-8")
+
+
+def _default(obj: Any) -> Any:
+    # ISO 8601 for dates and times, like orjson
+    isoformat = getattr(obj, "isoformat", None)
+    return isoformat() if isoformat is not None else str(obj)
+
+
+def loads(data: bytes | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with `dumps`. Return it directly from an endpoint to
+    also skip FastAPI's jsonable_encoder pass over the content.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,87 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from supabase import Client
+
+from utils.db import run_query
+from utils.urls import canonical_meeting_key
+
+# Columns kept in the lookup cache (small; never the transcript itself)
+LOOKUP_COLUMNS = "id, zoom_url, meeting_key, metadata"
+
+MEETING_LOOKUP_MAX_ENTRIES = int(os.environ.get("MEETING_LOOKUP_MAX_ENTRIES", "4096"))
+MEETING_LOOKUP_TTL = float(os.environ.get("MEETING_LOOKUP_TTL", "600"))
+# "Not ingested yet" answers expire quickly, in case another process ingests the meeting
+MEETING_LOOKUP_NEGATIVE_TTL = float(os.environ.get("MEETING_LOOKUP_NEGATIVE_TTL", "30"))
+
+
+def _quote(value: str) -> str:
+    """Quote a value for a PostgREST `or` filter."""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+class MeetingLookup:
+    """
+    URL -> meetinglist row, keyed by the canonical meeting key.
+
+    Bounded LRU with TTLs, including negative entries (URL not ingested yet),
+    so repeated existence checks usually cost no database round trip.
+    Writers keep it current with `remember` / `forget`.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = MEETING_LOOKUP_MAX_ENTRIES,
+        ttl_seconds: float = MEETING_LOOKUP_TTL,
+        negative_ttl_seconds: float = MEETING_LOOKUP_NEGATIVE_TTL,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        # meeting_key -> (expires_at, row or None)
+        self._entries: "OrderedDict[str, Tuple[float, Optional[Dict[str, Any]]]]" = OrderedDict()
+
+    def _put(self, key: str, row: Optional[Dict[str, Any]]) -> None:
+        ttl = self.ttl_seconds if row is not None else self.negative_ttl_seconds
+        self._entries[key] = (time.monotonic() + ttl, row)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def remember(self, url: str, row: Dict[str, Any]) -> None:
+        """Record a meeting that was just written."""
+        self._put(canonical_meeting_key(url), row)
+
+    def forget(self, url: str) -> None:
+        self._entries.pop(canonical_meeting_key(url), None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def find(self, supabase_client: Client, url: str) -> Optional[Dict[str, Any]]:
+        """The stored meeting for a URL (any form of it), or None."""
+        key = canonical_meeting_key(url)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, row = entry
+            if expires_at >= time.monotonic():
+                self._entries.move_to_end(key)
+                return row
+            del self._entries[key]
+
+        # meeting_key is indexed; zoom_url covers rows written before the key existed
+        result = await run_query(
+            supabase_client.table("meetinglist")
+            .select(LOOKUP_COLUMNS)
+            .or_(f"meeting_key.eq.{_quote(key)},zoom_url.eq.{_quote(url)}")
+            .limit(1),
+            "find_meeting",
+        )
+        row = result.data[0] if result.data else None
+        self._put(key, row)
+        return row
+
+
+meeting_lookup = MeetingLookup()
@@ -0,0 +1,244 @@
+"""
+Minimal in-process metrics, exposed in the Prometheus text format at /metrics.
+
+Counters and histograms are plain dicts guarded by one lock each; recording a
+value is a dict lookup plus a bisect, so instrumenting hot paths is cheap.
+Per-request DB round trips are tracked with a contextvar set by
+`MetricsMiddleware`.
+"""
+
+import time
+import threading
+import functools
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Latency buckets (seconds): 1 ms .. 2 min
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Count buckets (round trips per request, chunks per meeting, ...)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233, 377, 610, 1000)
+# Token buckets (prompt sizes)
+TOKEN_BUCKETS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000)
+
+LabelValues = Tuple[str, ...]
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts..., +Inf count], sum
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Observe the duration of the `with` block (also when it raises)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format (0.0.4)."""
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def timed(histogram: Histogram, **labels: Any) -> Callable:
+    """Decorator: observe the duration of every call of an async function."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started, **labels)
+        return wrapper
+    return decorator
+
+
+# -----------------------------------------------------------------------------
+# Per-request DB round trips
+# -----------------------------------------------------------------------------
+
+# A one-element list per request, shared by every task the request spawns
+_request_db_calls: ContextVar[Optional[List[int]]] = ContextVar("request_db_calls", default=None)
+
+
+def start_request() -> List[int]:
+    counter = [0]
+    _request_db_calls.set(counter)
+    return counter
+
+
+def record_db_call() -> None:
+    counter = _request_db_calls.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: request latency and DB round trips per route template.
+
+    Plain ASGI rather than BaseHTTPMiddleware so streamed responses (ChatKit
+    SSE) are timed until their last body chunk, not until the headers.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        db_calls = start_request()
+        status = [500]
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the scope; unmatched paths
+            # share one label so random URLs can't blow up the label set
+            route = getattr(scope.get("route"), "path", "unmatched")
+            http_request_seconds.observe(
+                time.perf_counter() - started, method=scope["method"], route=route, status=status[0]
+            )
+            http_request_db_calls.observe(db_calls[0], route=route)
+
+
+# -----------------------------------------------------------------------------
+# Metrics used across the backend
+# -----------------------------------------------------------------------------
+
+http_request_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP request latency.", ["method", "route", "status"]
+)
+http_request_db_calls = Histogram(
+    "http_request_db_round_trips", "Supabase round trips per HTTP request.", ["route"], buckets=COUNT_BUCKETS
+)
+db_query_seconds = Histogram("supabase_query_duration_seconds", "Supabase query latency.", ["op"])
+db_query_errors = Counter("supabase_query_errors_total", "Failed Supabase queries.", ["op"])
+tool_call_seconds = Histogram("agent_tool_duration_seconds", "Agent tool latency.", ["tool"])
+embedding_request_seconds = Histogram("embedding_request_duration_seconds", "Embeddings API request latency.")
+embedding_tokens = Counter("embedding_tokens_total", "Tokens sent to the embeddings API.")
+embedding_inputs = Counter("embedding_inputs_total", "Texts sent to the embeddings API.")
+embedding_cache_hits = Counter("embedding_cache_hits_total", "Embeddings served from the cache.")
+summarizer_seconds = Histogram("summarizer_duration_seconds", "Summarizer latency.", ["stage"])
+summarizer_sections = Counter("summarizer_sections_total", "Summarized transcript sections.", ["cache"])
+transcript_fetch_seconds = Histogram("transcript_fetch_duration_seconds", "Transcript fetch latency.", ["source"])
+index_chunks = Counter("index_chunks_total", "Transcript chunks seen by the indexer.", ["result"])
+index_chunks_per_meeting = Histogram(
+    "index_chunks_per_meeting", "Chunks per indexed transcript.", buckets=COUNT_BUCKETS
+)
+agent_input_tokens = Histogram(
+    "agent_input_history_tokens", "Thread history tokens sent to the agent per turn.", buckets=TOKEN_BUCKETS
+)
+history_summaries = Counter("history_summaries_total", "Rolling conversation summary updates.", ["result"])
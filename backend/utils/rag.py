@@ -1,93 +1,230 @@
 import os
 import json
 import asyncio
-from typing import List, Dict, Any
+import hashlib
+import logging
+from typing import List, Dict, Any, Tuple
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from openai import AsyncOpenAI
 from supabase import Client
 from dotenv import load_dotenv
 
+from utils import metrics
+from utils.embeddings import embed_texts
+from utils.db import run_query
+from utils.retrieval import retrieval_engine
+from utils.response_cache import invalidate_meeting
+from utils.vector_codec import embedding_columns
+
 # Load env vars if running locally for testing
 load_dotenv() 
 
-# Initialize OpenAI Client
-aclient = AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+logger = logging.getLogger(__name__)
+
+# Chunks are stored as (start_offset, end_offset) into the canonical transcript
+# (meetinglist.content), never as a second copy of the text.
+
+def chunk_spans(transcript: str) -> List[Tuple[int, int]]:
+    """Split a transcript into chunks and return their (start, end) offsets."""
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1200,
+        chunk_overlap=200,
+        separators=["\n\n", "\n", ".", "!", "?"],
+        add_start_index=True,
+    )
+    docs = splitter.create_documents([transcript])
+    spans = []
+    for doc in docs:
+        start = doc.metadata.get("start_index", -1)
+        if start < 0:
+            start = transcript.find(doc.page_content)
+        spans.append((start, start + len(doc.page_content)))
+    return spans
+
+
+def split_transcript(transcript: str) -> List[str]:
+    """The chunk texts we embed (views over the transcript)."""
+    return [transcript[start:end] for start, end in chunk_spans(transcript)]
 
-async def index_meeting_transcript(meeting_id: str, transcript: str, supabase_client: Client) -> str:
+
+def chunk_text(transcript: str, row: Dict[str, Any]) -> str:
+    """Text of a stored chunk row (older rows still carry their own content)."""
+    if row.get("start_offset") is None:
+        return row.get("content") or ""
+    return transcript[row["start_offset"]:row["end_offset"]]
+
+
+def display_views(transcript: str, rows: List[Dict[str, Any]], next_start: int | None = None) -> List[Dict[str, Any]]:
+    """
+    Non-overlapping views for display: each chunk runs from its own start to
+    the next chunk's start. `next_start` is the start of the chunk after `rows`
+    (None if `rows` ends the transcript).
+    """
+    views = []
+    for i, row in enumerate(rows):
+        if row.get("start_offset") is None:
+            views.append({"chunk_index": row["chunk_index"], "content": chunk_text(transcript, row)})
+            continue
+        if i + 1 < len(rows) and rows[i + 1].get("start_offset") is not None:
+            end = rows[i + 1]["start_offset"]
+        elif i + 1 == len(rows) and next_start is not None:
+            end = next_start
+        else:
+            end = len(transcript)
+        views.append({"chunk_index": row["chunk_index"], "content": transcript[row["start_offset"]:end]})
+    return views
+
+
+def _content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+async def index_meeting_transcript(
+    meeting_id: str,
+    transcript: str,
+    supabase_client: Client,
+    metadata: Dict[str, Any] | None = None,
+) -> str:
     """
-    Full RAG Pipeline:
-    1. Fetches meeting metadata from DB.
-    2. Splits and Embeds the transcript.
-    3. Merges metadata into chunks.
-    4. Deletes OLD chunks for this meeting (Prevention).
-    5. Inserts NEW chunks into DB.
+    Full RAG Pipeline (incremental):
+    1. Fetches meeting metadata from DB (unless the caller already has it).
+    2. Splits the transcript into (start, end) offsets.
+    3. Compares the new chunks with the chunks already stored for this meeting.
+    4. Embeds only new or changed chunks (through the embedding cache).
+    5. Upserts the new and changed chunks, then deletes the ones that no longer exist.
+       Unchanged rows are kept as-is.
+    `transcript` must be the canonical text stored in meetinglist.content.
     """
     if not transcript:
         return "No transcript to process."
 
     # --- 1. Fetch Metadata from 'meetinglist' ---
-    print(f"🔍 Fetching metadata for meeting {meeting_id}...")
-    try:
-        meta_response = supabase_client.table("meetinglist").select("metadata").eq("id", meeting_id).single().execute()
-        existing_metadata = meta_response.data.get("metadata", {}) if meta_response.data else {}
-    except Exception as e:
-        print(f"⚠️ Failed to fetch metadata: {e}. Proceeding with empty metadata.")
-        existing_metadata = {}
+    if metadata is not None:
+        existing_metadata = metadata
+    else:
+        logger.info("Fetching metadata for meeting %s", meeting_id)
+        try:
+            meta_response = await run_query(
+                supabase_client.table("meetinglist").select("metadata").eq("id", meeting_id).single(),
+                "meeting_metadata",
+            )
+            existing_metadata = meta_response.data.get("metadata", {}) if meta_response.data else {}
+        except Exception as e:
+            logger.warning("Failed to fetch metadata: %s. Proceeding with empty metadata.", e)
+            existing_metadata = {}
 
     # --- 2. Split Text ---
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1200,
-        chunk_overlap=200,
-        separators=["\n\n", "\n", ".", "!", "?"],
-    )
-    docs = splitter.create_documents([transcript])
-    chunks_text = [doc.page_content for doc in docs]
+    spans = chunk_spans(transcript)
+    chunks_text = [transcript[start:end] for start, end in spans]
 
     if not chunks_text:
         return "Transcript too short to chunk."
 
-    # --- 3. Generate Embeddings ---
-    print(f"🧠 Generating embeddings for {len(chunks_text)} chunks...")
+    # --- 3. Diff against the chunks already stored ---
     try:
-        response = await aclient.embeddings.create(
-            input=chunks_text,
-            model="text-embedding-3-small"
+        existing_response = await run_query(
+            supabase_client.table("transcript_chunks")
+            .select("id, chunk_index, start_offset, end_offset, content_hash, metadata")
+            .eq("transcript_id", meeting_id),
+            "load_chunks",
         )
+        existing_rows = existing_response.data or []
     except Exception as e:
-        return f"OpenAI Embedding Error: {e}"
+        logger.warning("Failed to load existing chunks: %s. Re-indexing everything.", e)
+        existing_rows = []
+
+    existing_by_index: Dict[int, Dict[str, Any]] = {}
+    stale_ids: List[Any] = []
+    stale_indexes: List[int] = []
+    for row in existing_rows:
+        existing_by_index[row["chunk_index"]] = row
 
-    # --- 4. Prepare Rows with Metadata ---
-    processed_chunks = []
-    for i, (text_content, embedding_data) in enumerate(zip(chunks_text, response.data)):
-        
+    new_rows: List[Dict[str, Any]] = []
+    new_texts: List[str] = []
+    for i, ((start, end), text_content) in enumerate(zip(spans, chunks_text)):
         chunk_metadata = {
             "source": "transcript",
             "chunk_index": i,
             **existing_metadata 
         }
 
-        processed_chunks.append({
+        content_hash = _content_hash(text_content)
+        old_row = existing_by_index.pop(i, None)
+        if (
+            old_row
+            and old_row.get("content_hash") == content_hash
+            and old_row.get("start_offset") == start
+            and old_row.get("end_offset") == end
+            and old_row.get("metadata") == chunk_metadata
+        ):
+            continue  # unchanged, keep the stored row and its embedding
+
+        new_rows.append({
             # CHANGED: 'meeting_id' -> 'transcript_id' to match your DB schema
             "transcript_id": meeting_id,
             "chunk_index": i,
-            "content": text_content,
-            "embedding": embedding_data.embedding,
+            "start_offset": start,
+            "end_offset": end,
+            "content_hash": content_hash,
+            "content": None,
             "metadata": chunk_metadata 
         })
+        new_texts.append(text_content)
 
-    # --- 5. Clean Up Old Chunks (Prevent Duplicates) ---
-    print(f"🧹 Removing old chunks for meeting {meeting_id}...")
-    try:
-        # CHANGED: .eq("meeting_id") -> .eq("transcript_id")
-        supabase_client.table("transcript_chunks").delete().eq("transcript_id", meeting_id).execute()
-    except Exception as e:
-        # We log but don't stop, just in case table is empty or permission issue
-        print(f"Warning during cleanup: {e}")
+    # Anything left over belongs to chunk indexes that no longer exist
+    stale_ids.extend(row["id"] for row in existing_by_index.values())
+    stale_indexes.extend(existing_by_index.keys())
 
-    # --- 6. Bulk Insert ---
-    print(f"💾 Saving {len(processed_chunks)} chunks to Supabase...")
-    try:
-        supabase_client.table("transcript_chunks").insert(processed_chunks).execute()
-        return f"Successfully indexed {len(processed_chunks)} chunks with metadata."
-    except Exception as e:
-        return f"Database Insert Error: {e}"
\ No newline at end of file
+    unchanged = len(chunks_text) - len(new_rows)
+    metrics.index_chunks_per_meeting.observe(len(chunks_text))
+    metrics.index_chunks.inc(unchanged, result="unchanged")
+    if not new_rows and not stale_ids:
+        return f"Index already up to date ({unchanged} chunks unchanged)."
+
+    # --- 4. Generate Embeddings (new / changed chunks only) ---
+    if new_rows:
+        logger.info("Generating embeddings for %d of %d chunks", len(new_rows), len(chunks_text))
+        try:
+            vectors = await embed_texts(new_texts)
+        except Exception as e:
+            return f"OpenAI Embedding Error: {e}"
+
+        for row, vector in zip(new_rows, vectors):
+            # JSON float list, or packed float16 / int8 (EMBEDDING_STORAGE)
+            row.update(embedding_columns(vector))
+
+    # --- 5. Upsert new and changed chunks (rewritten in place) ---
+    if new_rows:
+        logger.info("Saving %d chunks to Supabase", len(new_rows))
+        try:
+            await run_query(
+                supabase_client.table("transcript_chunks").upsert(new_rows, on_conflict="transcript_id,chunk_index"),
+                "upsert_chunks",
+            )
+        except Exception as e:
+            return f"Database Insert Error: {e}"
+        metrics.index_chunks.inc(len(new_rows), result="embedded")
+
+    # --- 6. Remove stale chunks, only once their replacements are stored ---
+    if stale_ids:
+        logger.info("Removing %d stale chunks for meeting %s", len(stale_ids), meeting_id)
+        try:
+            await run_query(supabase_client.table("transcript_chunks").delete().in_("id", stale_ids), "delete_chunks")
+        except Exception as e:
+            # The new rows are stored, so cached views of this meeting are wrong now
+            await retrieval_engine.drop_meeting(meeting_id)
+            invalidate_meeting(meeting_id=meeting_id)
+            return f"Database Cleanup Error: {e}"
+        metrics.index_chunks.inc(len(stale_ids), result="removed")
+
+    # --- 7. Keep the in-memory search index and cached analyses in sync ---
+    await retrieval_engine.apply_changes(
+        meeting_id,
+        [{**row, "content": text} for row, text in zip(new_rows, new_texts)],
+        stale_indexes,
+    )
+    invalidate_meeting(meeting_id=meeting_id)
+
+    return (
+        f"Successfully indexed {len(chunks_text)} chunks with metadata "
+        f"({unchanged} unchanged, {len(new_rows)} embedded, {len(stale_ids)} removed)."
+    )
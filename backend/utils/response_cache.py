@@ -0,0 +1,138 @@
+import os
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+from utils.fast_json import dumps
+from utils.urls import canonical_meeting_key
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    expires_at: float
+    tags: Set[Hashable] = field(default_factory=set)
+
+
+class ResponseCache:
+    """
+    Bounded LRU + TTL cache of serialized JSON responses.
+    Every entry carries a strong ETag (hash of the body) and a set of tags,
+    so writers can invalidate all responses built from a given meeting.
+
+    `get_or_build` shares one build between concurrent misses. Every
+    invalidation bumps a generation counter, and a build that was running
+    when it happened is returned to its callers but not stored, since it
+    may have read the data before the write.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 300.0) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        # Single-flight: builds in progress
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._generation = 0
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _entry(self, payload: Any, tags: Set[Hashable] | None) -> CachedResponse:
+        body = dumps(payload)
+        return CachedResponse(
+            body=body,
+            etag='"' + hashlib.sha256(body).hexdigest()[:32] + '"',
+            expires_at=time.monotonic() + self.ttl_seconds,
+            tags=set(tags or ()),
+        )
+
+    def set(self, key: Hashable, payload: Any, tags: Set[Hashable] | None = None) -> CachedResponse:
+        entry = self._entry(payload, tags)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    async def get_or_build(
+        self,
+        key: Hashable,
+        build: Callable[[], Awaitable[Tuple[Any, Set[Hashable]]]],
+    ) -> CachedResponse:
+        """Entry for `key`, built with `build()` (returning payload and tags) on a miss."""
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+        # The build runs in its own task, so one caller going away doesn't cancel it for the rest
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._build(key, build))
+            task.add_done_callback(lambda done: self._build_done(key, done))
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _build(
+        self,
+        key: Hashable,
+        build: Callable[[], Awaitable[Tuple[Any, Set[Hashable]]]],
+    ) -> CachedResponse:
+        generation = self._generation
+        payload, tags = await build()
+        if generation != self._generation:
+            return self._entry(payload, tags)
+        return self.set(key, payload, tags)
+
+    def _build_done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved if every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def invalidate(self, tag: Hashable) -> None:
+        """Drop every entry stored under `tag` (or whose key is `tag`)."""
+        self._generation += 1
+        # Builds already running may have read the old data: later misses start a new one
+        self._inflight.clear()
+        self._entries.pop(tag, None)
+        for key in [k for k, e in self._entries.items() if tag in e.tags]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._inflight.clear()
+        self._entries.clear()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match header value matches `etag`."""
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+# Cache for /api/analysis, keyed by canonical meeting key and tagged with ("meeting", id)
+analysis_cache = ResponseCache(
+    max_entries=int(os.environ.get("ANALYSIS_CACHE_MAX_ENTRIES", "512")),
+    ttl_seconds=float(os.environ.get("ANALYSIS_CACHE_TTL", "300")),
+)
+
+
+def invalidate_meeting(meeting_id: Any = None, url: Optional[str] = None) -> None:
+    """Call after writing a meeting (or its chunks) so cached analyses are rebuilt."""
+    if url is not None:
+        analysis_cache.invalidate(canonical_meeting_key(url))
+    if meeting_id is not None:
+        analysis_cache.invalidate(("meeting", meeting_id))
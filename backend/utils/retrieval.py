@@ -0,0 +1,435 @@
+import re
+import math
+import asyncio
+import logging
+from bisect import bisect_right
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from supabase import Client
+
+from utils.db import run_query
+from utils.embeddings import embed_text
+from utils.vector_codec import EMBEDDING_COLUMNS, row_vector
+
+# Reciprocal Rank Fusion constant (standard value from the RRF paper)
+RRF_K = 60
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+# How many meetings we keep in memory
+MAX_CACHED_MEETINGS = 256
+# PostgREST returns at most 1000 rows per request
+PAGE_SIZE = 1000
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+logger = logging.getLogger(__name__)
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class ChunkIndex:
+    """
+    In-memory search index over a set of transcript chunks:
+    a normalized float32 embedding matrix (cosine search) plus BM25 statistics.
+    """
+
+    def __init__(self, chunks: List[Dict[str, Any]], vectors: Optional[np.ndarray] = None) -> None:
+        # chunks: dicts with transcript_id, chunk_index, content
+        self.chunks = chunks
+        if vectors is None:
+            vectors = np.zeros((0, 0), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True) if len(vectors) else None
+        self.matrix = vectors / np.maximum(norms, 1e-12) if norms is not None else vectors
+
+        # BM25 statistics: an inverted index term -> (doc positions, term frequencies)
+        postings: Dict[str, tuple] = {}
+        lengths = []
+        for i, chunk in enumerate(chunks):
+            freqs = Counter(tokenize(chunk["content"]))
+            lengths.append(sum(freqs.values()))
+            for term, tf in freqs.items():
+                docs, tfs = postings.setdefault(term, ([], []))
+                docs.append(i)
+                tfs.append(tf)
+        self.postings = {
+            term: (np.array(docs, dtype=np.int64), np.array(tfs, dtype=np.float32))
+            for term, (docs, tfs) in postings.items()
+        }
+        self.doc_lengths = np.array(lengths, dtype=np.float32)
+        self.avg_length = float(self.doc_lengths.mean()) if len(chunks) else 0.0
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def cosine_scores(self, query_vector: np.ndarray) -> np.ndarray:
+        if not len(self.chunks):
+            return np.zeros(0, dtype=np.float32)
+        q = query_vector / max(float(np.linalg.norm(query_vector)), 1e-12)
+        return self.matrix @ q
+
+    def bm25_scores(
+        self,
+        query: str,
+        n: Optional[int] = None,
+        avg_length: Optional[float] = None,
+        df: Optional[Dict[str, int]] = None,
+    ) -> np.ndarray:
+        """
+        BM25 score of every chunk. A CorpusIndex passes the collection
+        statistics (chunk count, average length, document frequencies) of
+        the whole corpus; by default they are this index's own.
+        """
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        if not len(self.chunks):
+            return scores
+        n = n or len(self.chunks)
+        avg_length = self.avg_length if avg_length is None else avg_length
+        length_norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths / max(avg_length, 1e-6))
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            docs, tf = self.postings[term]
+            term_df = df[term] if df is not None else len(docs)
+            idf = math.log(1 + (n - term_df + 0.5) / (term_df + 0.5))
+            scores[docs] += idf * tf * (BM25_K1 + 1) / (tf + length_norm[docs])
+        return scores
+
+    def search(self, query: str, query_vector: np.ndarray, k: int = 5) -> List[Dict[str, Any]]:
+        """Hybrid search: fuse the cosine and BM25 rankings with Reciprocal Rank Fusion."""
+        if not len(self.chunks):
+            return []
+        cosine = self.cosine_scores(query_vector)
+        top, fused = _fuse(cosine, self.bm25_scores(query), k)
+        return [_result(self.chunks[i], fused[i], cosine[i]) for i in top]
+
+
+class CorpusIndex:
+    """
+    Search index over every meeting, kept as one ChunkIndex segment per
+    meeting, so a write rebuilds only the segment of the meeting it changed.
+    BM25 uses the statistics of the whole corpus, so results are the same as
+    with a single index over all chunks. Immutable: `replace` returns a new
+    CorpusIndex, and searches already running keep the old one.
+    """
+
+    def __init__(self, segments: Dict[Any, ChunkIndex]) -> None:
+        # Segments in transcript_id order, empty ones dropped
+        self.segments = {key: segments[key] for key in sorted(segments) if len(segments[key])}
+        self._indexes = list(self.segments.values())
+        # Position of each segment's first chunk in the fused score arrays
+        self._starts = []
+        total = 0
+        for segment in self._indexes:
+            self._starts.append(total)
+            total += len(segment)
+        self._size = total
+        self.avg_length = (
+            sum(float(segment.doc_lengths.sum()) for segment in self._indexes) / total if total else 0.0
+        )
+
+    def __len__(self) -> int:
+        return self._size
+
+    def replace(self, meeting_id: Any, segment: ChunkIndex) -> "CorpusIndex":
+        """A new CorpusIndex with `meeting_id`'s segment replaced (or added)."""
+        return CorpusIndex({**self.segments, meeting_id: segment})
+
+    def search(self, query: str, query_vector: np.ndarray, k: int = 5) -> List[Dict[str, Any]]:
+        """Hybrid search over every segment, fused as one ranking."""
+        if not self._size:
+            return []
+        cosine = np.concatenate([segment.cosine_scores(query_vector) for segment in self._indexes])
+        terms = set(tokenize(query))
+        df = {
+            term: sum(len(segment.postings[term][0]) for segment in self._indexes if term in segment.postings)
+            for term in terms
+        }
+        bm25 = np.concatenate([
+            segment.bm25_scores(query, n=self._size, avg_length=self.avg_length, df=df)
+            for segment in self._indexes
+        ])
+        top, fused = _fuse(cosine, bm25, k)
+        results = []
+        for i in top:
+            s = bisect_right(self._starts, i) - 1
+            results.append(_result(self._indexes[s].chunks[i - self._starts[s]], fused[i], cosine[i]))
+        return results
+
+
+def _fuse(cosine: np.ndarray, bm25: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Positions of the top `k` chunks by Reciprocal Rank Fusion, best first, and the fused scores."""
+    n = len(cosine)
+    fused = np.zeros(n, dtype=np.float32)
+    ranks = np.arange(1, n + 1, dtype=np.float32)
+    fused[np.argsort(-cosine)] += 1.0 / (RRF_K + ranks)
+    if bm25.any():
+        order = np.argsort(-bm25)
+        matched = bm25[order] > 0
+        fused[order[matched]] += 1.0 / (RRF_K + ranks[matched])
+
+    k = min(k, n)
+    top = np.argpartition(-fused, k - 1)[:k]
+    return top[np.argsort(-fused[top])], fused
+
+
+def _result(chunk: Dict[str, Any], score: float, similarity: float) -> Dict[str, Any]:
+    return {
+        "meeting_id": chunk["transcript_id"],
+        "chunk_index": chunk["chunk_index"],
+        "content": chunk["content"],
+        "score": float(score),
+        "similarity": float(similarity),
+    }
+
+
+def _patched(
+    raw: tuple,
+    meeting_id: Any,
+    upserted: List[Dict[str, Any]],
+    removed_indexes: List[int],
+) -> tuple:
+    """
+    A meeting's (chunks, matrix) with its changes applied: removed and
+    rewritten chunks replaced by `upserted`, in chunk_index order.
+    """
+    chunks, matrix = raw
+    replaced = set(removed_indexes) | {row["chunk_index"] for row in upserted}
+    keep = [
+        i for i, c in enumerate(chunks)
+        if c["transcript_id"] != meeting_id or c["chunk_index"] not in replaced
+    ]
+
+    new_chunks = [chunks[i] for i in keep]
+    new_vectors = [matrix[keep]] if keep else []
+    for row in upserted:
+        new_chunks.append({
+            "transcript_id": meeting_id,
+            "chunk_index": row["chunk_index"],
+            "content": row["content"],
+        })
+        new_vectors.append(row_vector(row)[None, :])
+
+    order = sorted(range(len(new_chunks)), key=lambda i: (new_chunks[i]["transcript_id"], new_chunks[i]["chunk_index"]))
+    merged = np.vstack(new_vectors) if new_vectors else np.zeros((0, 0), dtype=np.float32)
+    if len(order):
+        merged = merged[order]
+    return [new_chunks[i] for i in order], merged
+
+
+def _build(raw: tuple) -> ChunkIndex:
+    return ChunkIndex(*raw)
+
+
+def _load(chunks: List[Dict[str, Any]], vectors: List[np.ndarray]) -> Tuple[tuple, ChunkIndex]:
+    matrix = np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+    return (chunks, matrix), ChunkIndex(chunks, matrix)
+
+
+def _load_corpus(chunks: List[Dict[str, Any]], vectors: List[np.ndarray]) -> Tuple[Dict[Any, tuple], CorpusIndex]:
+    """Per-meeting (chunks, matrix) and the corpus index built from them."""
+    grouped: Dict[Any, Tuple[list, list]] = {}
+    for chunk, vector in zip(chunks, vectors):
+        meeting_chunks, meeting_vectors = grouped.setdefault(chunk["transcript_id"], ([], []))
+        meeting_chunks.append(chunk)
+        meeting_vectors.append(vector)
+    raws: Dict[Any, tuple] = {}
+    segments: Dict[Any, ChunkIndex] = {}
+    for meeting_id, (meeting_chunks, meeting_vectors) in grouped.items():
+        raws[meeting_id], segments[meeting_id] = _load(meeting_chunks, meeting_vectors)
+    return raws, CorpusIndex(segments)
+
+
+class RetrievalEngine:
+    """
+    Keeps chunk indexes in memory, per meeting (LRU) and for the whole corpus,
+    so questions are answered without a database round trip.
+
+    Writes (`apply_changes`) rebuild only the written meeting's index, and
+    swap it into the meeting cache and the corpus (one segment per meeting).
+    Every write bumps a generation counter, and a load that started before a
+    write is used for its own query but not kept, since it may predate the
+    write. Index builds (BM25 tokenization, matrix stacking) run on a worker
+    thread, not on the event loop.
+    """
+
+    def __init__(self, max_meetings: int = MAX_CACHED_MEETINGS) -> None:
+        self.max_meetings = max_meetings
+        self._meetings: OrderedDict[Any, ChunkIndex] = OrderedDict()
+        self._raw: Dict[Any, tuple] = {}
+        # Single-flight: meeting loads in progress
+        self._inflight: Dict[Any, asyncio.Task] = {}
+        self._corpus: Optional[CorpusIndex] = None
+        # Per-meeting (chunks, matrix) behind the corpus segments
+        self._corpus_raw: Optional[Dict[Any, tuple]] = None
+        self._corpus_lock = asyncio.Lock()
+        # Serializes writes, so patches never overwrite each other
+        self._update_lock = asyncio.Lock()
+        self._generation = 0
+
+    # -- Loading ---------------------------------------------------------
+
+    async def _fetch_chunks(self, supabase_client: Client, meeting_id: Any = None) -> tuple:
+        chunks: List[Dict[str, Any]] = []
+        vectors: List[np.ndarray] = []
+        skipped = 0
+        start = 0
+        while True:
+            query = supabase_client.table("transcript_chunks").select(
+                "transcript_id, chunk_index, start_offset, end_offset, content, " + EMBEDDING_COLUMNS
+            )
+            if meeting_id is not None:
+                query = query.eq("transcript_id", meeting_id)
+            query = query.order("transcript_id").order("chunk_index").range(start, start + PAGE_SIZE - 1)
+            rows = (await run_query(query, "load_chunks")).data or []
+            for row in rows:
+                # Packed (float16 / int8) or pgvector, decoded straight into NumPy
+                vector = row_vector(row)
+                row.pop("embedding", None)
+                row.pop("embedding_q", None)
+                if vector is None:
+                    skipped += 1
+                    continue
+                vectors.append(vector)
+                chunks.append(row)
+            if len(rows) < PAGE_SIZE:
+                break
+            start += PAGE_SIZE
+        if skipped:
+            logger.warning(
+                "Skipped %d chunks without an embedding (meeting %s); they can't be searched until re-indexed",
+                skipped, "all" if meeting_id is None else meeting_id,
+            )
+
+        # Chunk text is a view into the canonical transcript (meetinglist.content)
+        meeting_ids = list({c["transcript_id"] for c in chunks if c.get("start_offset") is not None})
+        transcripts: Dict[Any, str] = {}
+        for i in range(0, len(meeting_ids), 100):
+            result = await run_query(
+                supabase_client.table("meetinglist")
+                .select("id, content")
+                .in_("id", meeting_ids[i:i + 100]),
+                "load_transcripts",
+            )
+            transcripts.update({row["id"]: row.get("content") or "" for row in result.data or []})
+        for chunk in chunks:
+            chunk_start = chunk.pop("start_offset", None)
+            chunk_end = chunk.pop("end_offset", None)
+            if chunk_start is not None:
+                chunk["content"] = transcripts.get(chunk["transcript_id"], "")[chunk_start:chunk_end]
+            else:
+                chunk["content"] = chunk.get("content") or ""
+
+        return chunks, vectors
+
+    def _store(self, meeting_id: Any, raw: tuple, index: ChunkIndex) -> None:
+        self._meetings[meeting_id] = index
+        self._raw[meeting_id] = raw
+        self._meetings.move_to_end(meeting_id)
+        while len(self._meetings) > self.max_meetings:
+            evicted, _ = self._meetings.popitem(last=False)
+            self._raw.pop(evicted, None)
+
+    async def get_meeting_index(self, supabase_client: Client, meeting_id: Any) -> ChunkIndex:
+        if meeting_id in self._meetings:
+            self._meetings.move_to_end(meeting_id)
+            return self._meetings[meeting_id]
+
+        # Single-flight: concurrent searches on a cold meeting load it once.
+        # The load runs in its own task, so one search going away doesn't cancel it for the rest
+        task = self._inflight.get(meeting_id)
+        if task is None:
+            task = asyncio.create_task(self._load_meeting(supabase_client, meeting_id))
+            task.add_done_callback(lambda done: self._load_done(meeting_id, done))
+            self._inflight[meeting_id] = task
+        return await asyncio.shield(task)
+
+    async def _load_meeting(self, supabase_client: Client, meeting_id: Any) -> ChunkIndex:
+        generation = self._generation
+        chunks, vectors = await self._fetch_chunks(supabase_client, meeting_id)
+        raw, index = await asyncio.to_thread(_load, chunks, vectors)
+        if generation == self._generation:
+            self._store(meeting_id, raw, index)
+        return index
+
+    def _load_done(self, meeting_id: Any, task: asyncio.Task) -> None:
+        if self._inflight.get(meeting_id) is task:
+            del self._inflight[meeting_id]
+        # Mark the exception as retrieved if every search went away
+        if not task.cancelled():
+            task.exception()
+
+    async def get_corpus_index(self, supabase_client: Client) -> CorpusIndex:
+        async with self._corpus_lock:
+            if self._corpus is not None:
+                return self._corpus
+            generation = self._generation
+            chunks, vectors = await self._fetch_chunks(supabase_client)
+            raws, index = await asyncio.to_thread(_load_corpus, chunks, vectors)
+            if generation == self._generation:
+                self._corpus_raw, self._corpus = raws, index
+            return index
+
+    # -- Incremental updates ---------------------------------------------
+
+    async def apply_changes(
+        self,
+        meeting_id: Any,
+        upserted: List[Dict[str, Any]],
+        removed_indexes: List[int],
+    ) -> None:
+        """
+        Called after `index_meeting_transcript` writes. `upserted` rows carry
+        chunk_index, content and embedding. The meeting's index is rebuilt
+        once, from its own chunks, and replaces it in the meeting cache and
+        in the corpus. If neither holds the meeting it is left alone (it is
+        read fresh on first use).
+        """
+        self._generation += 1
+        async with self._update_lock:
+            raw = self._raw.get(meeting_id)
+            if raw is None and self._corpus_raw is not None:
+                # Not in the corpus yet: a meeting indexed for the first time
+                raw = self._corpus_raw.get(meeting_id, ([], np.zeros((0, 0), dtype=np.float32)))
+            if raw is None:
+                return
+            raw = await asyncio.to_thread(_patched, raw, meeting_id, upserted, removed_indexes)
+            index = await asyncio.to_thread(_build, raw)
+            if meeting_id in self._raw:
+                self._store(meeting_id, raw, index)
+            if self._corpus is not None:
+                self._corpus_raw[meeting_id] = raw
+                self._corpus = self._corpus.replace(meeting_id, index)
+
+    async def drop_meeting(self, meeting_id: Any) -> None:
+        """Forget a meeting whose stored chunks are unknown; it (and the corpus) are read fresh on next use."""
+        self._generation += 1
+        async with self._update_lock:
+            self._meetings.pop(meeting_id, None)
+            self._raw.pop(meeting_id, None)
+            self._corpus_raw = self._corpus = None
+
+    # -- Search ----------------------------------------------------------
+
+    async def search(
+        self,
+        supabase_client: Client,
+        query: str,
+        meeting_id: Any = None,
+        k: int = 5,
+    ) -> List[Dict[str, Any]]:
+        """Hybrid (vector + BM25) search in one meeting, or in all meetings if meeting_id is None."""
+        query_vector = np.asarray(await embed_text(query), dtype=np.float32)
+        if meeting_id is not None:
+            index = await self.get_meeting_index(supabase_client, meeting_id)
+        else:
+            index = await self.get_corpus_index(supabase_client)
+        return index.search(query, query_vector, k=k)
+
+
+# Shared engine for the API and the agent tools
+retrieval_engine = RetrievalEngine()
@@ -0,0 +1,150 @@
+import os
+import zlib
+import time
+import random
+import asyncio
+import logging
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+from utils import metrics
+from utils.disk_cache import CACHE_DIR, DiskCache
+from utils.urls import canonical_meeting_key
+
+YOUTUBE_API_URL = "https://youtubecc-423771082043.us-central1.run.app"
+ZOOM_API_URL = "https://zoom-transcript-scraper-423771082043.us-central1.run.app"
+
+FETCH_TIMEOUT = float(os.environ.get("TRANSCRIPT_FETCH_TIMEOUT", "60"))
+FETCH_MAX_RETRIES = int(os.environ.get("TRANSCRIPT_FETCH_MAX_RETRIES", "3"))
+# Retry on rate limits and server-side failures only
+RETRY_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptFetchError(Exception):
+    """The scraper could not produce a transcript. The message is safe to show to the user."""
+
+
+def transcript_source(url: str) -> Optional[str]:
+    """Scraper service for a meeting URL, or None if the URL type is unsupported."""
+    if "youtube.com" in url or "youtu.be" in url:
+        return YOUTUBE_API_URL
+    if "zoom.us" in url:
+        return ZOOM_API_URL
+    return None
+
+
+class TranscriptFetcher:
+    """
+    Fetches transcripts from the scraper services.
+
+    - one shared, connection-pooled httpx client
+    - retries with exponential backoff and jitter
+    - single-flight: concurrent requests for the same meeting share one scrape
+    - persistent on-disk cache of fetched transcripts (size-bounded, LRU)
+    """
+
+    def __init__(self, cache: DiskCache, max_retries: int = FETCH_MAX_RETRIES) -> None:
+        self.cache = cache
+        self.max_retries = max_retries
+        self._client: Optional[httpx.AsyncClient] = None
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=FETCH_TIMEOUT,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def cache_key(self, url: str) -> str:
+        # youtu.be/X and youtube.com/watch?v=X&t=30 are the same scrape
+        return canonical_meeting_key(url)
+
+    async def fetch(self, url: str) -> str:
+        """Transcript text for `url`, timed by where it came from (cache / shared / scrape / error)."""
+        started = time.perf_counter()
+        source = "error"
+        try:
+            transcript, source = await self._fetch(url)
+            return transcript
+        finally:
+            metrics.transcript_fetch_seconds.observe(time.perf_counter() - started, source=source)
+
+    async def _fetch(self, url: str) -> Tuple[str, str]:
+        target_url = transcript_source(url)
+        if not target_url:
+            raise TranscriptFetchError("Unsupported URL type.")
+
+        key = self.cache_key(url)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return zlib.decompress(cached).decode("utf-8"), "cache"
+
+        # Single-flight: the scrape runs in its own task, so one requester
+        # disconnecting doesn't cancel it for the others waiting on it
+        task = self._inflight.get(key)
+        source = "shared"
+        if task is None:
+            task = asyncio.create_task(self._scrape(key, target_url, url))
+            task.add_done_callback(lambda done: self._scrape_done(key, done))
+            self._inflight[key] = task
+            source = "scrape"
+        return await asyncio.shield(task), source
+
+    async def _scrape(self, key: str, target_url: str, url: str) -> str:
+        transcript = await self._fetch_with_retries(target_url, url)
+        self.cache.set(key, zlib.compress(transcript.encode("utf-8")))
+        return transcript
+
+    def _scrape_done(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved if every requester went away
+        if not task.cancelled():
+            task.exception()
+
+    async def _fetch_with_retries(self, target_url: str, url: str) -> str:
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self.client.get(target_url, params={"url": url})
+                if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                    raise httpx.HTTPStatusError(
+                        f"Scraper returned {response.status_code}", request=response.request, response=response
+                    )
+                response.raise_for_status()
+                data = response.json()
+                break
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                retryable = isinstance(e, httpx.TransportError) or (
+                    e.response.status_code in RETRY_STATUS_CODES
+                )
+                if not retryable or attempt == self.max_retries:
+                    raise TranscriptFetchError(f"Failed to fetch transcript: {str(e)}")
+                delay = min(2 ** attempt, 20) * (0.5 + random.random())
+                logger.warning("Transcript fetch failed (%s), retrying in %.1fs...", e, delay)
+                await asyncio.sleep(delay)
+            except ValueError as e:
+                raise TranscriptFetchError(f"Failed to fetch transcript: invalid response ({e})")
+
+        transcript_text = data.get("transcript", "")
+        if not transcript_text:
+            raise TranscriptFetchError("No transcript available for this URL.")
+        return transcript_text
+
+
+transcript_fetcher = TranscriptFetcher(
+    DiskCache(
+        os.environ.get("TRANSCRIPT_CACHE_PATH", os.path.join(CACHE_DIR, "transcripts.sqlite3")),
+        max_entries=int(os.environ.get("TRANSCRIPT_CACHE_MAX_ENTRIES", "2000")),
+    )
+)
@@ -0,0 +1,68 @@
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that never change what a link points to
+TRACKING_PARAMS = {"fbclid", "gclid", "si", "feature", "ref", "ref_src"}
+
+
+def _split(url: str):
+    """urlsplit, reading "youtu.be/X" and "www.youtube.com/watch?v=X" as https URLs."""
+    parts = urlsplit(url.strip())
+    if not parts.netloc:
+        parts = urlsplit("https://" + url.strip().lstrip("/"))
+    return parts
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a URL for use as a cache / de-duplication key:
+    lowercase scheme and host, drop the fragment and tracking parameters,
+    and sort the remaining query parameters.
+    """
+    parts = _split(url)
+    host = (parts.hostname or "").lower()
+    if parts.port:
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith("utm_")
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(((parts.scheme or "https").lower(), host, path, urlencode(query), ""))
+
+
+_YOUTUBE_ID_RE = re.compile(r"^[A-Za-z0-9_-]{11}$")
+_YOUTUBE_PATH_RE = re.compile(r"^/(?:shorts|embed|live|v)/([A-Za-z0-9_-]{11})")
+_ZOOM_PATH_RE = re.compile(r"^/(rec/(?:share|play)/[^/]+|j/\d+|w/\d+)")
+
+
+def canonical_meeting_key(url: str) -> str:
+    """
+    Stable identity of the meeting a URL points to, used as `meetinglist.meeting_key`:
+    - YouTube: "youtube:<video id>" (watch, youtu.be, shorts, embed, live; any host, any extra params)
+    - Zoom: "zoom:<path>" (recording / join path; subdomain and query parameters ignored)
+    - anything else: the normalized URL
+    Keep in sync with the backfill in sql/003_meeting_key.sql.
+    """
+    parts = _split(url)
+    host = (parts.hostname or "").lower()
+
+    if host == "youtu.be" or host == "youtube.com" or host.endswith(".youtube.com"):
+        video_id = None
+        if host == "youtu.be":
+            video_id = parts.path.strip("/").split("/")[0]
+        else:
+            video_id = dict(parse_qsl(parts.query)).get("v")
+            if not video_id:
+                match = _YOUTUBE_PATH_RE.match(parts.path)
+                video_id = match.group(1) if match else None
+        if video_id and _YOUTUBE_ID_RE.match(video_id):
+            return f"youtube:{video_id}"
+
+    if host == "zoom.us" or host.endswith(".zoom.us"):
+        match = _ZOOM_PATH_RE.match(parts.path)
+        if match:
+            return f"zoom:{match.group(1)}"
+
+    return normalize_url(url)
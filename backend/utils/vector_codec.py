@@ -0,0 +1,80 @@
+import os
+import struct
+from typing import Any, Dict, Sequence
+
+import numpy as np
+
+# How embeddings are written to Supabase:
+# - "float32" (default): pgvector `embedding` column, sent as a JSON list of floats
+# - "float16": packed half floats in `embedding_q` (bytea), 2 bytes per dimension
+# - "int8":    scalar-quantized int8 + one float32 scale per vector, 1 byte per dimension
+# The setting only affects writes: rows in any format are always read back,
+# so switching it (either way) keeps existing meetings searchable. Reads
+# select `embedding_q`, so sql/005_packed_embeddings.sql is always needed.
+EMBEDDING_STORAGE = os.environ.get("EMBEDDING_STORAGE", "float32")
+
+# First byte of every packed vector
+_FLOAT16 = 1
+_INT8 = 2
+
+
+def encode(vector: Sequence[float], storage: str = EMBEDDING_STORAGE) -> bytes:
+    """Pack a vector as `storage` ("float16" or "int8")."""
+    v = np.asarray(vector, dtype=np.float32)
+    if storage == "float16":
+        return bytes([_FLOAT16]) + v.astype("<f2").tobytes()
+    if storage == "int8":
+        # Symmetric quantization: v ~= q * scale, q in [-127, 127]
+        scale = float(np.abs(v).max()) / 127.0 if v.size else 0.0
+        q = np.round(v / scale) if scale > 0 else np.zeros_like(v)
+        return bytes([_INT8]) + struct.pack("<f", scale) + q.astype(np.int8).tobytes()
+    raise ValueError(f"Unknown embedding storage format: {storage!r}")
+
+
+def _to_bytes(value: Any) -> bytes:
+    # bytea comes back from PostgREST as a "\x0102..." hex string
+    if isinstance(value, str):
+        return bytes.fromhex(value[2:] if value.startswith("\\x") else value)
+    return bytes(value)
+
+
+def decode(value: Any) -> np.ndarray:
+    """Unpack a vector written by `encode` (bytes or PostgREST hex string) into float32."""
+    data = _to_bytes(value)
+    kind = data[0]
+    if kind == _FLOAT16:
+        return np.frombuffer(data, dtype="<f2", offset=1).astype(np.float32)
+    if kind == _INT8:
+        (scale,) = struct.unpack_from("<f", data, 1)
+        return np.frombuffer(data, dtype=np.int8, offset=5).astype(np.float32) * np.float32(scale)
+    raise ValueError(f"Unknown packed vector format: {kind}")
+
+
+def to_hex(data: bytes) -> str:
+    """bytea literal for PostgREST (JSON has no binary type)."""
+    return "\\x" + data.hex()
+
+
+def embedding_columns(vector: Sequence[float], storage: str = EMBEDDING_STORAGE) -> Dict[str, Any]:
+    """Column values for a row that stores `vector`, according to `storage`."""
+    if storage == "float32":
+        # Clear any packed copy, so a rewritten row never reads back the old vector
+        return {"embedding": vector, "embedding_q": None}
+    return {"embedding": None, "embedding_q": to_hex(encode(vector, storage))}
+
+
+# Columns to select to read embeddings back, whatever format they were written in
+EMBEDDING_COLUMNS = "embedding, embedding_q"
+
+
+def row_vector(row: Dict[str, Any]) -> np.ndarray | None:
+    """The embedding of a stored row (packed or pgvector), or None if it has none."""
+    if row.get("embedding_q") is not None:
+        return decode(row["embedding_q"])
+    value = row.get("embedding")
+    if value is None:
+        return None
+    # pgvector columns come back from PostgREST as a "[0.1,0.2,...]" string
+    if isinstance(value, str):
+        return np.fromstring(value.strip("[]"), dtype=np.float32, sep=",")
+    return np.asarray(value, dtype=np.float32)